@@ -0,0 +1,110 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from core.cache import bump_versions, get_versions
+
+
+def get_cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def get_version_name(user_id):
+    # version counter of the user in the shared cache, see core.cache
+    return f"auth.user:{user_id}"
+
+
+class UserLRU:
+    """
+    Bounded in-process cache of (version, pickled user). An entry is only used while its version
+    is the user's current one in the shared cache, and expires after a short timeout anyway.
+    """
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                del self.entries[user_id]
+                return None
+            self.entries.move_to_end(user_id)
+            return entry[0]
+
+    def set(self, user_id, data):
+        with self.lock:
+            self.entries[user_id] = (data, time.monotonic() + settings.AUTH_USER_LOCAL_TIMEOUT)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > settings.AUTH_USER_CACHE_SIZE:
+                self.entries.popitem(last=False)
+
+    def delete(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_users = UserLRU()
+
+
+def forget_user(user_id):
+    # called on every User save and delete, QuerySet.update() has to call it too. The new
+    # version reaches the other workers through the shared cache, CACHE_URL must be shared
+    local_users.delete(str(user_id))
+    cache.delete(get_cache_key(user_id))
+    bump_versions(get_version_name(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication resolving the token's user from the in-process LRU, then the shared
+    cache and only then the database, so authenticated requests do not query the users.
+    Both caches are checked against the user's version in the shared cache, a single small
+    cache read per request. Each request gets its own unpickled copy of the user, which may
+    still be a few moments old, so writes reload the user first.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        key = str(user_id)
+        # read before the user, a change committed meanwhile gets a newer version
+        version = get_versions([get_version_name(user_id)])[get_version_name(user_id)]
+        entry = local_users.get(key)
+        if entry is None or entry[0] != version:
+            entry = cache.get(get_cache_key(user_id))
+            if entry is None or entry[0] != version:
+                try:
+                    user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+                except self.user_model.DoesNotExist:
+                    raise AuthenticationFailed(_("User not found"), code="user_not_found")
+                entry = (version, pickle.dumps(user))
+                cache.set(get_cache_key(user_id), entry, settings.AUTH_USER_CACHE_TIMEOUT)
+            local_users.set(key, entry)
+        user = pickle.loads(entry[1])
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
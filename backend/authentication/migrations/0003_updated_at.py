@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-18 13:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_user_birth_date_user_gender_profileimage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profileimage',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
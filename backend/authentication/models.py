@@ -2,6 +2,7 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.core.validators import RegexValidator
 from rest_framework_simplejwt.tokens import RefreshToken
+from core.models import ImageChangeMixin
 
 
 class User(AbstractUser):
@@ -26,6 +27,8 @@ class User(AbstractUser):
 
     birth_date = models.DateField(blank=True, null=True)
 
+    updated_at = models.DateTimeField(auto_now=True)
+
 
 
     def __str__(self):
@@ -44,9 +47,10 @@ class User(AbstractUser):
 
 
 
-class ProfileImage(models.Model):
+class ProfileImage(ImageChangeMixin, models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     image = models.ImageField(upload_to="profile_images", blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.user.username
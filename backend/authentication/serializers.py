@@ -1,9 +1,9 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.db import transaction
 from .models import ProfileImage
-import base64
-from django.core.files.base import ContentFile
-from django.core.files.uploadedfile import InMemoryUploadedFile
+from .uploads import decode_data_uri, resize_profile_image
 
 
 User = get_user_model()
@@ -130,27 +130,40 @@ class UserInfoSerilizer(serializers.ModelSerializer):
     
 
 
-class UploadBase64ProfileImageSerializer(serializers.ModelSerializer):
-    profile_image = serializers.CharField(write_only=True)
+class Base64ImageField(serializers.FileField):
+    # accepts a data:image/...;base64,... string, or the file already decoded by Base64ImageParser
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            if not data.startswith("data:image"):
+                raise serializers.ValidationError("فرمت تصویر باید base64 باشد")
+            data = decode_data_uri(data)
+        return super().to_internal_value(data)
+
+
+class UploadProfileImageSerializer(serializers.ModelSerializer):
+    profile_image = serializers.FileField(write_only=True)
 
     class Meta:
         model = ProfileImage
         fields = ['profile_image']
 
     def validate_profile_image(self, value):
-        if value.startswith("data:image"):
-            return value
-        raise serializers.ValidationError("فرمت تصویر باید base64 باشد")
+        if value.size > settings.PROFILE_IMAGE_MAX_UPLOAD_SIZE:
+            raise serializers.ValidationError("حجم تصویر بیش از حد مجاز است")
+        return resize_profile_image(value)
 
+    @transaction.atomic
     def create(self, validated_data):
+        # the user has a single profile image, a new upload replaces it in place
         user = validated_data['user']
-        profile_image = validated_data['profile_image']
-        format, imgstr = profile_image.split(';base64,')
-        ext = format.split('/')[-1]
-        data = ContentFile(base64.b64decode(imgstr))
-        image = InMemoryUploadedFile(data, 'image', f"{user.username}.{ext}", 'image/jpeg', data.__sizeof__, None)
-        profile_image = ProfileImage.objects.create(user=user, image=image)
+        profile_image, created = ProfileImage.objects.select_for_update().get_or_create(user=user)
+        # the old file is released by authentication.signals
+        profile_image.image.save(f"{user.username}.webp", validated_data['profile_image'])
         return profile_image
+
+
+class UploadBase64ProfileImageSerializer(UploadProfileImageSerializer):
+    profile_image = Base64ImageField(write_only=True)
     
 
 class ChangePasswordSerializer(serializers.Serializer):
@@ -186,5 +199,5 @@ class ChangePasswordSerializer(serializers.Serializer):
     def save(self):
         user = self.context['user']
         user.set_password(self.validated_data['new_password'])
-        user.save()
+        user.save(update_fields=['password', 'updated_at'])
         return user
\ No newline at end of file
@@ -0,0 +1,29 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .authentication import forget_user
+from .models import ProfileImage
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    # a request may cache the old row before the transaction commits, so it is forgotten again on commit
+    forget_user(instance.pk)
+    transaction.on_commit(lambda: forget_user(instance.pk))
+
+
+# the replaced and deleted images drop their references of the content addressed storage (core.storage)
+
+@receiver(post_save, sender=ProfileImage)
+def release_replaced_profile_image(sender, instance, created, update_fields=None, **kwargs):
+    instance.release_replaced_image(created, update_fields)
+    instance.remember_image(update_fields)
+
+
+@receiver(post_delete, sender=ProfileImage)
+def release_deleted_profile_image(sender, instance, **kwargs):
+    instance.release_image()
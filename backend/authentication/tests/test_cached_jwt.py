@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from model_bakery import baker
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from authentication.authentication import CachedJWTAuthentication, get_version_name, local_users
+from core.cache import bump_versions
+import pytest
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def clear_users_cache():
+    local_users.clear()
+    cache.clear()
+    yield
+    local_users.clear()
+
+
+def authenticate(user):
+    token = user.tokens()["access"]
+    request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+    return CachedJWTAuthentication().authenticate(request)[0]
+
+
+@pytest.mark.django_db
+class TestCachedJWTAuthentication:
+    def test_user_is_queried_once(self, django_assert_num_queries):
+        user = baker.make(User)
+
+        with django_assert_num_queries(1):
+            authenticate(user)
+        local_users.clear()
+        with django_assert_num_queries(0):
+            first = authenticate(user)
+            second = authenticate(user)
+
+        assert first == second == user
+        assert first is not second
+
+    def test_deactivated_user_is_rejected(self):
+        user = baker.make(User)
+        authenticate(user)
+
+        user.is_active = False
+        user.save()
+
+        with pytest.raises(AuthenticationFailed):
+            authenticate(user)
+
+    def test_change_made_by_another_worker_is_seen(self):
+        user = baker.make(User)
+        authenticate(user)
+
+        # another worker deactivates the user, only the shared version reaches this process
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        bump_versions(get_version_name(user.pk))
+
+        with pytest.raises(AuthenticationFailed):
+            authenticate(user)
+
+    def test_cached_user_is_not_written_back(self, api_client, settings):
+        user = baker.make(User, first_name="old")
+        User.objects.filter(pk=user.pk).update(first_name="fresh")
+        api_client.force_authenticate(user)
+
+        response = api_client.patch(f"/api/v{settings.VERSION}/auth/info/", {"last_name": "new"}, format="json")
+
+        assert response.status_code == 200
+        assert User.objects.values_list("first_name", "last_name").get(pk=user.pk) == ("fresh", "new")
+
+    def test_password_change_is_seen(self, api_client, settings):
+        user = baker.make(User)
+        user.set_password("password")
+        user.save()
+        api_client.force_authenticate(user)
+        authenticate(user)
+
+        response = api_client.post(
+            f"/api/v{settings.VERSION}/auth/change_password/",
+            {"old_password": "password", "new_password": "new-password", "new_password2": "new-password"},
+        )
+
+        assert response.status_code == 204
+        assert authenticate(user).check_password("new-password")
+
+    def test_local_cache_is_bounded(self, settings):
+        settings.AUTH_USER_CACHE_SIZE = 2
+        for user in baker.make(User, _quantity=3):
+            authenticate(user)
+
+        assert len(local_users.entries) == 2
@@ -0,0 +1,140 @@
+import base64
+import json
+from io import BytesIO
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from model_bakery import baker
+from PIL import Image
+from rest_framework import status
+from authentication import uploads
+from authentication.models import ProfileImage
+from core.models import StoredFile
+import pytest
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+
+
+@pytest.fixture
+def user_client(api_client):
+    user = baker.make(User)
+    api_client.force_authenticate(user)
+    api_client.user = user
+    return api_client
+
+
+@pytest.fixture
+def profile_url():
+    return f"/api/v{settings.VERSION}/auth/profile/"
+
+
+def make_image(width=2000, height=1500, fmt='JPEG'):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), (30, 120, 60)).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def data_uri(data):
+    return "data:image/jpeg;base64," + base64.b64encode(data).decode()
+
+
+@pytest.mark.django_db
+class TestProfileImageUpload:
+    def test_base64_upload_is_downscaled(self, user_client, profile_url):
+        response = user_client.post(profile_url, {"profile_image": data_uri(make_image())}, format="json")
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        profile_image = ProfileImage.objects.get(user=user_client.user)
+        with Image.open(profile_image.image) as image:
+            assert image.format == 'WEBP'
+            assert image.size == (512, 384)
+
+    def test_new_upload_replaces_the_image_in_place(self, user_client, profile_url, django_capture_on_commit_callbacks):
+        user_client.post(profile_url, {"profile_image": data_uri(make_image())}, format="json")
+        first = ProfileImage.objects.get()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = user_client.post(
+                f"{profile_url}upload/",
+                {"profile_image": SimpleUploadedFile("me.png", make_image(300, 300, 'PNG'))},
+                format="multipart",
+            )
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        second = ProfileImage.objects.get()
+        assert second.pk == first.pk
+        assert second.image.name != first.image.name
+        assert not first.image.storage.exists(first.image.name)
+
+    @pytest.mark.parametrize("value", ["data:image/png;base64,@@@@", data_uri(b"not an image"), "plain text"])
+    def test_invalid_image_get400(self, user_client, profile_url, value):
+        response = user_client.post(profile_url, {"profile_image": value}, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not ProfileImage.objects.exists()
+
+    def test_too_large_upload_get400(self, user_client, profile_url, settings):
+        settings.PROFILE_IMAGE_MAX_UPLOAD_SIZE = 1024
+
+        response = user_client.post(profile_url, {"profile_image": data_uri(make_image())}, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_large_png_get400(self, user_client, profile_url):
+        # fully decoded, unlike a JPEG of the same size
+        png = SimpleUploadedFile("me.png", make_image(600, 500, 'PNG'))
+
+        response = user_client.post(f"{profile_url}upload/", {"profile_image": png}, format="multipart")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not ProfileImage.objects.exists()
+
+    def test_large_jpeg_is_accepted(self, user_client, profile_url):
+        response = user_client.post(profile_url, {"profile_image": data_uri(make_image(2500, 2000))}, format="json")
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    def test_image_replaced_by_a_save_releases_the_old_file(self, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            profile_image = ProfileImage.objects.create(user=baker.make(User), image=ContentFile(b"me", name="a.png"))
+        old_name, storage = profile_image.image.name, profile_image.image.storage
+
+        profile_image = ProfileImage.objects.get(pk=profile_image.pk)
+        with django_capture_on_commit_callbacks(execute=True):
+            profile_image.image = ContentFile(b"new me", name="b.png")
+            profile_image.save()
+
+        assert not storage.exists(old_name)
+        assert StoredFile.objects.get().name == profile_image.image.name
+
+    def test_deleted_user_releases_the_image(self, django_capture_on_commit_callbacks):
+        user = baker.make(User)
+        with django_capture_on_commit_callbacks(execute=True):
+            profile_image = ProfileImage.objects.create(user=user, image=ContentFile(b"me", name="a.png"))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user.delete()
+
+        assert not profile_image.image.storage.exists(profile_image.image.name)
+        assert not StoredFile.objects.exists()
+
+
+class TestBase64ImageParser:
+    def test_stream_is_decoded_in_chunks(self, monkeypatch):
+        monkeypatch.setattr(uploads, "CHUNK_SIZE", 7)
+        data = make_image(40, 30)
+        # json.dumps may escape slashes, the parser has to undo it across chunk boundaries
+        body = json.dumps({"profile_image": data_uri(data)}).replace("/", "\\/").encode()
+
+        parsed = uploads.Base64ImageParser().parse(BytesIO(body))
+
+        upload = parsed["profile_image"]
+        assert upload.content_type == "image/jpeg"
+        assert upload.size == len(data)
+        assert upload.read() == data
@@ -138,3 +138,19 @@ class TestUserLogin:
 
         assert response.status_code == status.HTTP_400_BAD_REQUEST
         assert "password" in response.data
+
+
+@pytest.mark.django_db
+class TestUserInfo:
+    def test_info_is_revalidated_until_the_user_changes(self, api_client, base_auth_url, django_assert_num_queries):
+        api_client.force_authenticate(baker.make(User))
+        response = api_client.get(f"{base_auth_url}info/")
+        assert "private" in response["Cache-Control"]
+
+        with django_assert_num_queries(1):
+            assert api_client.get(f"{base_auth_url}info/", HTTP_IF_NONE_MATCH=response["ETag"]).status_code == 304
+
+        api_client.patch(f"{base_auth_url}info/", data={"first_name": "Sara"})
+        response = api_client.get(f"{base_auth_url}info/", HTTP_IF_NONE_MATCH=response["ETag"])
+        assert response.status_code == 200
+        assert response.data["first_name"] == "Sara"
@@ -0,0 +1,149 @@
+import base64
+import binascii
+import os
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+# bytes read or decoded at once, the only part of an upload held in memory
+CHUNK_SIZE = 64 * 1024
+
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'WEBP', 'GIF'}
+
+
+def too_large():
+    return serializers.ValidationError({'profile_image': ['حجم تصویر بیش از حد مجاز است']})
+
+
+class Base64Decoder:
+    """Decodes base64 text fed in arbitrary chunks, the incomplete quantum is kept for the next chunk."""
+
+    def __init__(self):
+        self.pending = b''
+
+    def decode(self, chunk):
+        chunk = self.pending + chunk.translate(None, b' \t\r\n')
+        usable = len(chunk) - len(chunk) % 4
+        self.pending = chunk[usable:]
+        try:
+            return base64.b64decode(chunk[:usable], validate=True)
+        except binascii.Error:
+            raise serializers.ValidationError({'profile_image': ['فرمت تصویر باید base64 باشد']})
+
+    def close(self):
+        if self.pending:
+            raise serializers.ValidationError({'profile_image': ['فرمت تصویر باید base64 باشد']})
+
+
+def open_upload(header):
+    # header is the data uri prefix, e.g. data:image/png
+    content_type = header[len('data:'):].split(';')[0]
+    ext = content_type.split('/')[-1] or 'img'
+    return TemporaryUploadedFile(f"profile.{ext}", content_type, 0, None)
+
+
+def write_decoded(upload, data):
+    upload.write(data)
+    if upload.tell() > settings.PROFILE_IMAGE_MAX_UPLOAD_SIZE:
+        upload.close()
+        raise too_large()
+
+
+def decode_data_uri(value):
+    """Decodes a data:image/...;base64,... string into a temporary file, CHUNK_SIZE characters at a time."""
+    header, _, data = value.partition(';base64,')
+    upload = open_upload(header)
+    decoder = Base64Decoder()
+    for start in range(0, len(data), CHUNK_SIZE):
+        write_decoded(upload, decoder.decode(data[start:start + CHUNK_SIZE].encode('ascii', 'replace')))
+    decoder.close()
+    upload.size = upload.tell()
+    upload.seek(0)
+    return upload
+
+
+class Base64ImageParser(BaseParser):
+    """
+    Parses {"profile_image": "data:image/...;base64,..."} straight from the request stream.
+    The image is decoded into a temporary file chunk by chunk, so neither the base64 text
+    nor the decoded image is ever held in memory as a whole.
+    """
+    media_type = 'application/json'
+    marker = b';base64,'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if stream is None:
+            return {}
+        head = b''
+        while self.marker not in head:
+            chunk = stream.read(1024)
+            if not chunk or len(head) > 4096:
+                raise serializers.ValidationError({'profile_image': ['فرمت تصویر باید base64 باشد']})
+            head += chunk
+
+        head, _, rest = head.partition(self.marker)
+        key, quote, header = head.rpartition(b'"data:')
+        if not quote or b'"profile_image"' not in key:
+            raise serializers.ValidationError({'profile_image': ['فرمت تصویر باید base64 باشد']})
+
+        upload = open_upload('data:' + header.replace(b'\\/', b'/').decode('ascii', 'replace'))
+        decoder = Base64Decoder()
+        chunk, closed = rest, False
+        while not closed:
+            if not chunk:
+                upload.close()
+                raise ParseError('JSON parse error - unterminated string')
+            value, closed, _ = chunk.partition(b'"')
+            if not closed and value.endswith(b'\\'):
+                # keep a split escape sequence for the next chunk
+                value, chunk = value[:-1], b'\\'
+            else:
+                chunk = b''
+            # base64 only needs the \/ escape, the line break escapes are dropped
+            value = value.replace(b'\\/', b'/').replace(b'\\n', b'').replace(b'\\r', b'')
+            write_decoded(upload, decoder.decode(value))
+            if not closed:
+                chunk += stream.read(CHUNK_SIZE)
+        decoder.close()
+
+        # the rest of the body is only the closing brace
+        while stream.read(CHUNK_SIZE):
+            pass
+        upload.size = upload.tell()
+        upload.seek(0)
+        return {'profile_image': upload}
+
+
+def resize_profile_image(upload):
+    """
+    Validates the uploaded image and downscales it to PROFILE_IMAGE_SIZE pixels, returns the
+    encoded image. JPEGs up to PROFILE_IMAGE_MAX_PIXELS are decoded at a reduced scale (draft),
+    the other formats are fully decoded, so they are limited to PROFILE_IMAGE_MAX_DECODED_PIXELS.
+    """
+    size = settings.PROFILE_IMAGE_SIZE
+    try:
+        upload.seek(0)
+        with Image.open(upload) as image:
+            if image.format not in ALLOWED_FORMATS:
+                raise serializers.ValidationError('فرمت تصویر پشتیبانی نمی‌شود')
+            max_pixels = settings.PROFILE_IMAGE_MAX_PIXELS if image.format == 'JPEG' else settings.PROFILE_IMAGE_MAX_DECODED_PIXELS
+            if image.width * image.height > max_pixels:
+                raise serializers.ValidationError('ابعاد تصویر بیش از حد مجاز است')
+            image.draft('RGB', (size, size))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((size, size), Image.LANCZOS)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+            buffer = BytesIO()
+            image.save(buffer, 'WEBP', quality=85)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError):
+        raise serializers.ValidationError('تصویر معتبر نیست')
+    finally:
+        upload.close()
+    name = os.path.splitext(os.path.basename(upload.name or 'profile'))[0]
+    return ContentFile(buffer.getvalue(), name=f"{name}.webp")
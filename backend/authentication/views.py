@@ -2,11 +2,18 @@ from rest_framework.viewsets import GenericViewSet
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
+from core.asyncviews import AsyncViewSetMixin
+from core.conditional import ConditionalGetMixin
 from .serializers import *
+from .uploads import Base64ImageParser
 
 
-class AuthenticationViewSet(GenericViewSet):
+class AuthenticationViewSet(AsyncViewSetMixin, ConditionalGetMixin, GenericViewSet):
+    conditional_actions = ['info']
+    cache_control = {'private': True, 'no_cache': True}
+
     def get_serializer_class(self):
         if self.action == 'login':
             return LoginSerializer
@@ -16,6 +23,8 @@ class AuthenticationViewSet(GenericViewSet):
             return UserInfoSerilizer
         elif self.action == 'profile':
             return UploadBase64ProfileImageSerializer
+        elif self.action == 'profile_upload':
+            return UploadProfileImageSerializer
         elif self.action == 'change_password':
             return ChangePasswordSerializer
         
@@ -24,6 +33,11 @@ class AuthenticationViewSet(GenericViewSet):
             return []
         else :
             return [IsAuthenticated()]
+
+    def get_last_modified(self):
+        # request.user may come from the users cache, the validators are read from the database
+        updated = User.objects.filter(pk=self.request.user.pk).values_list('updated_at', 'profileimage__updated_at').first()
+        return max(moment for moment in updated if moment is not None) if updated else None
     
 
     @action(detail=False, methods=['POST'])
@@ -41,27 +55,40 @@ class AuthenticationViewSet(GenericViewSet):
     
     @action(detail=False, methods= ['GET', 'PUT', 'PATCH'])
     def info(self, request):
-        user = request.user
         if request.method == 'GET':
+            # request.user may come from the users cache, the profile image is read with it
+            user = User.objects.select_related('profileimage').get(pk=request.user.pk)
             return Response(UserInfoSerilizer(user).data)
         elif request.method in ['PUT', 'PATCH']:
-            serializer = UserInfoSerilizer(user, data=request.data, partial=True)
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
-            return Response(serializer.data)
+            return self.update_info(request)
+
+    def update_info(self, request):
+        # request.user may come from the users cache, a save of it would write its old columns back
+        user = User.objects.get(pk=request.user.pk)
+        serializer = UserInfoSerilizer(user, data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
         
 
-    @action(detail=False, methods=['POST'])
+    @action(detail=False, methods=['POST'], parser_classes=[Base64ImageParser, MultiPartParser, FormParser])
     def profile(self, request):
         user = request.user
         serializer = UploadBase64ProfileImageSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save(user=user)
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=['POST'], url_path='profile/upload', parser_classes=[MultiPartParser])
+    def profile_upload(self, request):
+        serializer = UploadProfileImageSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
     
     @action(detail=False, methods=['POST'])
     def change_password(self, request):
-        user = request.user
+        user = User.objects.get(pk=request.user.pk)
         serializer = ChangePasswordSerializer(data=request.data, context={'user': user})
         serializer.is_valid(raise_exception=True)
         serializer.save()
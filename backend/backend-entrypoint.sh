@@ -7,6 +7,13 @@ python manage.py collectstatic --noinput
 echo "Apply database migrations"
 python manage.py migrate
 
-# Start server
-echo "Starting server"
-gunicorn --bind 0.0.0.0:8000 nabaatshop.wsgi:application
+# Build the OpenAPI schema served by the docs
+python manage.py generate_openapi_schema
+
+# Start server, SERVER_MODE=asgi serves the catalog from daphne
+echo "Starting server (${SERVER_MODE:-wsgi})"
+if [ "${SERVER_MODE:-wsgi}" = "asgi" ]; then
+    exec daphne --bind 0.0.0.0 --port 8000 nabaatshop.asgi:application
+else
+    exec gunicorn --bind 0.0.0.0:8000 nabaatshop.wsgi:application
+fi
@@ -0,0 +1,32 @@
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+
+class AsyncViewSetMixin:
+    """
+    Serves a viewset from an async view when SERVER_MODE is asgi, under WSGI it is the plain sync
+    DRF view. The actions stay sync: the whole dispatch runs in one sync_to_async call on the
+    thread pool, not on the single thread Django shares between the sync views under ASGI, so a
+    request waiting on the database does not hold the others up.
+    """
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        if settings.SERVER_MODE != 'asgi':
+            return view
+
+        def run(request, *args, **kwargs):
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                # request_finished is sent from another thread, it would not close this one's
+                close_old_connections()
+
+        @wraps(view)
+        async def async_view(request, *args, **kwargs):
+            return await sync_to_async(run, thread_sensitive=False)(request, *args, **kwargs)
+
+        return async_view
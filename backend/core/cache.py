@@ -0,0 +1,136 @@
+import hashlib
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+from .routers import use_primary
+
+
+def _version_key(name):
+    return f"version:{name}"
+
+
+def new_version():
+    # the time of the change in milliseconds and a random part, see version_time()
+    return f"{time.time_ns() // 1_000_000:x}-{uuid.uuid4().hex[:8]}"
+
+
+def version_time(version):
+    """Returns the (aware) time a version was created, None for an unknown format."""
+    try:
+        return datetime.fromtimestamp(int(version.split('-')[0], 16) / 1000, tz=timezone.utc)
+    except (AttributeError, ValueError, OverflowError, OSError):
+        return None
+
+
+def get_versions(names):
+    """
+    Returns {name: version} of the counters, a counter evicted from the cache gets a new
+    version, so the entries cached with the old one can never be served again.
+    """
+    keys = {_version_key(name): name for name in names}
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    for key, version in missing.items():
+        # another worker may have set the counter meanwhile, its version wins. A counter no write
+        # has bumped yet (e.g. of a product id from a URL) expires with the entries built with it
+        if not cache.add(key, version, settings.RESPONSE_CACHE_TIMEOUT):
+            version = cache.get(key, version)
+        versions[key] = version
+    return {name: versions[key] for key, name in keys.items()}
+
+
+def use_primary_if_changed(versions):
+    # a replica may lack a change younger than its allowed lag, what is built from it gets cached
+    since = datetime.now(timezone.utc) - timedelta(seconds=settings.REPLICA_MAX_LAG)
+    if any((version_time(version) or since) > since for version in versions.values()):
+        use_primary()
+
+
+def bump_versions(*names):
+    """
+    Changes the versions of the counters with one cache call, now and again once the current
+    transaction commits, as a response built meanwhile still sees the old rows.
+    """
+    if not names:
+        return
+
+    def bump():
+        cache.set_many({_version_key(name): new_version() for name in names}, None)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+class CachedResponseMixin:
+    """
+    Caches the data of the successful GET responses of `cache_actions`, keyed by the full path
+    and the versions of get_cache_versions(), so bumping a counter invalidates exactly the
+    entries depending on it. On a miss only one worker builds the response (cache.add lock),
+    the others serve the last built response of the path meanwhile, or wait for the new one.
+    """
+    cache_actions = ['list', 'retrieve']
+    cache_timeout = None
+    cache_lock_timeout = 10
+
+    def get_cache_versions(self):
+        return []
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method == 'GET' and self.action in self.cache_actions:
+            handler = getattr(self, 'get')
+            self.get = lambda request, *args, **kwargs: self.get_cached_response(handler, request, *args, **kwargs)
+
+    def get_cache_keys(self, request):
+        path = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+        versions = get_versions(self.get_cache_versions())
+        use_primary_if_changed(versions)
+        version = hashlib.md5(repr(sorted(versions.items())).encode()).hexdigest()
+        return f"response:{path}:{version}", f"response:{path}:latest", f"response:{path}:{version}:lock"
+
+    def lookup_cached_response(self, request):
+        """Returns (keys, cached data, whether this worker took the lock to build the response)."""
+        key, latest_key, lock_key = keys = self.get_cache_keys(request)
+        cached = cache.get(key)
+        locked = cached is None and cache.add(lock_key, 1, self.cache_lock_timeout)
+        if cached is None and not locked:
+            # another worker is building the response, serve the previous one or wait for it
+            cached = cache.get(latest_key)
+            if cached is not None:
+                # built with older versions, see ConditionalGetMixin
+                cached = {**cached, 'stale': True}
+            deadline = time.monotonic() + self.cache_lock_timeout
+            while cached is None and time.monotonic() < deadline and cache.get(lock_key):
+                time.sleep(0.05)
+                cached = cache.get(key)
+        return keys, cached, locked
+
+    def store_cached_response(self, keys, response, locked):
+        key, latest_key, lock_key = keys
+        if response is not None and response.status_code == 200:
+            cached = {'data': response.data, 'status': response.status_code}
+            timeout = self.cache_timeout if self.cache_timeout is not None else settings.RESPONSE_CACHE_TIMEOUT
+            cache.set_many({key: cached, latest_key: cached}, timeout)
+        if locked:
+            cache.delete(lock_key)
+
+    def get_response_from_cache(self, cached):
+        response = Response(cached['data'], status=cached['status'])
+        response.stale = cached.get('stale', False)
+        return response
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        keys, cached, locked = self.lookup_cached_response(request)
+        if cached is not None:
+            return self.get_response_from_cache(cached)
+
+        response = None
+        try:
+            response = handler(request, *args, **kwargs)
+        finally:
+            self.store_cached_response(keys, response, locked)
+        return response
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    # the users cache (authentication) and the response cache (core.cache) are invalidated through it
+    if settings.DEBUG or 'LocMemCache' not in settings.CACHES['default']['BACKEND']:
+        return []
+    return [Warning(
+        "The default cache is local to each process, changes made by one worker are not seen by the others.",
+        hint="Set CACHE_URL to a shared cache, e.g. redis://redis:6379/1.",
+        id='core.W001',
+    )]
@@ -0,0 +1,75 @@
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from .cache import get_versions, use_primary_if_changed, version_time
+
+
+class ConditionalGetMixin:
+    """
+    Adds ETag and Last-Modified to the GET responses of `conditional_actions` and answers the
+    revalidations with 304 before the handler runs. The validators come from get_last_modified(),
+    meant to be a single indexed max(updated_at) query, and the versions of get_cache_versions()
+    (see core.cache) for the related objects, so a 304 is never serialized. With versions the
+    query result is cached until one of them changes.
+    """
+    conditional_actions = ['list', 'retrieve']
+    cache_control = {'no_cache': True}
+
+    def get_last_modified(self):
+        return None
+
+    def get_cache_versions(self):
+        return []
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method == 'GET' and self.action in self.conditional_actions:
+            handler = getattr(self, 'get')
+            self.get = lambda request, *args, **kwargs: self.get_conditional_response(handler, request, *args, **kwargs)
+
+    def get_validators(self, request):
+        versions = get_versions(self.get_cache_versions())
+        use_primary_if_changed(versions)
+        last_modified = self.get_cached_last_modified(versions)
+        times = [version_time(version) for version in versions.values()] + [last_modified]
+        last_modified = max((moment for moment in times if moment is not None), default=None)
+        etag = hashlib.md5(repr((
+            request.accepted_renderer.format, last_modified, sorted(versions.items())
+        )).encode()).hexdigest()
+        return quote_etag(etag), int(last_modified.timestamp()) if last_modified else None
+
+    def get_cached_last_modified(self, versions):
+        # every write of updated_at bumps a version, so the query result is kept until one changes
+        if not versions:
+            return self.get_last_modified()
+        key = hashlib.md5(repr((
+            type(self).__name__, self.action, sorted(self.kwargs.items()), sorted(versions.items())
+        )).encode()).hexdigest()
+        cached = cache.get(f"last-modified:{key}")
+        if cached is None:
+            cached = {'value': self.get_last_modified()}
+            cache.set(f"last-modified:{key}", cached, settings.RESPONSE_CACHE_TIMEOUT)
+        return cached['value']
+
+    def add_validators(self, response, etag, last_modified):
+        if getattr(response, 'stale', False):
+            # a previous response served while another worker builds the new one (core.cache),
+            # the validators of the current versions would let the clients keep it
+            patch_cache_control(response, **self.cache_control)
+            return response
+        response.headers['ETag'] = etag
+        if last_modified is not None:
+            response.headers['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, **self.cache_control)
+        return response
+
+    def get_conditional_response(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        response = get_conditional_response(request, etag, last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        return self.add_validators(response, etag, last_modified)
@@ -0,0 +1,58 @@
+import os
+import threading
+from django.db.backends.postgresql import base
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+from core.db.pool import ConnectionPool, PoolTimeout
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def check_connection(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    The PostgreSQL (psycopg2) backend with the connections kept in a per-process ConnectionPool.
+    Closing the connection at the end of a request (CONN_MAX_AGE = 0) returns it to the pool,
+    so every thread, including the ASGI ones, holds a connection only while it serves a request.
+    Configured with DATABASES[alias]['POOL'], see nabaatshop.settings.
+    """
+
+    def get_pool(self):
+        # a forked worker never uses its parent's connections, nor a renamed (test) database the old ones
+        key = (os.getpid(), self.alias, *(self.settings_dict[name] for name in ('NAME', 'USER', 'HOST', 'PORT')))
+        pool = _pools.get(key)
+        if pool is None:
+            with _pools_lock:
+                pool = _pools.get(key)
+                if pool is None:
+                    options = {name.lower(): value for name, value in self.settings_dict.get('POOL', {}).items()}
+                    pool = _pools[key] = ConnectionPool(check_connection, **options)
+        return pool
+
+    @base.async_unsafe
+    def get_new_connection(self, conn_params):
+        # set by the original method on new connections only, the pooled ones have it already
+        self.isolation_level = base.IsolationLevel(
+            self.settings_dict['OPTIONS'].get('isolation_level', base.IsolationLevel.READ_COMMITTED)
+        )
+        try:
+            return self.get_pool().checkout(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+        except PoolTimeout as error:
+            raise self.Database.OperationalError(str(error)) from error
+
+    def _close(self):
+        if self.connection is None:
+            return
+        connection, discard = self.connection, bool(self.connection.closed)
+        if not discard and connection.info.transaction_status != TRANSACTION_STATUS_IDLE:
+            # a connection goes back to the pool outside of any transaction
+            try:
+                connection.rollback()
+            except self.Database.Error:
+                discard = True
+        self.get_pool().checkin(connection, discard=discard)
@@ -0,0 +1,139 @@
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of DB-API connections of one database in one process.
+    Up to `size` connections are kept open between checkouts and `max_overflow` more may be
+    opened under load, they are closed on checkin. When all are in use, checkout waits up to
+    `timeout` seconds. Connections are replaced after `recycle` seconds, and the ones idle for
+    more than `check_interval` seconds are health checked with `check(connection)` first.
+    """
+
+    def __init__(self, check, size=10, max_overflow=5, timeout=10, recycle=1800, check_interval=30):
+        self.check = check
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.check_interval = check_interval
+        self.condition = threading.Condition()
+        # (connection, created at, returned at), the most recently returned one is reused first
+        self.idle = deque()
+        self.created_at = {}
+        self.opened = 0
+        self.counters = dict.fromkeys([
+            'checkouts', 'checkins', 'waits', 'timeouts', 'overflow', 'created', 'closed', 'recycled', 'failed_checks',
+        ], 0)
+        self.wait_seconds = 0.0
+
+    def checkout(self, connect):
+        """Returns a pooled connection, `connect()` opens a new one when the pool may grow."""
+        while True:
+            idle = self._acquire()
+            if idle is None:
+                try:
+                    connection = connect()
+                except Exception:
+                    with self.condition:
+                        self.opened -= 1
+                        self.condition.notify()
+                    raise
+                with self.condition:
+                    self.created_at[id(connection)] = time.monotonic()
+                    self.counters['created'] += 1
+            else:
+                connection, returned_at = idle
+                if not self._is_healthy(connection, returned_at):
+                    continue
+            with self.condition:
+                self.counters['checkouts'] += 1
+            return connection
+
+    def _acquire(self):
+        """Returns (an idle connection, its return time), or None when a new one may be opened."""
+        deadline = None
+        with self.condition:
+            while True:
+                while self.idle:
+                    connection, created_at, returned_at = self.idle.pop()
+                    if time.monotonic() - created_at > self.recycle:
+                        self.counters['recycled'] += 1
+                        self._close(connection)
+                        continue
+                    return connection, returned_at
+                if self.opened < self.size + self.max_overflow:
+                    self.opened += 1
+                    if self.opened > self.size:
+                        self.counters['overflow'] += 1
+                    return None
+
+                now = time.monotonic()
+                if deadline is None:
+                    deadline = now + self.timeout
+                    self.counters['waits'] += 1
+                if now >= deadline:
+                    self.counters['timeouts'] += 1
+                    raise PoolTimeout(f"No database connection became available in {self.timeout} seconds")
+                self.condition.wait(deadline - now)
+                self.wait_seconds += time.monotonic() - now
+
+    def _is_healthy(self, connection, returned_at):
+        if time.monotonic() - returned_at <= self.check_interval:
+            return True
+        try:
+            if self.check(connection):
+                return True
+        except Exception:
+            logger.debug("Pooled connection failed the health check", exc_info=True)
+        with self.condition:
+            self.counters['failed_checks'] += 1
+            self._close(connection)
+        return False
+
+    def checkin(self, connection, discard=False):
+        with self.condition:
+            self.counters['checkins'] += 1
+            created_at = self.created_at.get(id(connection), 0)
+            if discard or self.opened > self.size or time.monotonic() - created_at > self.recycle:
+                self._close(connection)
+            else:
+                self.idle.append((connection, created_at, time.monotonic()))
+                self.condition.notify()
+
+    def _close(self, connection):
+        # called with the condition held, frees a slot for a waiting checkout
+        self.created_at.pop(id(connection), None)
+        self.opened -= 1
+        self.counters['closed'] += 1
+        self.condition.notify()
+        try:
+            connection.close()
+        except Exception:
+            logger.debug("Closing a pooled connection failed", exc_info=True)
+
+    def close_all(self):
+        with self.condition:
+            while self.idle:
+                self._close(self.idle.pop()[0])
+
+    def stats(self):
+        with self.condition:
+            return {
+                'size': self.size,
+                'max_overflow': self.max_overflow,
+                'opened': self.opened,
+                'idle': len(self.idle),
+                'in_use': self.opened - len(self.idle),
+                'wait_seconds': round(self.wait_seconds, 3),
+                **self.counters,
+            }
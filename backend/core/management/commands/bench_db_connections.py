@@ -0,0 +1,45 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.utils import load_backend
+
+ENGINES = {
+    'connect per request': 'django.db.backends.postgresql',
+    'pooled': 'core.db.backends.postgresql_pool',
+}
+
+
+class Command(BaseCommand):
+    help = "Time the connection handling of a request (connect, one query, close) with and without the pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--database', default='default')
+
+    def run(self, label, engine, settings_dict, count):
+        wrapper = load_backend(engine).DatabaseWrapper({**settings_dict, 'ENGINE': engine}, f"bench-{engine}")
+        timings = []
+        for _ in range(count):
+            start = time.perf_counter()
+            with wrapper.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            wrapper.close()
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        mean = sum(timings) / count
+        self.stdout.write(
+            f"{label:<20} mean {mean:7.2f} ms  p50 {timings[count // 2]:7.2f} ms  p99 {timings[int(count * 0.99)]:7.2f} ms"
+        )
+        if hasattr(wrapper, 'get_pool'):
+            self.stdout.write(f"{'':<20} {wrapper.get_pool().stats()}")
+            wrapper.get_pool().close_all()
+        return mean
+
+    def handle(self, *args, **options):
+        settings_dict = connections[options['database']].settings_dict
+        if connections[options['database']].vendor != 'postgresql':
+            raise CommandError("The pool is for PostgreSQL, the database is not")
+
+        self.stdout.write(f"{options['requests']} requests")
+        means = [self.run(label, engine, settings_dict, options['requests']) for label, engine in ENGINES.items()]
+        self.stdout.write(f"{means[0] - means[1]:.2f} ms saved per request")
@@ -0,0 +1,68 @@
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from core import renderers
+from core.renderers import EnvelopeJSONRenderer
+
+
+def make_payload(count):
+    now = timezone.now().isoformat()
+    return [
+        {
+            'id': pk,
+            'name': f'محصول شماره {pk}',
+            'description': 'گیاه آپارتمانی مقاوم با گلدان سرامیکی ' * 4,
+            'price': Decimal(150000 + pk),
+            'stock': pk % 17,
+            'rating_average': 4.25,
+            'categories': [{'id': 1, 'name': 'گیاهان آپارتمانی'}, {'id': 7, 'name': 'کاکتوس'}],
+            'images': [{'id': pk, 'image': f'/media/products/{pk}.jpg', 'srcset': {}}],
+            'created_at': now,
+        }
+        for pk in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = "Time rendering a large list response with the old two-pass middleware and the envelope renderer"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def timed(self, label, render, repeat):
+        render()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            size = len(render())
+        elapsed = (time.perf_counter() - start) / repeat * 1000
+        self.stdout.write(f"{label:<32} {elapsed:8.2f} ms  {size / 1024:8.0f} KB")
+        return elapsed
+
+    def handle(self, *args, **options):
+        payload = make_payload(options['items'])
+        response = Response(payload, status=200)
+        context = {'response': response}
+
+        def two_pass():
+            # what CustomResponseMiddleware did: render the data, then wrap and render it again
+            JSONRenderer().render(payload, 'application/json', context)
+            envelope = {'status': 200, 'is_success': True, 'message': '', 'data': payload, 'errors': None}
+            return JSONRenderer().render(envelope, 'application/json', context)
+
+        def stdlib():
+            orjson, renderers.orjson = renderers.orjson, None
+            try:
+                return EnvelopeJSONRenderer().render(payload, 'application/json', context)
+            finally:
+                renderers.orjson = orjson
+
+        self.stdout.write(f"{options['items']} items, mean of {options['repeat']} renders")
+        before = self.timed("two-pass middleware", two_pass, options['repeat'])
+        self.timed("envelope renderer (stdlib json)", stdlib, options['repeat'])
+        if renderers.orjson is not None:
+            after = self.timed("envelope renderer (orjson)", lambda: EnvelopeJSONRenderer().render(payload, 'application/json', context), options['repeat'])
+            self.stdout.write(f"{before / after:.1f}x faster")
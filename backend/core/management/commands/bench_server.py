@@ -0,0 +1,108 @@
+import asyncio
+import os
+import socket
+import subprocess
+import time
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SERVERS = {
+    'wsgi': lambda port, workers: ['gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(workers), 'nabaatshop.wsgi:application'],
+    'asgi': lambda port, workers: ['daphne', '--bind', '127.0.0.1', '--port', str(port), 'nabaatshop.asgi:application'],
+}
+
+
+async def fetch(host, port, request, timeout):
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write(request)
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        await asyncio.wait_for(reader.read(), timeout)
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def load(url, connections, duration, timeout):
+    """Keeps `connections` requests in flight for `duration` seconds, returns (latencies, errors)."""
+    url = urlsplit(url)
+    path = url.path + (f'?{url.query}' if url.query else '')
+    request = f"GET {path} HTTP/1.1\r\nHost: {url.netloc}\r\nConnection: close\r\n\r\n".encode()
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+
+    async def client():
+        nonlocal errors
+        while time.monotonic() < deadline:
+            start = time.monotonic()
+            try:
+                status = await fetch(url.hostname, url.port or 80, request, timeout)
+            except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+                status = None
+            if status is None or status >= 500:
+                errors += 1
+            else:
+                latencies.append(time.monotonic() - start)
+
+    await asyncio.gather(*[client() for _ in range(connections)])
+    return latencies, errors
+
+
+def wait_for_port(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f"The server exited with {process.returncode}")
+        try:
+            socket.create_connection(('127.0.0.1', port), 1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f"The server did not listen on {port} in {timeout} seconds")
+
+
+class Command(BaseCommand):
+    help = "Load test an endpoint served by gunicorn (wsgi) and daphne (asgi), reports requests per second and latencies"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=f'/api/v{settings.VERSION}/store/products/')
+        parser.add_argument('--modes', nargs='+', choices=list(SERVERS), default=list(SERVERS))
+        parser.add_argument('--url', help="load test a running server instead of starting one per mode")
+        parser.add_argument('--connections', type=int, default=1000)
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--workers', type=int, default=1, help="gunicorn workers, daphne runs one process")
+        parser.add_argument('--port', type=int, default=8765)
+
+    def report(self, label, latencies, errors, duration):
+        latencies.sort()
+        percentile = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0
+        self.stdout.write(
+            f"{label:<8} {len(latencies) / duration:9.1f} req/s  p50 {percentile(0.5):8.1f} ms  "
+            f"p99 {percentile(0.99):8.1f} ms  {errors} errors"
+        )
+
+    def run(self, label, url, options):
+        latencies, errors = asyncio.run(load(url, options['connections'], options['duration'], options['timeout']))
+        self.report(label, latencies, errors, options['duration'])
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{options['connections']} connections for {options['duration']:g} seconds")
+        if options['url']:
+            return self.run('server', options['url'], options)
+
+        for mode in options['modes']:
+            port = options['port']
+            command = SERVERS[mode](port, options['workers'])
+            process = subprocess.Popen(
+                command, cwd=settings.BASE_DIR, env={**os.environ, 'SERVER_MODE': mode},
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                wait_for_port(port, process)
+                self.run(mode, f"http://127.0.0.1:{port}{options['path']}", options)
+            finally:
+                process.terminate()
+                process.wait()
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.routers import replicas
+
+
+class Command(BaseCommand):
+    help = "Report the replication lag of the read replicas, exit with an error if one is unhealthy"
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            self.stdout.write("No replicas configured (DATABASE_REPLICA_URLS)")
+            return
+
+        healthy = replicas.check()
+        for alias, lag in replicas.lags.items():
+            state = 'unreachable' if lag is None else f"{lag:.1f} seconds behind"
+            self.stdout.write(f"{alias:<12} {state:<24} {'healthy' if alias in healthy else 'skipped'}")
+        if len(healthy) < len(settings.DATABASE_REPLICAS):
+            raise CommandError(f"{len(settings.DATABASE_REPLICAS) - len(healthy)} replica(s) unhealthy, their reads go to the primary")
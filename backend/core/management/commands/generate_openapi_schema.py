@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from nabaatshop.swagger import generate_schema, get_schema_path, write_schema
+
+
+class Command(BaseCommand):
+    help = "Generate the OpenAPI schema artifact of settings.VERSION served by the docs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="only report whether the artifact is out of date")
+
+    def handle(self, *args, **options):
+        path = get_schema_path()
+        content = generate_schema()
+        try:
+            with open(path, 'rb') as file:
+                current = file.read()
+        except FileNotFoundError:
+            current = None
+
+        if options['check']:
+            if current != content:
+                raise CommandError(f"{path} is out of date, run generate_openapi_schema")
+            self.stdout.write(f"{path} is up to date")
+            return
+
+        write_schema(content, path)
+        self.stdout.write(f"Wrote {path} ({len(content) / 1024:.0f} KB)")
@@ -0,0 +1,53 @@
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import FileField
+from core.storage import ContentAddressedStorage, is_content_addressed
+
+
+def get_file_fields():
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, FileField) and isinstance(field.storage, ContentAddressedStorage):
+                yield model, field.name
+
+
+class Command(BaseCommand):
+    help = "Move the files of every FileField to the content addressed storage, identical files are merged"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only count the files to move")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ContentAddressedStorage):
+            raise CommandError("The default storage is not core.storage.ContentAddressedStorage")
+
+        moved, missing, legacy_names = 0, 0, set()
+        for model, field in get_file_fields():
+            rows = (
+                model._default_manager.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
+                .order_by('pk').values_list('pk', field)
+            )
+            for pk, name in rows.iterator(chunk_size=options['batch_size']):
+                if is_content_addressed(name):
+                    continue
+                if not default_storage.exists(name):
+                    self.stderr.write(f"{model._meta.label} #{pk}: {name} is missing")
+                    missing += 1
+                    continue
+                moved += 1
+                if options['dry_run']:
+                    continue
+                with default_storage.open(name) as file:
+                    new_name = default_storage.save(name, file)
+                model._default_manager.filter(pk=pk, **{field: name}).update(**{field: new_name})
+                legacy_names.add(name)
+
+        # several rows may share a legacy file, so they are removed once every row is moved
+        for name in legacy_names:
+            default_storage.delete(name)
+        action = "to move" if options['dry_run'] else "moved"
+        self.stdout.write(f"{moved} file(s) {action}, {missing} missing")
+        if not options['dry_run']:
+            self.stdout.write("Run generate_image_variants --all to move the product image variants as well")
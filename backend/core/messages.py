@@ -0,0 +1,6 @@
+# default envelope messages of core.renderers.EnvelopeJSONRenderer, by response status
+SUCCESS      = 'عملیات با موفقیت انجام شد'
+NOT_FOUND    = 'موردی یافت نشد'
+FORBIDDEN    = 'شما دسترسی لازم را ندارید'
+UNAUTHORIZED = 'ابتدا وارد حساب کاربری خود شوید'
+ERROR        = 'خطایی رخ داده است'
@@ -1,17 +1,78 @@
+import re
+from fnmatch import translate
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django import http
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
 
 
 class CorsMiddlewareDjango(object):
+    """
+    Answers CORS preflights before the rest of the chain and the view run, and adds the
+    allowed origin to the other responses. The header values are built once, the allowed
+    origins may be patterns like https://*.nabaat.shop and each origin is matched once.
+    Works in both the WSGI and the ASGI chain.
+    """
+    MAX_CACHED_ORIGINS = 1024
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        origins = settings.CORS_ALLOWED_ORIGINS
+        self.allow_all = '*' in origins
+        self.origin_patterns = [re.compile(translate(origin.lower())) for origin in origins]
+        self.allow_methods = ', '.join(method.upper() for method in settings.CORS_ALLOWED_METHODS)
+        self.allow_headers = ', '.join(header.lower() for header in settings.CORS_ALLOWED_HEADERS)
+        self.max_age = str(settings.CORS_PREFLIGHT_MAX_AGE)
+        self.allowed_origins = {}
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def get_allowed_origin(self, origin):
+        # the Access-Control-Allow-Origin value for the request origin, None if it is not allowed
+        if self.allow_all:
+            return '*'
+        if not origin:
+            return None
+        allowed = self.allowed_origins.get(origin, False)
+        if allowed is False:
+            allowed = origin if any(pattern.match(origin.lower()) for pattern in self.origin_patterns) else None
+            if len(self.allowed_origins) >= self.MAX_CACHED_ORIGINS:
+                self.allowed_origins.clear()
+            self.allowed_origins[origin] = allowed
+        return allowed
+
+    def get_preflight_response(self, request, allowed_origin):
+        if request.method != "OPTIONS" or "HTTP_ACCESS_CONTROL_REQUEST_METHOD" not in request.META:
+            return None
+        response = http.HttpResponse()
+        response["Content-Length"] = "0"
+        if allowed_origin is not None:
+            response["Access-Control-Allow-Methods"] = self.allow_methods
+            response["Access-Control-Allow-Headers"] = self.allow_headers
+            response["Access-Control-Max-Age"] = self.max_age
+        return response
+
+    def add_headers(self, response, allowed_origin):
+        if allowed_origin is not None:
+            response["Access-Control-Allow-Origin"] = allowed_origin
+        if not self.allow_all:
+            patch_vary_headers(response, ('Origin',))
+        return response
 
     def __call__(self, request):
-        response = self.get_response(request)
-        if (request.method == "OPTIONS"  and "HTTP_ACCESS_CONTROL_REQUEST_METHOD" in request.META):
-            response = http.HttpResponse()
-            response["Content-Length"] = "0"
-            response["Access-Control-Max-Age"] = 86400
-        response["Access-Control-Allow-Origin"] = "*"
-        response["Access-Control-Allow-Methods"] = "DELETE, GET, OPTIONS, PATCH, POST, PUT"
-        response["Access-Control-Allow-Headers"] = "accept, accept-encoding, authorization, content-type, dnt, origin, user-agent, x-csrftoken, x-requested-with, access-control_allow_origin"
-        return response
\ No newline at end of file
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        allowed_origin = self.get_allowed_origin(request.META.get('HTTP_ORIGIN'))
+        response = self.get_preflight_response(request, allowed_origin)
+        if response is None:
+            response = self.get_response(request)
+        return self.add_headers(response, allowed_origin)
+
+    async def __acall__(self, request):
+        allowed_origin = self.get_allowed_origin(request.META.get('HTTP_ORIGIN'))
+        response = self.get_preflight_response(request, allowed_origin)
+        if response is None:
+            response = await self.get_response(request)
+        return self.add_headers(response, allowed_origin)
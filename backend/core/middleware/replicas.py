@@ -0,0 +1,72 @@
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from core.routers import get_pin_key, request_state
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Tracks the request for core.routers.ReplicaRouter. Unsafe methods never read from a replica,
+    and a request that wrote pins its client (cookie) and its user (shared cache) to the
+    primary for REPLICA_STICKY_SECONDS, so they read their own writes. A read-only request
+    that failed on a replica is served again from the primary.
+    """
+    sync_capable = True
+    async_capable = True
+    cookie_name = 'primary_until'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def start(self, request):
+        try:
+            pinned_until = float(request.COOKIES.get(self.cookie_name, 0))
+        except ValueError:
+            pinned_until = 0
+        pinned = request.method not in ('GET', 'HEAD', 'OPTIONS') or pinned_until > time.time()
+        state = {'request': request, 'pinned': pinned, 'wrote': False}
+        return state, request_state.set(state)
+
+    def pin(self, request, response):
+        seconds = settings.REPLICA_STICKY_SECONDS
+        response.set_cookie(self.cookie_name, str(int(time.time() + seconds)), max_age=seconds, httponly=True, samesite='Lax')
+        user_id = getattr(getattr(request, 'user', None), 'pk', None)
+        if user_id is not None:
+            cache.set(get_pin_key(user_id), 1, seconds)
+
+    def retry_on_primary(self, request, state):
+        # a replica failed during a read-only request, it is served again from the primary
+        if not state.get('replica_failed') or state['wrote'] or request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            return False
+        state['pinned'], state['replica_failed'] = True, False
+        return True
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token = self.start(request)
+        try:
+            response = self.get_response(request)
+            if self.retry_on_primary(request, state):
+                response = self.get_response(request)
+        finally:
+            request_state.reset(token)
+        if state['wrote']:
+            self.pin(request, response)
+        return response
+
+    async def __acall__(self, request):
+        state, token = self.start(request)
+        try:
+            response = await self.get_response(request)
+            if self.retry_on_primary(request, state):
+                response = await self.get_response(request)
+        finally:
+            request_state.reset(token)
+        if state['wrote']:
+            # the cache write of the user pin may block
+            await sync_to_async(self.pin)(request, response)
+        return response
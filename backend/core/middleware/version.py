@@ -3,10 +3,7 @@ from django.conf import settings
 
 
 class VersionMiddleware(MiddlewareMixin):
-    def __init__(self, get_response):
-        self.get_response = get_response
-
-    def __call__(self, request):
-        response = self.get_response(request)
-        response['X-API-Version'] = settings.API_VERSION
-        return response
\ No newline at end of file
+    # MiddlewareMixin runs process_response in both the WSGI and the ASGI chain
+    def process_response(self, request, response):
+        response['X-API-Version'] = settings.VERSION
+        return response
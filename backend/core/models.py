@@ -0,0 +1,45 @@
+from django.db import models
+from .storage import release_file
+
+
+class StoredFile(models.Model):
+    # reference count of a file written by core.storage.ContentAddressedStorage,
+    # the file is deleted when the last reference to it is deleted
+    name       = models.CharField(max_length=255,unique=True)
+    size       = models.BigIntegerField(default=0)
+    references = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.references})"
+
+
+class ImageChangeMixin:
+    """
+    Remembers the loaded name of the `image` field. The signals of the model's app call
+    release_replaced_image and remember_image on save and release_image on delete, so the
+    references of the content addressed storage are dropped with the rows pointing to them.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_image = instance.image.name if 'image' in field_names else None
+        return instance
+
+    def image_has_changed(self):
+        return not hasattr(self, '_loaded_image') or self._loaded_image != self.image.name
+
+    def release_replaced_image(self, created, update_fields=None):
+        if update_fields is not None and 'image' not in update_fields:
+            return
+        if not created and self.image_has_changed():
+            release_file(self.image.storage, getattr(self, '_loaded_image', None))
+
+    def remember_image(self, update_fields=None):
+        if update_fields is None or 'image' in update_fields:
+            self._loaded_image = self.image.name
+
+    def release_image(self):
+        release_file(self.image.storage, self.image.name)
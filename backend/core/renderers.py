@@ -0,0 +1,55 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+from core import messages
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - the stdlib encoder is used instead
+    orjson = None
+
+
+def get_message(status_code):
+    if status_code < 400:
+        return messages.SUCCESS
+    return {
+        404: messages.NOT_FOUND,
+        403: messages.FORBIDDEN,
+        401: messages.UNAUTHORIZED,
+    }.get(status_code, messages.ERROR)
+
+
+class EnvelopeJSONRenderer(JSONRenderer):
+    """
+    Renders DRF responses wrapped in {status, is_success, message, data, errors} in a single pass.
+    A 'message' key of dict data replaces the default message of the status. Uses orjson when
+    it is installed and the stdlib encoder (with DRF's JSONEncoder types) otherwise.
+    """
+    orjson_options = (orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z) if orjson else 0
+
+    def envelope(self, data, response):
+        status_code = response.status_code
+        message = get_message(status_code)
+        if isinstance(data, dict) and 'message' in data:
+            message = data['message']
+            data = {key: value for key, value in data.items() if key != 'message'}
+        return {
+            'status': status_code,
+            'is_success': status_code < 400,
+            'message': message,
+            'data': data,
+            'errors': data if status_code >= 400 else None,
+        }
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
+        response = renderer_context.get('response')
+        if response is not None:
+            if response.status_code == 204:
+                return b''
+            data = self.envelope(data, response)
+        elif data is None:
+            return b''
+
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=JSONEncoder().default, option=self.orjson_options)
@@ -0,0 +1,167 @@
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, InterfaceError, OperationalError, connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# state of the current request, set by core.middleware.replicas, None outside of requests
+request_state = ContextVar('replica_request_state', default=None)
+
+
+def get_pin_key(user_id):
+    return f"replicas:pin:{user_id}"
+
+
+def use_primary():
+    """Sends the rest of the current request's reads to the primary."""
+    state = request_state.get()
+    if state is not None:
+        state['pinned'] = True
+
+
+def ensure_connection(alias):
+    # connect_timeout (REPLICA_CONNECT_TIMEOUT) bounds the wait for an unreachable replica
+    connections[alias].ensure_connection()
+
+
+def record_replica_error(execute, sql, params, many, context):
+    """Execute wrapper of the replica connections, a failed replica is dropped until the next check."""
+    try:
+        return execute(sql, params, many, context)
+    except (OperationalError, InterfaceError):
+        replicas.drop(context['connection'].alias)
+        state = request_state.get()
+        if state is not None:
+            # core.middleware.replicas serves the request again from the primary
+            state['replica_failed'] = True
+        raise
+
+
+def add_replica_error_wrapper(sender, connection, **kwargs):
+    if connection.alias in settings.DATABASE_REPLICAS and record_replica_error not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_replica_error)
+
+
+connection_created.connect(add_replica_error_wrapper)
+
+
+def measure_lag(alias):
+    """Returns the replication lag of the replica in seconds, 0 when the backend can not tell."""
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+            )
+        else:
+            cursor.execute("SELECT 0")
+        lag = cursor.fetchone()[0]
+    return float(lag or 0)
+
+
+class ReplicaHealth:
+    """
+    The replicas that answered the last check with a lag under REPLICA_MAX_LAG. Each process
+    checks every REPLICA_HEALTH_INTERVAL seconds, one thread at a time, the others keep
+    using the previous result meanwhile.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.healthy = []
+        self.lags = {}
+        self.checked_at = None
+
+    def check(self):
+        healthy, lags = [], {}
+        for alias in settings.DATABASE_REPLICAS:
+            try:
+                lags[alias] = measure_lag(alias)
+            except DatabaseError:
+                logger.warning("Replica %s is not reachable", alias, exc_info=True)
+                lags[alias] = None
+                continue
+            if lags[alias] <= settings.REPLICA_MAX_LAG:
+                healthy.append(alias)
+            else:
+                logger.warning("Replica %s lags %.1f seconds behind", alias, lags[alias])
+        self.healthy, self.lags, self.checked_at = healthy, lags, time.monotonic()
+        return healthy
+
+    def get_healthy(self):
+        expired = self.checked_at is None or time.monotonic() - self.checked_at > settings.REPLICA_HEALTH_INTERVAL
+        if expired and self.lock.acquire(blocking=self.checked_at is None):
+            try:
+                self.check()
+            finally:
+                self.lock.release()
+        return self.healthy
+
+    def drop(self, alias):
+        if alias in self.healthy:
+            logger.warning("Replica %s failed, reads go to the other databases until the next check", alias)
+            self.healthy = [healthy for healthy in self.healthy if healthy != alias]
+
+    def reset(self):
+        self.healthy, self.lags, self.checked_at = [], {}, None
+
+
+replicas = ReplicaHealth()
+
+
+class ReplicaRouter:
+    """
+    Sends the reads of REPLICA_APPS made by requests to a healthy replica, everything else to
+    the primary. A request stays on the primary when it wrote, runs in a transaction, carries
+    the cookie of a recent write or its user wrote in the last REPLICA_STICKY_SECONDS.
+    """
+
+    def uses_replicas(self, model):
+        return model._meta.app_label in settings.REPLICA_APPS
+
+    def use_primary(self, state):
+        if state['pinned'] or connections['default'].in_atomic_block:
+            return True
+        user = getattr(state['request'], 'user', None)
+        user_id = getattr(user, 'pk', None)
+        if user_id is not None:
+            if state.get('user_id') != user_id:
+                state['user_id'], state['user_pinned'] = user_id, bool(cache.get(get_pin_key(user_id)))
+            return state['user_pinned']
+        return False
+
+    def db_for_read(self, model, **hints):
+        state = request_state.get()
+        if state is None or not settings.DATABASE_REPLICAS or not self.uses_replicas(model):
+            return None
+        if self.use_primary(state):
+            return 'default'
+        healthy = replicas.get_healthy()
+        for alias in random.sample(healthy, len(healthy)):
+            try:
+                ensure_connection(alias)
+                return alias
+            except DatabaseError:
+                logger.warning("Replica %s is not reachable", alias, exc_info=True)
+                replicas.drop(alias)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        state = request_state.get()
+        if state is not None and self.uses_replicas(model):
+            state['pinned'] = state['wrote'] = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return False if db in settings.DATABASE_REPLICAS else None
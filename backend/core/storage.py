@@ -0,0 +1,78 @@
+import hashlib
+import os
+import re
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+CONTENT_ADDRESSED_NAME = re.compile(r'^(?:[^/]+/)?[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(?:\.[0-9a-z]{1,10})?$')
+
+
+def is_content_addressed(name):
+    return bool(CONTENT_ADDRESSED_NAME.match(name or ''))
+
+
+def release_file(storage, name):
+    # drops a reference of the file once the current transaction commits
+    if name:
+        transaction.on_commit(lambda: storage.delete(name), robust=True)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores files by the sha256 of their bytes, sharded by the first two hash bytes under the
+    top directory of the upload_to, e.g. products/ab/cd/abcd...ef.jpg. Identical uploads share
+    one file, core.StoredFile counts the references and delete() removes the file with the last one.
+    """
+
+    def get_content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        directory = name.replace('\\', '/').split('/')[0] if '/' in name else ''
+        ext = os.path.splitext(name)[1].lower()[:11]
+        return '/'.join(filter(None, [directory, digest[:2], digest[2:4], digest + ext]))
+
+    def get_available_name(self, name, max_length=None):
+        # the name is replaced by the content hash in _save, only a racing write of the same hash needs another
+        if is_content_addressed(name):
+            return super().get_available_name(name, max_length)
+        return name
+
+    def _save(self, name, content):
+        from .models import StoredFile
+
+        name = self.get_content_name(name, content)
+        with transaction.atomic():
+            # the locked row orders this save with the removal of the file by delete()
+            stored, created = StoredFile.objects.select_for_update().get_or_create(name=name)
+            if not self.exists(name):
+                saved = super()._save(name, content)
+                if saved != name:
+                    # another upload of the same bytes won the race
+                    super().delete(saved)
+            StoredFile.objects.filter(pk=stored.pk).update(references=F('references') + 1, size=self.size(name))
+        return name
+
+    def delete(self, name):
+        from .models import StoredFile
+
+        with transaction.atomic():
+            stored = StoredFile.objects.select_for_update().filter(name=name).first()
+            if stored is None:
+                # a file from before the storage, not reference counted
+                return super().delete(name)
+            StoredFile.objects.filter(pk=stored.pk, references__gt=0).update(references=F('references') - 1)
+            if stored.references <= 1:
+                transaction.on_commit(lambda: self.delete_unreferenced(name))
+
+    def delete_unreferenced(self, name):
+        from .models import StoredFile
+
+        with transaction.atomic():
+            # a save may have referenced the file again since the last reference was deleted
+            stored = StoredFile.objects.select_for_update().filter(name=name, references=0).first()
+            if stored is not None:
+                super().delete(name)
+                stored.delete()
@@ -0,0 +1,38 @@
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.test import AsyncRequestFactory
+from django.urls import resolve
+from model_bakery import baker
+from core.middleware.corsheaders import CorsMiddlewareDjango
+from store.models import Product
+from store.views import ProductViewSet
+import pytest
+
+
+async def get_response(request):
+    pass
+
+
+def test_middlewares_are_async_capable():
+    assert iscoroutinefunction(CorsMiddlewareDjango(get_response))
+    assert not iscoroutinefunction(CorsMiddlewareDjango(lambda request: None))
+
+
+def test_catalog_is_served_by_sync_views_under_wsgi():
+    assert settings.SERVER_MODE == "wsgi"
+    assert not iscoroutinefunction(resolve(f"/api/v{settings.VERSION}/store/products/1/").func)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_catalog_is_served_by_async_views_under_asgi(settings):
+    settings.SERVER_MODE = "asgi"
+    view = ProductViewSet.as_view({"get": "retrieve"})
+    assert iscoroutinefunction(view)
+    product = baker.make(Product)
+
+    request = AsyncRequestFactory().get(f"/api/v{settings.VERSION}/store/products/{product.pk}/")
+    response = async_to_sync(view)(request, pk=product.pk).render()
+
+    assert response.status_code == 200
+    assert response.data["id"] == product.pk
+    assert "ETag" in response
@@ -0,0 +1,59 @@
+from django.core.cache import cache
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+from core.cache import CachedResponseMixin, bump_versions, get_versions
+from unittest import mock
+import pytest
+
+
+class CountingView(CachedResponseMixin, APIView):
+    action = 'list'
+    calls = 0
+
+    def get_cache_versions(self):
+        return ['test.counting']
+
+    def get(self, request):
+        CountingView.calls += 1
+        return Response({'calls': CountingView.calls})
+
+
+@pytest.fixture(autouse=True)
+def reset():
+    cache.clear()
+    CountingView.calls = 0
+
+
+def get(path="/counting/"):
+    return CountingView.as_view()(APIRequestFactory().get(path)).data["calls"]
+
+
+@pytest.mark.django_db
+class TestCachedResponseMixin:
+    def test_responses_are_cached_until_a_version_changes(self):
+        assert [get(), get(), get("/counting/?page=2")] == [1, 1, 2]
+
+        versions = get_versions(['test.counting'])
+        bump_versions('test.counting')
+
+        assert get_versions(['test.counting']) != versions
+        assert get() == 3
+
+    def test_a_held_lock_serves_the_previous_response(self):
+        get()
+        bump_versions('test.counting')
+        view = CountingView()
+        request = APIRequestFactory().get("/counting/")
+        request.build_absolute_uri = lambda: "http://testserver/counting/"
+        key, latest_key, lock_key = view.get_cache_keys(request)
+        cache.add(lock_key, 1)
+
+        assert get() == 1
+        assert CountingView.calls == 1
+
+    def test_counters_created_by_reads_expire(self, settings):
+        with mock.patch.object(cache, 'add', wraps=cache.add) as add:
+            get_versions(['test.unknown:999'])
+
+        assert add.call_args.args[2] == settings.RESPONSE_CACHE_TIMEOUT
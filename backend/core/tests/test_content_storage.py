@@ -0,0 +1,65 @@
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from model_bakery import baker
+from core.models import StoredFile
+from core.storage import ContentAddressedStorage, is_content_addressed
+from store.models import Order, OrderPaymentImage
+import pytest
+
+
+@pytest.fixture
+def storage(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return ContentAddressedStorage()
+
+
+@pytest.mark.django_db
+class TestContentAddressedStorage:
+    def test_identical_files_are_stored_once(self, storage):
+        first = storage.save("products/a.JPG", ContentFile(b"plant"))
+        second = storage.save("products/b.jpg", ContentFile(b"plant"))
+
+        assert first == second
+        assert is_content_addressed(first)
+        directory, shard1, shard2, name = first.split("/")
+        assert (directory, shard1 + shard2, name[-4:]) == ("products", name[:4], ".jpg")
+        assert StoredFile.objects.get(name=first).references == 2
+
+    def test_file_is_deleted_with_the_last_reference(self, storage, django_capture_on_commit_callbacks):
+        name = storage.save("orders/a.png", ContentFile(b"receipt"))
+        storage.save("orders/b.png", ContentFile(b"receipt"))
+
+        storage.delete(name)
+        assert storage.exists(name)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            storage.delete(name)
+        assert not storage.exists(name)
+        assert not StoredFile.objects.exists()
+
+    def test_migrate_existing_files(self, storage, settings):
+        legacy = FileSystemStorage()
+        names = [legacy.save("orders/receipt.png", ContentFile(b"receipt")) for _ in range(2)]
+        for name in names:
+            baker.make(OrderPaymentImage, order=baker.make(Order), image=name)
+
+        call_command("migrate_media_storage")
+
+        images = list(OrderPaymentImage.objects.values_list("image", flat=True))
+        assert images[0] == images[1]
+        assert is_content_addressed(images[0])
+        assert StoredFile.objects.get().references == 2
+        assert not any(legacy.exists(name) for name in names)
+
+    def test_file_saved_again_before_the_delete_commits_is_kept(self, storage, django_capture_on_commit_callbacks):
+        name = storage.save("orders/a.png", ContentFile(b"receipt"))
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            storage.delete(name)
+        assert storage.save("orders/b.png", ContentFile(b"receipt")) == name
+        for callback in callbacks:
+            callback()
+
+        assert storage.exists(name)
+        assert StoredFile.objects.get(name=name).references == 1
@@ -0,0 +1,41 @@
+from django.conf import settings
+import pytest
+
+
+@pytest.fixture
+def orders_url():
+    return f"/api/v{settings.VERSION}/store/orders/"
+
+
+def preflight(api_client, url, origin="https://app.nabaat.shop"):
+    return api_client.options(url, HTTP_ORIGIN=origin, HTTP_ACCESS_CONTROL_REQUEST_METHOD="POST")
+
+
+@pytest.mark.django_db
+class TestCorsMiddleware:
+    def test_preflight_does_not_reach_the_view(self, api_client, orders_url, django_assert_num_queries):
+        with django_assert_num_queries(0):
+            response = preflight(api_client, orders_url)
+            missing = preflight(api_client, "/no-such-page")
+
+        for response in (response, missing):
+            assert response.status_code == 200
+            assert response.content == b""
+            assert response["Access-Control-Allow-Origin"] == "*"
+            assert "POST" in response["Access-Control-Allow-Methods"]
+            assert "authorization" in response["Access-Control-Allow-Headers"]
+            assert response["Access-Control-Max-Age"] == "86400"
+
+    def test_configured_origins_are_echoed_and_vary(self, api_client, orders_url, settings):
+        settings.CORS_ALLOWED_ORIGINS = ["https://*.nabaat.shop"]
+
+        allowed = preflight(api_client, orders_url)
+        denied = preflight(api_client, orders_url, origin="https://evil.example")
+        response = api_client.get(f"/api/v{settings.VERSION}/hello-world", HTTP_ORIGIN="https://app.nabaat.shop")
+
+        assert allowed["Access-Control-Allow-Origin"] == "https://app.nabaat.shop"
+        assert "Access-Control-Allow-Origin" not in denied
+        assert "Access-Control-Allow-Methods" not in denied
+        assert response["Access-Control-Allow-Origin"] == "https://app.nabaat.shop"
+        for response in (allowed, denied, response):
+            assert "Origin" in response["Vary"]
@@ -0,0 +1,80 @@
+import threading
+import time
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from model_bakery import baker
+from core.db.pool import ConnectionPool, PoolTimeout
+import pytest
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def healthy(connection):
+    return not connection.closed
+
+
+class TestConnectionPool:
+    def test_connections_are_reused(self):
+        pool = ConnectionPool(healthy)
+        first = pool.checkout(FakeConnection)
+        pool.checkin(first)
+
+        assert pool.checkout(FakeConnection) is first
+        assert pool.stats()['created'] == 1
+        assert pool.stats()['checkouts'] == 2
+
+    def test_pool_is_bounded(self):
+        pool = ConnectionPool(healthy, size=1, max_overflow=1, timeout=0.05)
+        connection, overflow = pool.checkout(FakeConnection), pool.checkout(FakeConnection)
+
+        with pytest.raises(PoolTimeout):
+            pool.checkout(FakeConnection)
+        pool.checkin(overflow)
+
+        stats = pool.stats()
+        assert overflow.closed and not connection.closed
+        assert (stats['opened'], stats['overflow'], stats['waits'], stats['timeouts']) == (1, 1, 1, 1)
+
+    def test_waiting_checkout_gets_the_returned_connection(self):
+        pool = ConnectionPool(healthy, size=1, max_overflow=0, timeout=5)
+        connection = pool.checkout(FakeConnection)
+        threading.Timer(0.05, pool.checkin, [connection]).start()
+
+        assert pool.checkout(FakeConnection) is connection
+        assert pool.stats()['waits'] == 1
+        assert pool.stats()['wait_seconds'] > 0
+
+    def test_broken_and_old_connections_are_replaced(self):
+        pool = ConnectionPool(healthy, check_interval=0)
+        broken = pool.checkout(FakeConnection)
+        pool.checkin(broken)
+        broken.closed = True
+        time.sleep(0.01)
+
+        assert pool.checkout(FakeConnection) is not broken
+        assert pool.stats()['failed_checks'] == 1
+
+        pool = ConnectionPool(healthy, recycle=0)
+        old = pool.checkout(FakeConnection)
+        time.sleep(0.01)
+        pool.checkin(old)
+        assert old.closed
+        assert pool.stats()['opened'] == 0
+
+
+@pytest.mark.django_db
+def test_pool_stats_are_for_staff(api_client):
+    url = f"/api/v{settings.VERSION}/db-pool-stats"
+    api_client.force_authenticate(baker.make(get_user_model()))
+    assert api_client.get(url).status_code == 403
+
+    api_client.force_authenticate(baker.make(get_user_model(), is_staff=True))
+    response = api_client.get(url)
+    assert response.status_code == 200
+    assert "pools" in response.data
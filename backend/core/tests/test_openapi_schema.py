@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from nabaatshop import swagger
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def schema_root(settings, tmp_path):
+    settings.OPENAPI_SCHEMA_ROOT = str(tmp_path)
+    swagger._schema.clear()
+    yield tmp_path
+    swagger._schema.clear()
+
+
+@pytest.fixture
+def schema_url():
+    return f"/api/v{settings.VERSION}/openapi.json"
+
+
+def test_urlconf_does_not_import_drf_yasg():
+    code = "import sys, django; django.setup(); import nabaatshop.urls; print('drf_yasg' in sys.modules)"
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'nabaatshop.settings'}
+    output = subprocess.check_output([sys.executable, '-c', code], cwd=settings.BASE_DIR, env=env, text=True)
+
+    assert output.strip() == 'False'
+
+
+@pytest.mark.django_db
+class TestOpenAPISchema:
+    def test_schema_is_generated_once_and_cached_by_clients(self, client, schema_url, schema_root, monkeypatch):
+        calls = []
+        generate_schema = swagger.generate_schema
+        monkeypatch.setattr(swagger, 'generate_schema', lambda: calls.append(1) or generate_schema())
+
+        response = client.get(schema_url)
+        revalidated = client.get(schema_url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+        assert response.status_code == 200
+        assert "/store/products/" in response.json()["paths"]
+        assert f"max-age={settings.OPENAPI_SCHEMA_MAX_AGE}" in response["Cache-Control"]
+        assert revalidated.status_code == 304
+        assert len(calls) == 1
+        assert (schema_root / f"openapi-v{settings.VERSION}.json").read_bytes() == response.content
+
+    def test_generate_command_and_check(self, schema_root):
+        path = schema_root / f"openapi-v{settings.VERSION}.json"
+        path.write_bytes(b"{}")
+        with pytest.raises(CommandError):
+            call_command('generate_openapi_schema', '--check')
+
+        call_command('generate_openapi_schema')
+        call_command('generate_openapi_schema', '--check')
+
+    def test_ui_loads_the_prebuilt_schema(self, client, schema_url, monkeypatch):
+        from drf_yasg.generators import OpenAPISchemaGenerator
+        calls = []
+        get_schema = OpenAPISchemaGenerator.get_schema
+        monkeypatch.setattr(OpenAPISchemaGenerator, 'get_schema', lambda *args, **kwargs: calls.append(1) or get_schema(*args, **kwargs))
+
+        responses = [client.get(f"/api/v{settings.VERSION}/swagger/") for _ in range(3)]
+
+        assert [response.status_code for response in responses] == [200] * 3
+        assert schema_url in responses[0].content.decode()
+        assert "Nabaat Shop API" in responses[0].content.decode()
+        assert calls == []
@@ -0,0 +1,58 @@
+import json
+from decimal import Decimal
+from django.conf import settings
+from rest_framework.response import Response
+from core import messages, renderers
+from core.renderers import EnvelopeJSONRenderer
+
+
+def render(data, status=200):
+    return EnvelopeJSONRenderer().render(data, "application/json", {"response": Response(data, status=status)})
+
+
+class TestEnvelopeJSONRenderer:
+    def test_list_data_is_wrapped(self):
+        body = json.loads(render([{"id": 1, "price": Decimal("1000")}]))
+
+        assert body == {
+            "status": 200,
+            "is_success": True,
+            "message": messages.SUCCESS,
+            "data": [{"id": 1, "price": 1000}],
+            "errors": None,
+        }
+
+    def test_message_key_replaces_the_default_message(self):
+        data = {"message": "Hello", "id": 1}
+
+        body = json.loads(render(data))
+
+        assert body["message"] == "Hello"
+        assert body["data"] == {"id": 1}
+        assert data == {"message": "Hello", "id": 1}
+
+    def test_errors_and_empty_responses(self):
+        body = json.loads(render({"detail": "Not found."}, status=404))
+
+        assert body["is_success"] is False
+        assert body["message"] == messages.NOT_FOUND
+        assert body["errors"] == {"detail": "Not found."}
+        assert render(None, status=204) == b""
+
+    def test_stdlib_fallback_renders_the_same(self, monkeypatch):
+        data = {"name": "کاکتوس", "price": Decimal("1500"), 3: [1, 2]}
+        fast = json.loads(render(data))
+        monkeypatch.setattr(renderers, "orjson", None)
+
+        assert json.loads(render(data)) == fast
+
+    def test_enabled_for_the_api(self, api_client):
+        response = api_client.get(f"/api/v{settings.VERSION}/hello-world")
+
+        assert response.json() == {
+            "status": 200,
+            "is_success": True,
+            "message": "Hello, world!!",
+            "data": {},
+            "errors": None,
+        }
@@ -0,0 +1,112 @@
+from types import SimpleNamespace
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory
+from model_bakery import baker
+from core import routers
+from core.cache import bump_versions, get_versions, use_primary_if_changed
+from core.middleware.replicas import ReplicaStickinessMiddleware
+from core.routers import ReplicaRouter, replicas
+from store.models import Category, Product
+import pytest
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def replica(settings, monkeypatch):
+    settings.DATABASE_REPLICAS = ['replica_1']
+    lags = {'replica_1': 0}
+    monkeypatch.setattr(routers, 'measure_lag', lambda alias: lags[alias])
+    monkeypatch.setattr(routers, 'ensure_connection', lambda alias: None)
+    replicas.reset()
+    yield lags
+    replicas.reset()
+
+
+def serve(request, view=lambda request: None):
+    """Runs the request through the middleware, returns (response, the database of a Product read)."""
+    routed = {}
+
+    def get_response(request):
+        view(request)
+        routed['db'] = ReplicaRouter().db_for_read(Product)
+        return HttpResponse()
+
+    response = ReplicaStickinessMiddleware(get_response)(request)
+    return response, routed['db']
+
+
+# reads in a transaction always go to the primary, so the tests do not run in one
+@pytest.mark.django_db(transaction=True)
+class TestReplicaRouter:
+    def test_request_reads_go_to_healthy_replicas(self):
+        router = ReplicaRouter()
+
+        assert serve(RequestFactory().get('/'))[1] == 'replica_1'
+        assert serve(RequestFactory().post('/'))[1] == 'default'
+        assert router.db_for_read(Product) is None
+        assert router.db_for_read(User) is None
+
+    def test_lagging_replica_falls_back_to_the_primary(self, replica, settings):
+        replica['replica_1'] = settings.REPLICA_MAX_LAG + 1
+
+        assert serve(RequestFactory().get('/'))[1] == 'default'
+
+    def test_transactions_read_from_the_primary(self):
+        with transaction.atomic():
+            assert serve(RequestFactory().get('/'))[1] == 'default'
+
+    def test_writes_pin_the_client_and_the_user(self):
+        user = baker.make(User)
+
+        def write(request):
+            request.user = user
+            baker.make(Category)
+
+        response, db = serve(RequestFactory().get('/'), write)
+        assert db == 'default'
+
+        cookie = response.cookies[ReplicaStickinessMiddleware.cookie_name]
+        assert int(cookie['max-age']) == settings.REPLICA_STICKY_SECONDS
+        request = RequestFactory().get('/', HTTP_COOKIE=f"{cookie.key}={cookie.value}")
+        assert serve(request)[1] == 'default'
+
+        def authenticate(request):
+            request.user = user
+
+        assert serve(RequestFactory().get('/'), authenticate)[1] == 'default'
+        assert serve(RequestFactory().get('/'))[1] == 'replica_1'
+
+    def test_responses_of_recent_changes_are_built_from_the_primary(self, settings):
+        bump_versions('test.replicas')
+        versions = lambda request: use_primary_if_changed(get_versions(['test.replicas']))
+
+        assert serve(RequestFactory().get('/'), versions)[1] == 'default'
+        settings.REPLICA_MAX_LAG = 0
+        assert serve(RequestFactory().get('/'), versions)[1] == 'replica_1'
+
+    def test_unreachable_replica_is_dropped_for_the_primary(self, monkeypatch):
+        def refuse(alias):
+            raise OperationalError("timeout expired")
+        monkeypatch.setattr(routers, 'ensure_connection', refuse)
+
+        assert serve(RequestFactory().get('/'))[1] == 'default'
+        assert replicas.healthy == []
+
+    def test_request_failed_on_a_replica_is_served_from_the_primary(self):
+        attempts = []
+
+        def read(request):
+            attempts.append(ReplicaRouter().db_for_read(Product))
+            if len(attempts) == 1:
+                def execute(*args):
+                    raise OperationalError("server closed the connection unexpectedly")
+                with pytest.raises(OperationalError):
+                    routers.record_replica_error(execute, 'SELECT 1', None, False, {'connection': SimpleNamespace(alias='replica_1')})
+
+        assert serve(RequestFactory().get('/'), read)[1] == 'default'
+        assert attempts == ['replica_1', 'default']
+        assert replicas.healthy == []
@@ -6,5 +6,6 @@ from .views import *
 
 
 urlpatterns = [
-    path('hello-world',hello_world)
+    path('hello-world',hello_world),
+    path('db-pool-stats',db_pool_stats),
 ]
\ No newline at end of file
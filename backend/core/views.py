@@ -1,7 +1,21 @@
 from rest_framework.response import Response
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from django.db import connections
+import os
 
 
 @api_view(['GET'])
 def hello_world(request):
     return Response({"message": "Hello, world!!"})
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def db_pool_stats(request):
+    # the pools are per process, each worker answers with its own
+    pools = {
+        connection.alias: connection.get_pool().stats()
+        for connection in connections.all() if hasattr(connection, 'get_pool')
+    }
+    return Response({'pid': os.getpid(), 'pools': pools})
@@ -1,23 +1,99 @@
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
+import hashlib
+import logging
+import os
+import tempfile
+import threading
 from django.conf import settings
-from rest_framework_simplejwt.authentication import JWTAuthentication
-
-
-schema_view = get_schema_view(
-   openapi.Info(
-      title="Nabaat Shop API",
-      default_version= f"v{settings.VERSION}",
-      description="The Nabaat Shop API is a RESTful API that provides web services for the Nabaat Shop project.",
-      terms_of_service="https://nabaat-shop.ir",
-      contact=openapi.Contact(email="amirali.dst.lll@gmail.com"),
-      license=openapi.License(name="BSD License"),
-      x={
-         'security': [{'Bearer': []}],
-      },
-   ),
-   public=True,
-   permission_classes=(permissions.AllowAny,),
-   authentication_classes=(JWTAuthentication,),
-)
\ No newline at end of file
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+# drf_yasg is imported by the functions below only, so it does not slow down the workers boot
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_schema = {}
+
+
+def get_info():
+    from drf_yasg import openapi
+
+    return openapi.Info(
+        title="Nabaat Shop API",
+        default_version=f"v{settings.VERSION}",
+        description="The Nabaat Shop API is a RESTful API that provides web services for the Nabaat Shop project.",
+        terms_of_service="https://nabaat-shop.ir",
+        contact=openapi.Contact(email="amirali.dst.lll@gmail.com"),
+        license=openapi.License(name="BSD License"),
+        x={
+            'security': [{'Bearer': []}],
+        },
+    )
+
+
+def get_schema_path():
+    return os.path.join(settings.OPENAPI_SCHEMA_ROOT, f"openapi-v{settings.VERSION}.json")
+
+
+def generate_schema():
+    """Returns the OpenAPI schema of every endpoint as JSON bytes."""
+    from drf_yasg.codecs import OpenAPICodecJson
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    generator = OpenAPISchemaGenerator(get_info(), f"v{settings.VERSION}", url=settings.OPENAPI_BASE_URL)
+    return OpenAPICodecJson(validators=[]).encode(generator.get_schema(request=None, public=True))
+
+
+def write_schema(content, path=None):
+    # written next to the target and renamed, readers never see a partial file
+    path = path or get_schema_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as file:
+        file.write(content)
+    os.replace(file.name, path)
+
+
+def get_schema():
+    """
+    Returns (content, etag) of the schema artifact of settings.VERSION, kept in the process.
+    Without an artifact (generate_openapi_schema was not run) the first request generates it.
+    """
+    path = get_schema_path()
+    if path not in _schema:
+        with _lock:
+            if path not in _schema:
+                try:
+                    with open(path, 'rb') as file:
+                        content = file.read()
+                except FileNotFoundError:
+                    content = generate_schema()
+                    try:
+                        write_schema(content, path)
+                    except OSError:
+                        logger.warning("Could not write the OpenAPI schema to %s", path, exc_info=True)
+                _schema[path] = (content, quote_etag(hashlib.md5(content).hexdigest()))
+    return _schema[path]
+
+
+def openapi_schema(request):
+    content, etag = get_schema()
+    response = get_conditional_response(request, etag)
+    if response is None:
+        response = HttpResponse(content, content_type='application/json')
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=settings.OPENAPI_SCHEMA_MAX_AGE)
+    return response
+
+
+def swagger_ui(request):
+    # the page only holds the UI, the schema is loaded from openapi_schema, so drf_yasg's
+    # SchemaView (and its schema generation on every hit) is not involved
+    from drf_yasg.renderers import SwaggerUIRenderer
+
+    renderer = SwaggerUIRenderer()
+    context = {'request': request}
+    renderer.set_context(context)
+    context.update(title=get_info().title, version=f"v{settings.VERSION}")
+    return HttpResponse(render_to_string(renderer.template, context, request))
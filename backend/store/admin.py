@@ -1,6 +1,7 @@
 from django.contrib import admin
 from .models import *
 from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
 
 @admin.register(Accessory)
 class AccessoryAdmin(admin.ModelAdmin):
@@ -33,10 +34,12 @@ class ProductImageInline(admin.StackedInline):
 class ReviewInline(admin.StackedInline):
     model = Review
     extra = 0
+    raw_id_fields = ['user']
 
 class RateInline(admin.StackedInline):
     model = Rate
     extra = 0
+    raw_id_fields = ['user']
 
 class OrderItemInline(admin.StackedInline):
     model = OrderItem
@@ -58,36 +61,57 @@ class OrderPaymentImageInline(admin.StackedInline):
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ['name', 'price', 'cost', 'stock' ,'created_at', 'updated_at']
+    list_display = ['name', 'price', 'cost', 'available_stock' ,'created_at', 'updated_at']
     search_fields = ['name']
     list_filter = ['categories' ,'plants', 'accessories']
-    readonly_fields = ['cost', 'stock']
+    readonly_fields = ['cost', 'available_stock']
     inlines = [ProductImageInline, ReviewInline, RateInline]
-    
-    def cost(self, obj):
-        return obj.get_cost()
-    
-    def stock(self, obj):
-        return obj.get_stock()
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ['id', 'customer', 'total_price', 'status', 'created_at', 'updated_at']
+    list_display = ['id', 'customer', 'total_price', 'margin', 'status', 'created_at', 'updated_at']
+    list_select_related = ['customer']
     search_fields = ['customer__first_name', 'customer__last_name', 'customer__email', 'customer__phone_number']
     list_filter = ['status']
     inlines = [OrderItemInline, OrderPaymentImageInline, AddressInline]
     autocomplete_fields = ['customer']
-    readonly_fields = ['total_price', 'total_cost']
-    
-    def total_price(self, obj):
-        return obj.get_total_price()
-    
-    def total_cost(self, obj):
-        return obj.get_total_cost()
+    readonly_fields = ['total_price', 'total_cost', 'margin']
     
+    @admin.display(description=_('Margin'), ordering='margin')
+    def margin(self, obj):
+        if hasattr(obj, 'margin'):
+            return obj.margin
+        return obj.get_margin()
+
 
     def get_queryset(self, request):
-        qs = super().get_queryset(request)
+        qs = super().get_queryset(request).with_margin()
         if request.user.is_superuser:
             return qs
-        return qs.filter(Q(support=request.user) | Q(support__isnull=True))
\ No newline at end of file
+        return qs.filter(Q(support=request.user) | Q(support__isnull=True))
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ['token', 'product', 'quantity', 'status', 'expires_at', 'created_at']
+    list_select_related = ['product']
+    list_filter = ['status']
+    readonly_fields = ['token', 'product', 'order_item', 'quantity', 'plants', 'accessories', 'status', 'expires_at']
+
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ['id', 'plant', 'accessory', 'delta', 'reason', 'order', 'created_at']
+    list_select_related = ['plant', 'accessory']
+    list_filter = ['reason']
+    raw_id_fields = ['plant', 'accessory', 'order', 'order_item']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,39 @@
+import threading
+import time
+from django.conf import settings
+from .models import Category
+
+
+_lock = threading.Lock()
+_cache = {'expires_at': 0, 'tree': None}
+
+
+def build_category_tree():
+    nodes = {}
+    roots = []
+    categories = Category.objects.order_by('depth', 'name').values('id', 'name', 'path', 'parent_category_id')
+    for category in categories:
+        node = nodes[category['id']] = {'id': category['id'], 'name': category['name'], 'path': category['path'], 'children': []}
+        parent = nodes.get(category['parent_category_id'])
+        (parent['children'] if parent else roots).append(node)
+    return roots
+
+
+def get_category_tree():
+    """
+    The category tree for menus, built with one query and cached in the process.
+    Changes made in this process clear it right away, other processes pick them up
+    after CATEGORY_TREE_CACHE_TIMEOUT seconds.
+    """
+    tree = _cache['tree']
+    if tree is not None and _cache['expires_at'] > time.monotonic():
+        return tree
+    with _lock:
+        if _cache['tree'] is None or _cache['expires_at'] <= time.monotonic():
+            _cache['tree'] = build_category_tree()
+            _cache['expires_at'] = time.monotonic() + settings.CATEGORY_TREE_CACHE_TIMEOUT
+        return _cache['tree']
+
+
+def clear_category_tree():
+    _cache['tree'] = None
@@ -0,0 +1,12 @@
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext_lazy as _
+
+
+class OutOfStockError(ValidationError):
+    def __init__(self, components=()):
+        self.components = list(components)
+        super().__init__(
+            _('Not enough stock for: %(components)s'),
+            code='out_of_stock',
+            params={'components': ', '.join(str(component) for component in self.components)},
+        )
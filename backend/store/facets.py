@@ -0,0 +1,172 @@
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from django.conf import settings
+from .models import Category, Product
+
+
+def bitmap_from_ids(ids, size):
+    # a bytearray is much cheaper than or-ing ints one bit at a time
+    buffer = bytearray(size // 8 + 1)
+    for pk in ids:
+        buffer[pk >> 3] |= 1 << (pk & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def iter_bitmap_desc(bitmap):
+    while bitmap:
+        pk = bitmap.bit_length() - 1
+        yield pk
+        bitmap ^= 1 << pk
+
+
+class FacetIndex:
+    """
+    Posting lists of product ids per facet value, stored as int bitmaps (bit n = product n).
+    A category posting holds the products of the category and of its sub categories.
+    Filtering and counting are AND/OR and popcount over the bitmaps, without any query.
+    """
+    FACETS = ['category', 'plant', 'accessory']
+
+    def __init__(self):
+        self.postings = {facet: defaultdict(int) for facet in self.FACETS}
+        self.prices = {}
+        self.products = 0
+        self.size = 0
+        self.category_paths = {}
+
+    @classmethod
+    def build(cls):
+        index = cls()
+        index.category_paths = dict(Category.objects.values_list('pk', 'path'))
+        index.prices = {pk: int(price) for pk, price in Product.objects.values_list('pk', 'price')}
+        index.size = max(index.prices, default=0) + 1
+        index.products = bitmap_from_ids(index.prices, index.size)
+        for facet in cls.FACETS:
+            members = defaultdict(list)
+            for product_id, value in index.get_links(facet):
+                for member in index.expand(facet, value):
+                    members[member].append(product_id)
+            for value, product_ids in members.items():
+                index.postings[facet][value] = bitmap_from_ids(product_ids, index.size)
+        index.sort_prices()
+        return index
+
+    def get_links(self, facet, product_ids=None):
+        field = {'category': 'categories', 'plant': 'plants', 'accessory': 'accessories'}[facet]
+        links = getattr(Product, field).through.objects.all()
+        if product_ids is not None:
+            links = links.filter(product_id__in=product_ids)
+        return links.values_list('product_id', f'{facet}_id')
+
+    def expand(self, facet, value):
+        if facet != 'category':
+            return [value]
+        path = self.category_paths.get(value, f'/{value}/')
+        return [int(pk) for pk in path.strip('/').split('/')]
+
+    def sort_prices(self):
+        self.sorted_prices = sorted((price, pk) for pk, price in self.prices.items())
+        self.price_keys = [price for price, pk in self.sorted_prices]
+
+    def update_products(self, product_ids):
+        """Re-reads the price and links of the products, e.g. after a save or an m2m change."""
+        product_ids = set(product_ids)
+        prices = dict(Product.objects.filter(pk__in=product_ids).values_list('pk', 'price'))
+        links = {facet: list(self.get_links(facet, product_ids)) for facet in self.FACETS}
+
+        self.size = max(self.size, max(product_ids, default=0) + 1)
+        mask = bitmap_from_ids(product_ids, self.size)
+        self.products &= ~mask
+        for facet in self.FACETS:
+            for value in list(self.postings[facet]):
+                self.postings[facet][value] &= ~mask
+        for pk in product_ids:
+            self.prices.pop(pk, None)
+
+        for pk, price in prices.items():
+            self.prices[pk] = int(price)
+            self.products |= 1 << pk
+        for facet, rows in links.items():
+            for product_id, value in rows:
+                for member in self.expand(facet, value):
+                    self.postings[facet][member] |= 1 << product_id
+        self.sort_prices()
+
+    def price_bitmap(self, min_price=None, max_price=None):
+        if min_price is None and max_price is None:
+            return self.products
+        start = bisect_left(self.price_keys, min_price) if min_price is not None else 0
+        end = bisect_right(self.price_keys, max_price) if max_price is not None else len(self.price_keys)
+        return bitmap_from_ids((pk for price, pk in self.sorted_prices[start:end]), self.size)
+
+    def search(self, selected=None, min_price=None, max_price=None):
+        """
+        Returns the bitmap of the matching products and the counts of every facet value.
+        Values of a facet are OR-ed, facets are AND-ed, and the counts of a facet ignore
+        its own selection so the other values of that facet keep a meaningful count.
+        """
+        selected = {facet: values for facet, values in (selected or {}).items() if values}
+        base = self.products & self.price_bitmap(min_price, max_price)
+        filters = {}
+        for facet, values in selected.items():
+            bitmap = 0
+            for value in values:
+                bitmap |= self.postings[facet].get(value, 0)
+            filters[facet] = bitmap
+
+        result = base
+        for bitmap in filters.values():
+            result &= bitmap
+
+        counts = {}
+        for facet in self.FACETS:
+            scope = base
+            for other, bitmap in filters.items():
+                if other != facet:
+                    scope &= bitmap
+            counts[facet] = {
+                value: count for value, bitmap in self.postings[facet].items()
+                if (count := (bitmap & scope).bit_count())
+            }
+        return result, counts
+
+
+_lock = threading.RLock()
+_index = {'index': None, 'expires_at': 0}
+
+
+def get_facet_index():
+    """
+    The process wide facet index. Changes made in this process are applied incrementally,
+    other processes' changes show up after FACET_INDEX_TIMEOUT seconds when it is rebuilt.
+    """
+    with _lock:
+        if _index['index'] is None or _index['expires_at'] <= time.monotonic():
+            _index['index'] = FacetIndex.build()
+            _index['expires_at'] = time.monotonic() + settings.FACET_INDEX_TIMEOUT
+        return _index['index']
+
+
+def search_facets(selected=None, min_price=None, max_price=None, limit=20):
+    """Returns the number of matches, the ids of the newest `limit` ones and the facet counts."""
+    with _lock:
+        result, counts = get_facet_index().search(selected, min_price, max_price)
+    product_ids = []
+    for pk in iter_bitmap_desc(result):
+        if len(product_ids) == limit:
+            break
+        product_ids.append(pk)
+    return result.bit_count(), product_ids, counts
+
+
+def update_facet_index(product_ids):
+    with _lock:
+        if _index['index'] is not None and product_ids:
+            _index['index'].update_products(product_ids)
+
+
+def clear_facet_index():
+    with _lock:
+        _index['index'] = None
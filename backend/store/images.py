@@ -0,0 +1,134 @@
+import io
+import logging
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections
+from PIL import Image, ImageOps
+from .models import ProductImage, bump_product_versions
+
+logger = logging.getLogger(__name__)
+
+# Pillow format of each variant format, in the order browsers should prefer them
+FORMATS = {
+    'avif': 'AVIF',
+    'webp': 'WEBP',
+    'jpeg': 'JPEG',
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+_store_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-variants')
+
+
+def get_variant_formats():
+    # AVIF needs a Pillow built with it (or pillow-avif-plugin), the others are always there
+    Image.init()
+    return [fmt for fmt in settings.IMAGE_VARIANT_FORMATS if FORMATS.get(fmt) in Image.SAVE]
+
+
+def render_variants(data, widths, formats, quality):
+    """
+    Resizes the original image bytes to every width (never upscaled) in every format.
+    Runs in the worker processes, so it only gets and returns plain bytes.
+    Returns [(width, format, bytes)].
+    """
+    with Image.open(io.BytesIO(data)) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ('RGB', 'RGBA'):
+            original = original.convert('RGBA' if 'A' in original.getbands() else 'RGB')
+
+        variants = []
+        for width in sorted({min(width, original.width) for width in widths}):
+            height = max(1, round(original.height * width / original.width))
+            resized = original.resize((width, height), Image.LANCZOS) if width != original.width else original
+            for fmt in formats:
+                image = resized.convert('RGB') if fmt == 'jpeg' and resized.mode != 'RGB' else resized
+                buffer = io.BytesIO()
+                image.save(buffer, FORMATS[fmt], quality=quality, optimize=fmt == 'jpeg')
+                variants.append((width, fmt, buffer.getvalue()))
+        return variants
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=settings.IMAGE_VARIANT_WORKERS)
+        return _executor
+
+
+def variant_name(name, width, fmt):
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return f"{os.path.dirname(name)}/variants/{stem}-{width}w.{fmt}"
+
+
+def store_variants(product_image, rendered):
+    """Saves the rendered variants through the image storage and records them on the model."""
+    storage = product_image.image.storage
+    variants = []
+    for width, fmt, data in rendered:
+        name = variant_name(product_image.image.name, width, fmt)
+        variants.append({'width': width, 'format': fmt, 'name': storage.save(name, ContentFile(data)), 'size': len(data)})
+
+    # the image may have been replaced while the variants were rendered
+    updated = ProductImage.objects.filter(pk=product_image.pk, image=product_image.image.name).update(variants=variants)
+    if updated:
+        bump_product_versions([product_image.product_id])
+    # every save took a new name or reference, so the replaced variants are always released
+    delete_variants(product_image.variants if updated else variants, storage)
+    return variants if updated else []
+
+
+def delete_variants(variants, storage):
+    for variant in variants:
+        storage.delete(variant['name'])
+
+
+def generate_variants(product_image):
+    """
+    Renders the variants of the image in the process pool and stores them when they are done.
+    Returns a Future of the stored variants, with IMAGE_VARIANT_WORKERS = 0 the work is done inline.
+    """
+    future = Future()
+    if not product_image.image:
+        future.set_result([])
+        return future
+
+    with product_image.image.open('rb') as file:
+        data = file.read()
+    args = (data, settings.IMAGE_VARIANT_WIDTHS, get_variant_formats(), settings.IMAGE_VARIANT_QUALITY)
+
+    if not settings.IMAGE_VARIANT_WORKERS:
+        future.set_result(store_variants(product_image, render_variants(*args)))
+        return future
+
+    def store(rendering):
+        try:
+            future.set_result(store_variants(product_image, rendering.result()))
+        except Exception as error:
+            logger.exception("Generating the variants of product image %s failed", product_image.pk)
+            future.set_exception(error)
+        finally:
+            # the storing thread opened its own database connection
+            connections.close_all()
+
+    # done callbacks run on the pool's management thread, the storage and database work is handed off
+    get_executor().submit(render_variants, *args).add_done_callback(
+        lambda rendering: _store_executor.submit(store, rendering)
+    )
+    return future
+
+
+def get_srcset(product_image, build_url=None):
+    """Returns {format: srcset} of the recorded variants, e.g. {'webp': 'a-160w.webp 160w, ...'}."""
+    storage = product_image.image.storage
+    srcset = {}
+    for variant in sorted(product_image.variants, key=lambda variant: variant['width']):
+        url = storage.url(variant['name'])
+        if build_url is not None:
+            url = build_url(url)
+        srcset.setdefault(variant['format'], []).append(f"{url} {variant['width']}w")
+    return {fmt: ', '.join(candidates) for fmt, candidates in srcset.items()}
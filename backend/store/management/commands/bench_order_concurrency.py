@@ -0,0 +1,64 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from store.exceptions import OutOfStockError
+from store.models import Accessory, Order, OrderItem, Plant, Product
+
+
+class Command(BaseCommand):
+    help = "Submit parallel orders against one hot product and report throughput and oversell"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--orders', type=int, default=200, help="Total number of submitted orders")
+        parser.add_argument('--stock', type=int, default=100, help="Initial stock of the hot product")
+        parser.add_argument('--quantity', type=int, default=1, help="Quantity of each order")
+
+    def handle(self, *args, **options):
+        plant = Plant.objects.create(name='bench plant', cost=1, stock=options['stock'])
+        accessory = Accessory.objects.create(name='bench accessory', cost=1, stock=options['stock'])
+        product = Product.objects.create(name='bench product', price=10)
+        product.plants.add(plant)
+        product.accessories.add(accessory)
+        order_ids = []
+
+        def submit(_):
+            try:
+                with transaction.atomic():
+                    order = Order.objects.create(status=Order.STATUS_PAYMENT_COMPLETED)
+                    OrderItem.objects.create(order=order, product=product, quantity=options['quantity'])
+                order_ids.append(order.pk)
+                return 'accepted'
+            except OutOfStockError:
+                return 'rejected'
+            except Exception:
+                return 'errors'
+            finally:
+                connection.close()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            results = list(executor.map(submit, range(options['orders'])))
+        elapsed = time.perf_counter() - start
+
+        plant.refresh_from_db()
+        accessory.refresh_from_db()
+        accepted = results.count('accepted')
+        sold = accepted * options['quantity']
+        oversell = max(0, sold - options['stock'], -min(plant.stock, accessory.stock))
+
+        self.stdout.write(f"workers:    {options['workers']}")
+        self.stdout.write(f"orders:     {options['orders']} in {elapsed:.3f}s ({options['orders'] / elapsed:.1f} orders/s)")
+        self.stdout.write(f"accepted:   {accepted}")
+        self.stdout.write(f"rejected:   {results.count('rejected')}")
+        self.stdout.write(f"errors:     {results.count('errors')}")
+        self.stdout.write(f"stock left: plant={plant.stock} accessory={accessory.stock}")
+        style = self.style.ERROR if oversell else self.style.SUCCESS
+        self.stdout.write(style(f"oversell:   {oversell}"))
+
+        # order items are removed with the orders without giving the stock back
+        Order.objects.filter(pk__in=order_ids).delete()
+        product.delete()
+        plant.delete()
+        accessory.delete()
@@ -0,0 +1,19 @@
+import time
+from django.core.management.base import BaseCommand
+from store.models import StockReservation
+
+
+class Command(BaseCommand):
+    help = "Release the expired stock reservations and fail the orders waiting for them"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--loop', type=int, default=0, metavar='SECONDS', help="Keep sweeping every SECONDS seconds")
+
+    def handle(self, *args, **options):
+        while True:
+            expired = StockReservation.objects.expire(batch_size=options['batch_size'])
+            self.stdout.write(f"{expired} reservation(s) expired")
+            if not options['loop']:
+                return
+            time.sleep(options['loop'])
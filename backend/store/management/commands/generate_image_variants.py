@@ -0,0 +1,32 @@
+from concurrent.futures import wait
+from django.core.management.base import BaseCommand
+from store.images import generate_variants
+from store.models import ProductImage
+
+
+class Command(BaseCommand):
+    help = "Render the resized variants of the product images that have none yet"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Render the variants of every image again")
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        images = ProductImage.objects.exclude(image='').order_by('pk')
+        if not options['all']:
+            images = images.filter(variants=[])
+
+        failed = 0
+        batch_size = options['batch_size']
+        ids = list(images.values_list('pk', flat=True))
+        for start in range(0, len(ids), batch_size):
+            futures = []
+            for image in ProductImage.objects.filter(pk__in=ids[start:start + batch_size]):
+                try:
+                    futures.append(generate_variants(image))
+                except OSError as error:
+                    self.stderr.write(f"Image #{image.pk} can not be read: {error}")
+                    failed += 1
+            wait(futures)
+            failed += sum(future.exception() is not None for future in futures)
+        self.stdout.write(f"{len(ids) - failed} image(s) rendered, {failed} failed")
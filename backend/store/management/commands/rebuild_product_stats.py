@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized cost and available_stock of products and report the drifted ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Only report the drift, exit with an error if any is found")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        drifted_ids = list(
+            Product.objects.with_computed_stats()
+            .exclude(cost=F('computed_cost'), available_stock=F('computed_stock'))
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        self.stdout.write(f"{len(drifted_ids)} drifted product(s) found")
+
+        if options['check']:
+            if drifted_ids:
+                raise CommandError(f"Product stats drifted for ids: {drifted_ids[:20]}")
+            return
+
+        for start in range(0, len(drifted_ids), batch_size):
+            with transaction.atomic():
+                Product.objects.filter(pk__in=drifted_ids[start:start + batch_size]).refresh_stats()
+        self.stdout.write(self.style.SUCCESS(f"{len(drifted_ids)} product(s) rebuilt"))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F, Q
+from store.models import Product, Rate
+
+
+class Command(BaseCommand):
+    help = "Rebuild the rating summary of products from their rates and report the drifted ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Only report the drift, exit with an error if any is found")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        stats = Product.objects.computed_rating_stats()
+        # the average is derived from count and sum, comparing the counters is enough
+        fields = ['rating_count', 'rating_sum'] + [f'rating_{value}' for value in Rate.VALUES]
+        drift = Q()
+        for field in fields:
+            drift |= ~Q(**{field: F(f'computed_{field}')})
+        drifted_ids = list(
+            Product.objects.annotate(**{f'computed_{field}': stats[field] for field in fields})
+            .filter(drift)
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        self.stdout.write(f"{len(drifted_ids)} drifted product(s) found")
+
+        if options['check']:
+            if drifted_ids:
+                raise CommandError(f"Rating stats drifted for ids: {drifted_ids[:20]}")
+            return
+
+        for start in range(0, len(drifted_ids), batch_size):
+            with transaction.atomic():
+                Product.objects.filter(pk__in=drifted_ids[start:start + batch_size]).refresh_rating_stats()
+        self.stdout.write(self.style.SUCCESS(f"{len(drifted_ids)} product(s) rebuilt"))
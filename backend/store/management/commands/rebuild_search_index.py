@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from store.models import Product
+from store.search import index_products
+
+
+class Command(BaseCommand):
+    help = "Rebuild the search document and the search index of all products"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        product_ids = list(Product.objects.order_by('pk').values_list('pk', flat=True))
+        index_products(product_ids, batch_size=options['batch_size'], force=True)
+        self.stdout.write(self.style.SUCCESS(f"{len(product_ids)} product(s) indexed"))
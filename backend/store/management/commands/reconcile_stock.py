@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from store.models import Accessory, Plant, StockMovement
+
+
+class Command(BaseCommand):
+    help = "Compare the stock of the plants and accessories with their ledger and record the drift as adjustments"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Only report the drift, exit with an error if any is found")
+
+    def handle(self, *args, **options):
+        drifted = {}
+        for model in (Plant, Accessory):
+            rows = list(
+                model.objects.with_ledger_stock()
+                .exclude(stock=F('ledger_stock'))
+                .order_by('pk')
+                .values_list('pk', 'stock', 'ledger_stock')
+            )
+            self.stdout.write(f"{len(rows)} drifted {model._meta.verbose_name_plural} found")
+            for pk, stock, ledger_stock in rows[:20]:
+                self.stdout.write(f"  #{pk}: stock {stock}, ledger {ledger_stock}")
+            if rows:
+                drifted[model] = {pk: stock - ledger_stock for pk, stock, ledger_stock in rows}
+
+        if options['check']:
+            if drifted:
+                raise CommandError("Stock drifted from the ledger")
+            return
+
+        # the stock column guards the sales, so the ledger is brought in line with it
+        with transaction.atomic():
+            for model, changes in drifted.items():
+                StockMovement.objects.record(model, changes, reason=StockMovement.REASON_ADJUSTMENT)
+        self.stdout.write(self.style.SUCCESS(f"{sum(map(len, drifted.values()))} component(s) reconciled"))
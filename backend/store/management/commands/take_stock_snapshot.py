@@ -0,0 +1,35 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from store.models import Accessory, Plant, StockMovement
+
+
+class Command(BaseCommand):
+    help = "Snapshot the ledger stock of the plants and accessories, so the stock is rebuilt from the recent movements only"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lag', type=int, default=60, metavar='SECONDS',
+            help="Leave the movements of the last SECONDS to the next snapshot, they may still be committing",
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        taken_at = timezone.now() - timedelta(seconds=options['lag'])
+        until = (
+            StockMovement.objects.filter(created_at__lte=taken_at)
+            .order_by('-pk').values_list('pk', flat=True).first()
+        )
+        if until is None:
+            self.stdout.write("No stock movements to snapshot")
+            return
+
+        batch_size = options['batch_size']
+        for model in (Plant, Accessory):
+            ids = list(model.objects.order_by('pk').values_list('pk', flat=True))
+            taken = 0
+            for start in range(0, len(ids), batch_size):
+                with transaction.atomic():
+                    taken += len(model.objects.filter(pk__in=ids[start:start + batch_size]).take_snapshots(until, taken_at))
+            self.stdout.write(f"{taken} {model._meta.verbose_name_plural} snapshot(s) taken up to movement {until}")
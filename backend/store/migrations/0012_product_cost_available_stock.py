@@ -0,0 +1,33 @@
+# Generated by Django 5.0.2 on 2026-10-18 12:59
+
+from django.db import migrations, models
+
+
+def populate_product_stats(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    for product in Product.objects.prefetch_related('plants', 'accessories').iterator(chunk_size=500):
+        components = list(product.plants.all()) + list(product.accessories.all())
+        product.cost = sum(component.cost for component in components)
+        product.available_stock = min((component.stock for component in components), default=0)
+        product.save(update_fields=['cost', 'available_stock'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0011_alter_customer_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='available_stock',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='cost',
+            field=models.DecimalField(decimal_places=0, default=0, editable=False, max_digits=11),
+        ),
+        migrations.RunPython(populate_product_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.0.2 on 2026-10-18 13:01
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_order_totals(apps, schema_editor):
+    Order = apps.get_model('store', 'Order')
+    OrderItem = apps.get_model('store', 'OrderItem')
+
+    def items_total(field):
+        return Coalesce(
+            Subquery(
+                OrderItem.objects.filter(order=OuterRef('pk'))
+                .order_by()
+                .values('order')
+                .annotate(total=Sum(F(field) * F('quantity')))
+                .values('total')
+            ),
+            Value(0),
+            output_field=models.DecimalField(max_digits=14, decimal_places=0),
+        )
+
+    Order.objects.update(total_price=items_total('unit_price'), total_cost=items_total('unit_cost'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0012_product_cost_available_stock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='total_cost',
+            field=models.DecimalField(decimal_places=0, default=0, editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total_price',
+            field=models.DecimalField(db_index=True, decimal_places=0, default=0, editable=False, max_digits=14),
+        ),
+        migrations.RunPython(populate_order_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.2 on 2026-10-18 13:02
+
+from django.db import migrations, models
+
+
+def populate_category_paths(apps, schema_editor):
+    Category = apps.get_model('store', 'Category')
+    children = {}
+    for category in Category.objects.all():
+        children.setdefault(category.parent_category_id, []).append(category)
+
+    stack = [(category, '/', 0) for category in children.get(None, [])]
+    while stack:
+        category, parent_path, depth = stack.pop()
+        category.path = f"{parent_path}{category.pk}/"
+        category.depth = depth
+        category.save(update_fields=['path', 'depth'])
+        stack.extend((child, category.path, depth + 1) for child in children.get(category.pk, []))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0013_order_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(populate_category_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.0.2 on 2026-10-18 13:05
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX store_product_search_vector_idx ON store_product USING gin (search_vector)'
+        )
+    elif schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE store_product_fts USING fts5("
+            "search_document, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS store_product_search_vector_idx')
+    elif schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS store_product_fts')
+
+
+def populate_search_index(apps, schema_editor):
+    from store.search import build_search_document
+
+    Product = apps.get_model('store', 'Product')
+    products = Product.objects.prefetch_related('categories', 'plants', 'accessories')
+    for product in products.iterator(chunk_size=500):
+        product.search_document = build_search_document(product)
+        product.save(update_fields=['search_document'])
+
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("UPDATE store_product SET search_vector = to_tsvector('simple', search_document)")
+    elif schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(
+            'INSERT INTO store_product_fts (rowid, search_document) SELECT id, search_document FROM store_product'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0015_product_created_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_document',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(populate_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.0.2 on 2026-10-18 13:07
+
+import django.core.validators
+from django.db import migrations, models
+from collections import defaultdict
+
+
+def populate_rating_summary(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    Rate = apps.get_model('store', 'Rate')
+    histograms = defaultdict(dict)
+    rates = Rate.objects.order_by().values_list('product_id', 'value').annotate(count=models.Count('pk'))
+    for product_id, value, count in rates:
+        histograms[product_id][value] = count
+
+    for product_id, histogram in histograms.items():
+        rating_count = sum(histogram.values())
+        rating_sum = sum(value * count for value, count in histogram.items())
+        Product.objects.filter(pk=product_id).update(
+            rating_count=rating_count,
+            rating_sum=rating_sum,
+            rating_average=rating_sum / rating_count,
+            **{f'rating_{value}': histogram.get(value, 0) for value in range(1, 6)},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0016_product_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_1',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_2',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_3',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_4',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_5',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_average',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='rate',
+            name='value',
+            field=models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)]),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-rating_average', '-rating_count'], name='store_product_rating_idx'),
+        ),
+        migrations.RunPython(populate_rating_summary, migrations.RunPython.noop),
+    ]
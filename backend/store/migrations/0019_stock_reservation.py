@@ -0,0 +1,44 @@
+# Generated by Django 5.0.2 on 2026-10-18 13:10
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0018_review_product_feed_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accessory',
+            name='reserved',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='plant',
+            name='reserved',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('status', models.CharField(choices=[('A', 'Active'), ('C', 'Committed'), ('R', 'Released'), ('E', 'Expired')], default='A', max_length=1)),
+                ('quantity', models.PositiveIntegerField()),
+                ('plants', models.JSONField(default=list)),
+                ('accessories', models.JSONField(default=list)),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('order_item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reservations', to='store.orderitem')),
+                ('product', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reservations', to='store.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'expires_at'], name='store_reservation_expiry_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.0.2 on 2026-10-18 13:16
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def open_stock_ledger(apps, schema_editor):
+    # the current stock is the opening snapshot, every later change is a movement
+    StockSnapshot = apps.get_model('store', 'StockSnapshot')
+    for model_name in ('plant', 'accessory'):
+        model = apps.get_model('store', model_name)
+        StockSnapshot.objects.bulk_create(
+            [StockSnapshot(**{f'{model_name}_id': pk}, stock=stock) for pk, stock in model.objects.values_list('pk', 'stock')],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0019_stock_reservation'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='accessory',
+            name='stock',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='plant',
+            name='stock',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stock', models.IntegerField()),
+                ('movement_id', models.BigIntegerField(default=0)),
+                ('taken_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('accessory', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='store.accessory')),
+                ('plant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='store.plant')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.IntegerField()),
+                ('reason', models.CharField(choices=[('O', 'Order'), ('R', 'Return'), ('A', 'Adjustment'), ('S', 'Restock')], max_length=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('accessory', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='store.accessory')),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='store.order')),
+                ('order_item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='store.orderitem')),
+                ('plant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='store.plant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['plant', 'id'], name='store_movement_plant_idx'), models.Index(fields=['accessory', 'id'], name='store_movement_accessory_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='stockmovement',
+            constraint=models.CheckConstraint(check=models.Q(('plant__isnull', True), ('accessory__isnull', True), _connector='XOR'), name='store_movement_one_component'),
+        ),
+        migrations.AddIndex(
+            model_name='stocksnapshot',
+            index=models.Index(fields=['plant', '-movement_id'], name='store_snapshot_plant_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocksnapshot',
+            index=models.Index(fields=['accessory', '-movement_id'], name='store_snapshot_accessory_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='stocksnapshot',
+            constraint=models.CheckConstraint(check=models.Q(('plant__isnull', True), ('accessory__isnull', True), _connector='XOR'), name='store_snapshot_one_component'),
+        ),
+        migrations.RunPython(open_stock_ledger, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,21 @@
 from django.db import models
-from django.db.models import Model
+from django.db.models import Model, F, Q, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Concat, Least, Substr
+from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models.lookups import IsNull
+from django.contrib.postgres.search import SearchVectorField
 from django.db import transaction
 from django.utils.translation import gettext,gettext_lazy as _
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.conf import settings
+from django.utils import timezone
+from collections import defaultdict
+from datetime import timedelta
+import uuid
+from core.cache import bump_versions
+from core.models import ImageChangeMixin
+from .exceptions import OutOfStockError
 User = get_user_model()
 
 
@@ -12,17 +25,168 @@ logger = logging.getLogger(__name__)
 
 
 
-class Accessory(Model):
+class ComponentQuerySet(models.QuerySet):
+    def _apply_changes(self, changes, guard, **fields):
+        """
+        Adds {component id: delta} to the given fields (name -> sign) with a single UPDATE.
+        Only the rows matching guard(delta) are updated, so concurrent orders can not take
+        more than there is, OutOfStockError is raised when any of the rows is short and
+        the caller's transaction should roll back.
+        """
+        changes = {pk: delta for pk, delta in changes.items() if delta}
+        if not changes:
+            return 0
+
+        condition = Q()
+        for pk, delta in changes.items():
+            condition |= Q(pk=pk) & guard(delta)
+
+        deltas = set(changes.values())
+        if len(deltas) == 1:
+            delta = Value(deltas.pop())
+        else:
+            delta = models.Case(
+                *[models.When(pk=pk, then=Value(delta)) for pk, delta in changes.items()],
+                output_field=models.IntegerField(),
+            )
+
+        updated = self.filter(condition).update(**{field: F(field) + sign * delta for field, sign in fields.items()})
+        if updated != len(changes):
+            raise OutOfStockError(self.filter(pk__in=changes.keys()).exclude(condition))
+        return updated
+
+    def apply_stock_changes(self, changes, **cause):
+        """
+        Sells (negative) or returns (positive) stock, a sale can not use reserved stock.
+        The changes are recorded in the StockMovement ledger with the given cause
+        (reason, order, order_item).
+        """
+        updated = self._apply_changes(
+            changes,
+            lambda delta: Q(stock__gte=F('reserved') - delta) if delta < 0 else Q(),
+            stock=1,
+        )
+        StockMovement.objects.record(self.model, changes, **cause)
+        return updated
+
+    def apply_reservation_changes(self, changes):
+        """Reserves (positive) or releases (negative) stock without selling it."""
+        return self._apply_changes(
+            changes,
+            lambda delta: Q(stock__gte=F('reserved') + delta) if delta > 0 else Q(reserved__gte=-delta),
+            reserved=1,
+        )
+
+    def commit_reserved_stock(self, changes):
+        """Sells stock that is already reserved, the caller records the movements."""
+        return self._apply_changes(changes, lambda delta: Q(reserved__gte=delta), stock=-1, reserved=-1)
+
+    def with_ledger_stock(self, at=None, until=None):
+        """
+        Annotates ledger_stock, the stock rebuilt from the latest StockSnapshot plus the
+        movements recorded after it, so only the movements since the snapshot are read.
+        `at` rebuilds the stock at a past moment, `until` ignores the later movement ids.
+        """
+        field = self.model._meta.model_name
+        snapshots = StockSnapshot.objects.filter(**{field: OuterRef('pk')}).order_by('-movement_id')
+        movements = StockMovement.objects.filter(**{field: OuterRef('pk')})
+        if at is not None:
+            snapshots = snapshots.filter(taken_at__lte=at)
+            movements = movements.filter(created_at__lte=at)
+        if until is not None:
+            snapshots = snapshots.filter(movement_id__lte=until)
+            movements = movements.filter(pk__lte=until)
+        movements = movements.filter(pk__gt=OuterRef('snapshot_movement_id'))
+        return self.annotate(
+            snapshot_movement_id=Coalesce(Subquery(snapshots.values('movement_id')[:1]), 0),
+            ledger_stock=(
+                Coalesce(Subquery(snapshots.values('stock')[:1]), 0)
+                + Coalesce(Subquery(movements.order_by().values(field).annotate(value=models.Sum('delta')).values('value')), 0)
+            ),
+        )
+
+    def take_snapshots(self, until, taken_at=None):
+        """Snapshots the ledger stock of the components moved since their last snapshot, up to the `until` movement id."""
+        field = self.model._meta.model_name
+        last_movement = StockMovement.objects.filter(**{field: OuterRef('pk'), 'pk__lte': until}).order_by('-pk')
+        rows = (
+            self.with_ledger_stock(until=until)
+            .annotate(last_movement_id=Subquery(last_movement.values('pk')[:1]))
+            .filter(last_movement_id__gt=F('snapshot_movement_id'))
+            .values_list('pk', 'ledger_stock')
+        )
+        taken_at = taken_at or timezone.now()
+        return StockSnapshot.objects.bulk_create([
+            StockSnapshot(**{f'{field}_id': pk}, stock=stock, movement_id=until, taken_at=taken_at)
+            for pk, stock in rows
+        ])
+
+
+class Component(Model):
+    # Plants and accessories are the building blocks of a product, the
+    # product cost and stock are derived from them (see Product.cost)
+
     name         = models.CharField(max_length=255)
     description  = models.TextField(blank=True,null=True)
     cost         = models.DecimalField(max_digits=11,decimal_places=0)
-    stock        = models.SmallIntegerField(default=0)
+    # the StockMovement ledger records every change, see ComponentQuerySet.with_ledger_stock
+    stock        = models.IntegerField(default=0)
+    # held by active StockReservations, only stock - reserved is available
+    reserved     = models.IntegerField(default=0,editable=False)
     created_at   = models.DateTimeField(auto_now_add=True)
     updated_at   = models.DateTimeField(auto_now=True)
 
+    TRACKED_FIELDS = ['name', 'cost', 'stock']
+    # fields the product stats are derived from
+    STATS_FIELDS = ['cost', 'stock']
+
+    objects = ComponentQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
     def __str__(self) -> str:
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            field: getattr(instance, field) for field in cls.TRACKED_FIELDS if field in field_names
+        }
+        return instance
+
+    def save(self, *args, **kwargs):
+        # stock and reserved are moved by guarded UPDATEs (ComponentQuerySet), a full save of a
+        # loaded row must not write back their old values, stock is only written when edited
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            skipped = {'reserved'} if self.has_changed('stock') else {'reserved', 'stock'}
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields if not field.primary_key and field.name not in skipped
+            ]
+        super().save(*args, **kwargs)
+
+    def get_stock_at(self, moment):
+        return type(self).objects.with_ledger_stock(at=moment).values_list('ledger_stock', flat=True).get(pk=self.pk)
+
+    def has_changed(self, *fields):
+        loaded_values = getattr(self, '_loaded_values', None)
+        if loaded_values is None:
+            return True
+        return any(
+            field not in loaded_values or loaded_values[field] != getattr(self, field)
+            for field in fields
+        )
+
+
+class Accessory(Component):
+    pass
+
+
+class CategoryQuerySet(models.QuerySet):
+    def with_products_count(self):
+        return self.annotate(products_count=models.Count('products', distinct=True))
+
 
 class Category(models.Model):
     name            = models.CharField(max_length=255)
@@ -32,33 +196,239 @@ class Category(models.Model):
         on_delete=models.SET_NULL,
         null=True,blank=True
     )
+    # materialized path of the ids from the root, e.g. /1/5/9/ - maintained on save and delete
+    path  = models.CharField(max_length=255,default='',editable=False,db_index=True)
+    depth = models.PositiveSmallIntegerField(default=0,editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True,db_index=True)
 
+    objects = CategoryQuerySet.as_manager()
 
     def __str__(self) -> str:
         return self.name
 
+    def clean(self):
+        parent = self.parent_category
+        if parent is not None and self.pk is not None and f"/{self.pk}/" in parent.path:
+            raise ValidationError({'parent_category': _('A category can not be moved under itself.')})
 
-class Plant(Model):
-    # products - FK from Product
-    
-    name         = models.CharField(max_length=255)
-    description  = models.TextField(blank=True,null=True)
-    cost         = models.DecimalField(max_digits=11,decimal_places=0)
-    stock        = models.SmallIntegerField(default=0)
-    created_at   = models.DateTimeField(auto_now_add=True)
-    updated_at   = models.DateTimeField(auto_now=True)
+    @transaction.atomic
+    def save(self, *args, **kwargs):
+        self.clean()
+        super().save(*args, **kwargs)
 
-    def __str__(self) -> str:
-        return self.name
+        old = Category.objects.filter(pk=self.pk).values('path', 'depth').get()
+        parent = self.parent_category
+        path = f"{parent.path if parent else '/'}{self.pk}/"
+        depth = parent.depth + 1 if parent else 0
+        if path == old['path']:
+            return
+
+        Category.objects.filter(pk=self.pk).update(path=path, depth=depth)
+        if old['path']:
+            # move the whole subtree by replacing the path prefix
+            Category.objects.filter(path__startswith=old['path']).exclude(pk=self.pk).update(
+                path=Concat(Value(path), Substr('path', len(old['path']) + 1)),
+                depth=F('depth') + (depth - old['depth']),
+            )
+        self.path, self.depth = path, depth
+
+    def get_path_ids(self):
+        return [int(pk) for pk in self.path.strip('/').split('/') if pk]
+
+    def get_ancestors(self, include_self=False):
+        ids = self.get_path_ids()
+        if not include_self:
+            ids = ids[:-1]
+        return Category.objects.filter(pk__in=ids).order_by('depth')
+
+    def get_descendants(self, include_self=False):
+        descendants = Category.objects.filter(path__startswith=self.path)
+        if not include_self:
+            descendants = descendants.exclude(pk=self.pk)
+        return descendants
+
+    def get_products(self):
+        return Product.objects.in_category(self)
+
+    def get_products_count(self):
+        return self.get_products().count()
+
+
+class Plant(Component):
+    # products - FK from Product
+    pass
 
-class ProductImage(Model):
+class ProductImage(ImageChangeMixin, Model):
     product    = models.ForeignKey('Product',on_delete=models.CASCADE,related_name='images')
     image      = models.ImageField(upload_to='products/')
+    # resized copies rendered by store.images, [{width, format, name, size}]
+    variants   = models.JSONField(default=list,blank=True,editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+def _component_aggregate(model, aggregate):
+    # Aggregate the components of the product referenced by the outer query
+    return Subquery(
+        model.objects.filter(products=OuterRef('pk'))
+        .order_by()
+        .values('products')
+        .annotate(value=aggregate)
+        .values('value')
+    )
+
+
+def bump_product_versions(product_ids):
+    # the lists depend on every product, the details on their own product
+    bump_versions('store.product', *[f'store.product:{pk}' for pk in product_ids])
+
+
+class ProductQuerySet(models.QuerySet):
+    def computed_stats(self):
+        """
+        Returns the cost and stock expressions computed from the plants and accessories.
+        The cost is the sum of the components cost and the stock is the minimum available
+        (not reserved) stock of the components, a product without any component has no stock.
+        """
+        available = F('stock') - F('reserved')
+        plants_cost       = _component_aggregate(Plant, models.Sum('cost'))
+        accessories_cost  = _component_aggregate(Accessory, models.Sum('cost'))
+        plants_stock      = _component_aggregate(Plant, models.Min(available))
+        accessories_stock = _component_aggregate(Accessory, models.Min(available))
+
+        decimal_field = models.DecimalField(max_digits=11,decimal_places=0)
+        cost = models.ExpressionWrapper(
+            Coalesce(plants_cost, Value(0), output_field=decimal_field)
+            + Coalesce(accessories_cost, Value(0), output_field=decimal_field),
+            output_field=decimal_field,
+        )
+        stock = models.Case(
+            models.When(IsNull(plants_stock, True) & IsNull(accessories_stock, True), then=Value(0)),
+            models.When(IsNull(plants_stock, True), then=accessories_stock),
+            models.When(IsNull(accessories_stock, True), then=plants_stock),
+            default=Least(plants_stock, accessories_stock),
+            output_field=models.IntegerField(),
+        )
+        return {'cost': cost, 'available_stock': stock}
+
+    def in_category(self, category):
+        """Products of the category and all of its sub categories."""
+        return self.filter(
+            pk__in=Product.categories.through.objects.filter(category__path__startswith=category.path).values('product_id')
+        )
+
+    def with_computed_stats(self):
+        stats = self.computed_stats()
+        return self.annotate(computed_cost=stats['cost'], computed_stock=stats['available_stock'])
+
+    def bump_versions(self):
+        """Invalidates the cached responses of the products, see core.cache."""
+        bump_product_versions(self.values_list('pk', flat=True))
+
+    def refresh_stats(self):
+        """Recomputes the stored cost and available_stock with a single UPDATE query."""
+        product_ids = list(self.values_list('pk', flat=True))
+        bump_product_versions(product_ids)
+        return Product.objects.filter(pk__in=product_ids).update(**self.computed_stats())
+
+    def computed_rating_stats(self):
+        def rates_aggregate(aggregate):
+            return Coalesce(
+                Subquery(
+                    Rate.objects.filter(product=OuterRef('pk'))
+                    .order_by()
+                    .values('product')
+                    .annotate(value=aggregate)
+                    .values('value')
+                ),
+                Value(0),
+            )
+
+        stats = {
+            'rating_count': rates_aggregate(models.Count('pk')),
+            'rating_sum': rates_aggregate(models.Sum('value')),
+            **{
+                f'rating_{value}': rates_aggregate(models.Count('pk', filter=Q(value=value)))
+                for value in Rate.VALUES
+            },
+        }
+        stats['rating_average'] = Coalesce(
+            rates_aggregate(models.Avg('value')), Value(0.0), output_field=models.FloatField()
+        )
+        return stats
+
+    def refresh_rating_stats(self):
+        """Recomputes the stored rating summary from the rates with a single UPDATE query."""
+        self.bump_versions()
+        return self.update(**self.computed_rating_stats())
+
+    def change_rating(self, value, count):
+        """Adds (count=1) or removes (count=-1) a rate of the given value from the summary."""
+        if value not in Rate.VALUES:
+            # the validators of Rate.value only run in full_clean, a value without a histogram column is recounted
+            return self.refresh_rating_stats()
+        histogram_field = f'rating_{value}'
+        rating_count = F('rating_count') + count
+        rating_sum = F('rating_sum') + value * count
+        # the right hand side of an UPDATE sees the old row, so the average is derived here too
+        average = models.Case(
+            models.When(rating_count=-count, then=Value(0.0)),
+            default=Cast(rating_sum, models.FloatField()) / rating_count,
+            output_field=models.FloatField(),
+        )
+        return self.update(
+            rating_count=rating_count,
+            rating_sum=rating_sum,
+            rating_average=average,
+            **{histogram_field: F(histogram_field) + count},
+        )
+
+    def top_rated(self, category=None, min_rating_count=1):
+        products = self.in_category(category) if category is not None else self
+        return products.filter(rating_count__gte=min_rating_count).order_by('-rating_average', '-rating_count', '-id')
+
+    def get_components(self, product_ids):
+        """Returns {component model: {product id: [component ids]}} with one query per component table."""
+        components = {Plant: defaultdict(list), Accessory: defaultdict(list)}
+        if not product_ids:
+            return components
+        for model, field in ((Plant, 'plants'), (Accessory, 'accessories')):
+            through = getattr(Product, field).through
+            rows = through.objects.filter(product_id__in=product_ids).values_list(
+                'product_id', f'{model._meta.model_name}_id'
+            )
+            for product_id, component_id in rows:
+                components[model][product_id].append(component_id)
+        return components
+
+    def get_components_changes(self, quantities):
+        """Maps {product id: quantity} to {component model: {component id: quantity}}."""
+        quantities = {pk: quantity for pk, quantity in quantities.items() if pk is not None and quantity}
+        changes = {Plant: defaultdict(int), Accessory: defaultdict(int)}
+        for model, products in self.get_components(list(quantities)).items():
+            for product_id, component_ids in products.items():
+                for component_id in component_ids:
+                    changes[model][component_id] += quantities[product_id]
+        return changes
+
+    def using_components(self, changes):
+        """Products sharing any of the components of get_components_changes()."""
+        return self.filter(Q(plants__in=list(changes[Plant])) | Q(accessories__in=list(changes[Accessory])))
+
+    def change_components_stock(self, quantities, **cause):
+        """
+        Adds {product id: quantity} to the stock of the plants and accessories of the
+        products, quantities are negative for sold items. Each component table is
+        updated with one guarded UPDATE, so the caller should run it in a transaction.
+        """
+        changes = self.get_components_changes(quantities)
+        for model, model_changes in changes.items():
+            model.objects.apply_stock_changes(model_changes, **cause)
+        # components are shared, every product using them may have a new stock
+        Product.objects.using_components(changes).refresh_stats()
+
+
 class Product(Model):
     # rates       - FK from Rate
     # order_items - FK from OrderItem
@@ -72,29 +442,54 @@ class Product(Model):
     accessories = models.ManyToManyField(Accessory,related_name='products',blank=True)
     price       = models.DecimalField(max_digits=11,decimal_places=0)
 
+    # denormalized from plants and accessories, kept up to date by store.signals
+    cost            = models.DecimalField(max_digits=11,decimal_places=0,default=0,editable=False)
+    available_stock = models.IntegerField(default=0,editable=False)
+
+    # rating summary, kept up to date by store.signals on every Rate change
+    rating_count   = models.PositiveIntegerField(default=0,editable=False)
+    rating_sum     = models.PositiveIntegerField(default=0,editable=False)
+    rating_average = models.FloatField(default=0,editable=False)
+    rating_1       = models.PositiveIntegerField(default=0,editable=False)
+    rating_2       = models.PositiveIntegerField(default=0,editable=False)
+    rating_3       = models.PositiveIntegerField(default=0,editable=False)
+    rating_4       = models.PositiveIntegerField(default=0,editable=False)
+    rating_5       = models.PositiveIntegerField(default=0,editable=False)
+
+    # normalized names of the product and its relations, indexed by store.search
+    search_document = models.TextField(default='',editable=False)
+    search_vector   = SearchVectorField(null=True,editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # keyset pagination of the catalog
+            models.Index(fields=['-created_at', '-id'], name='store_product_created_id_idx'),
+            # top rated listings
+            models.Index(fields=['-rating_average', '-rating_count'], name='store_product_rating_idx'),
+            # conditional GET validators of the catalog
+            models.Index(fields=['updated_at'], name='store_product_updated_idx'),
+        ]
+
     def __str__(self) -> str:
         return self.name
     
     def get_cost(self):
-        accessories_cost = self.accessories.aggregate(models.Sum('cost'))['cost__sum'] or 0
-        plants_cost = self.plants.aggregate(models.Sum('cost'))['cost__sum'] or 0
-        return accessories_cost + plants_cost
+        return self.cost
     
     def get_stock(self):
-        plants_stock      = self.plants.aggregate(models.Min('stock'))['stock__min']
-        accessories_stock = self.accessories.aggregate(models.Min('stock'))['stock__min']
+        return self.available_stock
 
-        if plants_stock is None and accessories_stock is None:
-            return 0
-        elif plants_stock is None:
-            return accessories_stock
-        elif accessories_stock is None:
-            return plants_stock
-        else:
-            return min(plants_stock, accessories_stock)
+    def refresh_stats(self):
+        Product.objects.filter(pk=self.pk).refresh_stats()
+        self.refresh_from_db(fields=['cost', 'available_stock'])
+
+    def get_rating_histogram(self):
+        return {value: getattr(self, f'rating_{value}') for value in Rate.VALUES}
         
             
 
@@ -109,13 +504,26 @@ class Review(Model):
         verbose_name = _('Review')
         verbose_name_plural = _('Reviews')
         ordering = ['-created_at']
+        indexes = [
+            # keyset pagination of the reviews of a product
+            models.Index(fields=['product', '-created_at', '-id'], name='store_review_product_feed_idx'),
+        ]
 
 
 class Rate(Model):
-    value = models.PositiveSmallIntegerField()
+    VALUES = range(1, 6)
+
+    value = models.PositiveSmallIntegerField(validators=[MinValueValidator(VALUES[0]), MaxValueValidator(VALUES[-1])])
     user = models.ForeignKey(User,on_delete=models.CASCADE,related_name='rates')
     product = models.ForeignKey('Product',on_delete=models.CASCADE,related_name='rates')
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'value' in field_names and 'product_id' in field_names:
+            instance._loaded_values = {'value': instance.value, 'product_id': instance.product_id}
+        return instance
+
 
 # class Discount(Model):
 #     user = models.ForeignKey(User,on_delete=models.CASCADE,related_name='discounts')
@@ -141,6 +549,42 @@ class Customer(Model):
         return self.first_name + ' ' + self.last_name
 
 
+def _items_total(field):
+    # Sum of field * quantity over the items of the order referenced by the outer query
+    return Subquery(
+        OrderItem.objects.filter(order=OuterRef('pk'))
+        .order_by()
+        .values('order')
+        .annotate(total=models.Sum(F(field) * F('quantity')))
+        .values('total')
+    )
+
+
+class OrderQuerySet(models.QuerySet):
+    def computed_totals(self):
+        decimal_field = models.DecimalField(max_digits=14,decimal_places=0)
+        return {
+            'total_price': Coalesce(_items_total('unit_price'), Value(0), output_field=decimal_field),
+            'total_cost': Coalesce(_items_total('unit_cost'), Value(0), output_field=decimal_field),
+        }
+
+    def with_computed_totals(self):
+        totals = self.computed_totals()
+        return self.annotate(computed_total_price=totals['total_price'], computed_total_cost=totals['total_cost'])
+
+    def with_margin(self):
+        return self.annotate(
+            margin=models.ExpressionWrapper(
+                F('total_price') - F('total_cost'),
+                output_field=models.DecimalField(max_digits=14,decimal_places=0),
+            )
+        )
+
+    def refresh_totals(self):
+        """Recomputes the stored totals from the order items with a single UPDATE query."""
+        return self.update(**self.computed_totals())
+
+
 class Order(Model):
 
     STATUS_SUBMITTED = 'S'
@@ -163,10 +607,37 @@ class Order(Model):
     # payment_images - FK from OrderPaymentImage
     # order_items    - FK from OrderItem
 
+    # denormalized from the order items, kept up to date by OrderItem
+    total_price = models.DecimalField(max_digits=14,decimal_places=0,default=0,editable=False,db_index=True)
+    total_cost  = models.DecimalField(max_digits=14,decimal_places=0,default=0,editable=False)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = OrderQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'status' in field_names:
+            instance._loaded_status = instance.status
+        return instance
+
+    def save(self, *args, **kwargs):
+        loaded_status = getattr(self, '_loaded_status', None)
+        if loaded_status != self.STATUS_SUBMITTED or self.status == loaded_status:
+            super().save(*args, **kwargs)
+            self._loaded_status = self.status
+            return
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # the stock held for the order is either sold or given back
+            reservations = StockReservation.objects.filter(order_item__order=self)
+            if self.status in (self.STATUS_PAYMENT_COMPLETED, self.STATUS_COMPLETED):
+                reservations.settle(StockReservation.STATUS_COMMITTED)
+            else:
+                reservations.settle(StockReservation.STATUS_RELEASED)
+        self._loaded_status = self.status
 
     def __str__(self) -> str:
         first_name = self.customer.first_name if self.customer else _('Anonymous')
@@ -174,10 +645,13 @@ class Order(Model):
         return f"{first_name} {last_name} - {self.get_total_price()} - {self.status}"
     
     def get_total_price(self):
-        return sum([item.unit_price * item.quantity for item in self.order_items.all()])
+        return self.total_price
     
     def get_total_cost(self):
-        return sum([item.unit_cost * item.quantity for item in self.order_items.all()])
+        return self.total_cost
+
+    def get_margin(self):
+        return self.total_price - self.total_cost
 
 
 class OrderItem(Model):
@@ -190,6 +664,18 @@ class OrderItem(Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    def clean(self):
+        # friendly check for the admin, the stock UPDATE in save() is the real guard
+        if self.product_id is None or not self.quantity:
+            return
+        needed = self.quantity
+        if self.pk is not None:
+            orig = OrderItem.objects.filter(pk=self.pk).values('product_id', 'quantity').first()
+            if orig and orig['product_id'] == self.product_id:
+                needed -= orig['quantity']
+        if needed > 0 and self.product.available_stock < needed:
+            raise ValidationError({'quantity': OutOfStockError([self.product]).messages})
+
     @transaction.atomic
     def save(self, *args, **kwargs):
         orig = OrderItem.objects.get(pk=self.pk) if self.pk is not None else None
@@ -198,24 +684,43 @@ class OrderItem(Model):
             self.unit_cost = self.product.get_cost()
         super().save(*args, **kwargs)
         if orig is None:
-            self.update_stock(self.product, -self.quantity)
-        elif orig.quantity != self.quantity or orig.product != self.product:
-            self.update_stock(orig.product, orig.quantity)
-            self.update_stock(self.product, -self.quantity)
-
-    def update_stock(self, product, quantity):
-        for accessory in product.accessories.all():
-            accessory.stock += quantity
-            accessory.save()
-        for plant in product.plants.all():
-            plant.stock += quantity
-            plant.save()
-    
+            self.take_stock()
+        elif orig.quantity != self.quantity or orig.product_id != self.product_id:
+            orig.give_back_stock()
+            self.take_stock()
+        order_ids = {self.order_id, orig.order_id} if orig is not None else {self.order_id}
+        Order.objects.filter(pk__in=order_ids).refresh_totals()
+
+    def take_stock(self):
+        # items of a submitted order only hold their stock until the payment
+        if self.product_id is None:
+            return
+        if self.order.status == Order.STATUS_SUBMITTED:
+            StockReservation.objects.reserve([(self.product_id, self.quantity, self)])
+        else:
+            Product.objects.change_components_stock(
+                {self.product_id: -self.quantity},
+                reason=StockMovement.REASON_ORDER, order_item=self, order_id=self.order_id,
+            )
+
+    def give_back_stock(self):
+        reservation = self.reservations.order_by('-pk').first()
+        if reservation is None or reservation.status == StockReservation.STATUS_COMMITTED:
+            Product.objects.change_components_stock(
+                {self.product_id: self.quantity},
+                reason=StockMovement.REASON_RETURN, order_item=self, order_id=self.order_id,
+            )
+        elif reservation.status == StockReservation.STATUS_ACTIVE:
+            StockReservation.objects.filter(pk=reservation.pk).settle(StockReservation.STATUS_RELEASED)
+        # a released or expired reservation has already given the stock back
+
     @transaction.atomic
     def delete(self, *args, **kwargs):
         # Increase the stock of the related product before deleting the order item
-        self.update_stock(self.product, self.quantity)
-        super().delete(*args, **kwargs)
+        self.give_back_stock()
+        result = super().delete(*args, **kwargs)
+        Order.objects.filter(pk=self.order_id).refresh_totals()
+        return result
                 
                 
         
@@ -224,7 +729,146 @@ class OrderItem(Model):
         return self.product.name + ' - ' + str(self.quantity) + ' - ' + str(self.unit_price)
 
 
-class OrderPaymentImage(Model):
+class StockReservationQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(status=StockReservation.STATUS_ACTIVE)
+
+    def held_by(self, client):
+        """The cart and order reservations of the client that still hold stock."""
+        return self.active().filter(client=client, expires_at__gt=timezone.now())
+
+    @transaction.atomic
+    def reserve(self, items, ttl=None, client=''):
+        """
+        Reserves the plants and accessories behind [(product id, quantity, order item or None)]
+        with one guarded UPDATE per component table, OutOfStockError is raised when any of
+        them is short. The reserved components are remembered, the product may change later.
+        """
+        if not items:
+            return []
+        ttl = settings.STOCK_RESERVATION_TTL if ttl is None else ttl
+        expires_at = timezone.now() + timedelta(seconds=ttl)
+        components = Product.objects.get_components({product_id for product_id, quantity, order_item in items})
+        changes = {model: defaultdict(int) for model in components}
+        reservations = []
+        for product_id, quantity, order_item in items:
+            for model, products in components.items():
+                for component_id in products[product_id]:
+                    changes[model][component_id] += quantity
+            reservations.append(StockReservation(
+                product_id=product_id,
+                order_item=order_item,
+                client=client,
+                quantity=quantity,
+                plants=components[Plant][product_id],
+                accessories=components[Accessory][product_id],
+                expires_at=expires_at,
+            ))
+
+        for model, model_changes in changes.items():
+            model.objects.apply_reservation_changes(model_changes)
+        reservations = StockReservation.objects.bulk_create(reservations)
+        Product.objects.using_components(changes).refresh_stats()
+        return reservations
+
+    @transaction.atomic
+    def settle(self, status):
+        """Sells (STATUS_COMMITTED) or gives back the stock of the active reservations."""
+        reservations = list(self.active().select_related('order_item').select_for_update(of=('self',)))
+        if not reservations:
+            return 0
+
+        changes = {Plant: defaultdict(int), Accessory: defaultdict(int)}
+        movements = []
+        for reservation in reservations:
+            for model, component_ids in ((Plant, reservation.plants), (Accessory, reservation.accessories)):
+                for component_id in component_ids:
+                    changes[model][component_id] += reservation.quantity
+                    movements.append(StockMovement(
+                        **{f'{model._meta.model_name}_id': component_id},
+                        delta=-reservation.quantity,
+                        reason=StockMovement.REASON_ORDER,
+                        order_item=reservation.order_item,
+                        order_id=reservation.order_item and reservation.order_item.order_id,
+                    ))
+
+        for model, model_changes in changes.items():
+            if status == StockReservation.STATUS_COMMITTED:
+                model.objects.commit_reserved_stock(model_changes)
+            else:
+                model.objects.apply_reservation_changes({pk: -quantity for pk, quantity in model_changes.items()})
+        if status == StockReservation.STATUS_COMMITTED:
+            StockMovement.objects.bulk_create(movements)
+        StockReservation.objects.filter(pk__in=[reservation.pk for reservation in reservations]).update(
+            status=status, updated_at=timezone.now()
+        )
+        Product.objects.using_components(changes).refresh_stats()
+        return len(reservations)
+
+    def expire(self, now=None, batch_size=500):
+        """Releases the due reservations in batches and fails the orders waiting for them."""
+        now = now or timezone.now()
+        expired = 0
+        while True:
+            with transaction.atomic():
+                ids = list(
+                    self.active().filter(expires_at__lte=now)
+                    .select_for_update(skip_locked=True)
+                    .values_list('pk', flat=True)[:batch_size]
+                )
+                if not ids:
+                    return expired
+                order_ids = list(
+                    Order.objects.filter(status=Order.STATUS_SUBMITTED, order_items__reservations__in=ids)
+                    .values_list('pk', flat=True).distinct()
+                )
+                StockReservation.objects.filter(
+                    Q(pk__in=ids) | Q(order_item__order__in=order_ids)
+                ).settle(StockReservation.STATUS_EXPIRED)
+                Order.objects.filter(pk__in=order_ids).update(status=Order.STATUS_FAILED, updated_at=now)
+            expired += len(ids)
+
+
+class StockReservation(Model):
+    STATUS_ACTIVE = 'A'
+    STATUS_COMMITTED = 'C'
+    STATUS_RELEASED = 'R'
+    STATUS_EXPIRED = 'E'
+    STATUS_CHOICES = [
+        (STATUS_ACTIVE,_('Active')),
+        (STATUS_COMMITTED,_('Committed')),
+        (STATUS_RELEASED,_('Released')),
+        (STATUS_EXPIRED,_('Expired')),
+    ]
+    token      = models.UUIDField(default=uuid.uuid4,unique=True,editable=False)
+    status     = models.CharField(max_length=1,choices=STATUS_CHOICES,default=STATUS_ACTIVE)
+    product    = models.ForeignKey(Product,on_delete=models.SET_NULL,related_name='reservations',null=True)
+    order_item = models.ForeignKey(OrderItem,on_delete=models.SET_NULL,related_name='reservations',null=True,blank=True)
+    # user or IP address behind the reservation, their live ones are capped
+    client     = models.CharField(max_length=64,blank=True,default='')
+    quantity   = models.PositiveIntegerField()
+    # the reserved component ids, each one holds `quantity` units
+    plants      = models.JSONField(default=list)
+    accessories = models.JSONField(default=list)
+    expires_at = models.DateTimeField()
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = StockReservationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # the expiry sweeper
+            models.Index(fields=['status', 'expires_at'], name='store_reservation_expiry_idx'),
+            models.Index(fields=['client', 'status'], name='store_reservation_client_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.product_id} - {self.quantity} - {self.get_status_display()}"
+
+
+class OrderPaymentImage(ImageChangeMixin, Model):
     order = models.ForeignKey(Order,on_delete=models.CASCADE,related_name='payment_images')
     image = models.ImageField(upload_to='orders/')
     created_at = models.DateTimeField(auto_now_add=True)
@@ -242,4 +886,87 @@ class Address(Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self) -> str:
-        return self.city + ' - ' + self.postal_code
\ No newline at end of file
+        return self.city + ' - ' + self.postal_code
+
+
+class StockMovementQuerySet(models.QuerySet):
+    def record(self, model, changes, reason=None, **cause):
+        """Appends one movement per {component id: delta} of the given component model."""
+        movements = [
+            StockMovement(
+                **{f'{model._meta.model_name}_id': pk},
+                delta=delta,
+                reason=reason or (StockMovement.REASON_RESTOCK if delta > 0 else StockMovement.REASON_ADJUSTMENT),
+                **cause,
+            )
+            for pk, delta in changes.items() if delta
+        ]
+        return self.bulk_create(movements)
+
+
+class StockMovement(models.Model):
+    # append-only ledger of the plants and accessories stock, never updated or deleted
+    REASON_ORDER      = 'O'
+    REASON_RETURN     = 'R'
+    REASON_ADJUSTMENT = 'A'
+    REASON_RESTOCK    = 'S'
+    REASON_CHOICES = [
+        (REASON_ORDER, _('Order')),
+        (REASON_RETURN, _('Return')),
+        (REASON_ADJUSTMENT, _('Adjustment')),
+        (REASON_RESTOCK, _('Restock')),
+    ]
+
+    plant      = models.ForeignKey(Plant,related_name='stock_movements',on_delete=models.CASCADE,null=True,blank=True)
+    accessory  = models.ForeignKey(Accessory,related_name='stock_movements',on_delete=models.CASCADE,null=True,blank=True)
+    delta      = models.IntegerField()
+    reason     = models.CharField(max_length=1,choices=REASON_CHOICES)
+    order      = models.ForeignKey(Order,related_name='stock_movements',on_delete=models.SET_NULL,null=True,blank=True)
+    order_item = models.ForeignKey(OrderItem,related_name='stock_movements',on_delete=models.SET_NULL,null=True,blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = StockMovementQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['plant', 'id'], name='store_movement_plant_idx'),
+            models.Index(fields=['accessory', 'id'], name='store_movement_accessory_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                check=Q(plant__isnull=True) ^ Q(accessory__isnull=True),
+                name='store_movement_one_component',
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.plant or self.accessory} {self.delta:+d} - {self.get_reason_display()}"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError(gettext('Stock movements can not be changed.'))
+        super().save(*args, **kwargs)
+
+
+class StockSnapshot(models.Model):
+    # stock of a component including every movement up to movement_id
+    plant       = models.ForeignKey(Plant,related_name='stock_snapshots',on_delete=models.CASCADE,null=True,blank=True)
+    accessory   = models.ForeignKey(Accessory,related_name='stock_snapshots',on_delete=models.CASCADE,null=True,blank=True)
+    stock       = models.IntegerField()
+    movement_id = models.BigIntegerField(default=0)
+    taken_at    = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['plant', '-movement_id'], name='store_snapshot_plant_idx'),
+            models.Index(fields=['accessory', '-movement_id'], name='store_snapshot_accessory_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                check=Q(plant__isnull=True) ^ Q(accessory__isnull=True),
+                name='store_snapshot_one_component',
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.plant or self.accessory} - {self.stock} @ {self.movement_id}"
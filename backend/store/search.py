@@ -0,0 +1,136 @@
+import re
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, Prefetch
+from .models import Accessory, Category, Plant, Product
+
+
+PERSIAN_CHARACTERS = str.maketrans({
+    'ي': 'ی', 'ى': 'ی', 'ئ': 'ی',
+    'ك': 'ک',
+    'ة': 'ه', 'ۀ': 'ه',
+    'أ': 'ا', 'إ': 'ا', 'ٱ': 'ا', 'آ': 'ا',
+    'ؤ': 'و',
+    '\u200c': ' ',  # zero width non-joiner
+    '\u0640': None,  # tatweel
+    **{chr(0x06F0 + digit): str(digit) for digit in range(10)},  # persian digits
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},  # arabic digits
+})
+DIACRITICS = re.compile('[\u064b-\u065f\u0670]')
+WORDS = re.compile(r'\w+')
+
+# words of a query, anything more is ignored
+MAX_QUERY_WORDS = 8
+
+
+def normalize_text(text):
+    """Folds the arabic and persian variants of letters and digits and drops the diacritics."""
+    text = DIACRITICS.sub('', (text or '').translate(PERSIAN_CHARACTERS))
+    return ' '.join(text.lower().split())
+
+
+def get_query_words(query):
+    return WORDS.findall(normalize_text(query))[:MAX_QUERY_WORDS]
+
+
+def build_search_document(product):
+    parts = [product.name, product.description]
+    parts += [category.name for category in product.categories.all()]
+    parts += [plant.name for plant in product.plants.all()]
+    parts += [accessory.name for accessory in product.accessories.all()]
+    return normalize_text(' '.join(part for part in parts if part))
+
+
+class PostgresSearchBackend:
+    # GIN index on store_product.search_vector
+    config = 'simple'
+
+    def index(self, product_ids):
+        Product.objects.filter(pk__in=product_ids).update(
+            search_vector=SearchVector('search_document', config=self.config)
+        )
+
+    def remove(self, product_ids):
+        pass
+
+    def search(self, words, limit):
+        # every word is matched as a prefix, for autocomplete
+        query = SearchQuery(' & '.join(f'{word}:*' for word in words), search_type='raw', config=self.config)
+        return list(
+            Product.objects.filter(search_vector=query)
+            .annotate(rank=SearchRank(F('search_vector'), query))
+            .order_by('-rank', '-id')
+            .values_list('pk', flat=True)[:limit]
+        )
+
+
+class SqliteSearchBackend:
+    # FTS5 table store_product_fts, keyed by the product id
+    table = 'store_product_fts'
+
+    def index(self, product_ids):
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid IN ({placeholders})', product_ids)
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, search_document) '
+                f'SELECT id, search_document FROM store_product WHERE id IN ({placeholders})',
+                product_ids,
+            )
+
+    def remove(self, product_ids):
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid IN ({placeholders})', product_ids)
+
+    def search(self, words, limit):
+        match = ' AND '.join(f'"{word}"*' for word in words)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s ORDER BY bm25({self.table}), rowid DESC LIMIT %s',
+                [match, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+SEARCH_BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SqliteSearchBackend,
+}
+
+
+def get_search_backend():
+    return SEARCH_BACKENDS[connection.vendor]()
+
+
+def index_products(product_ids, batch_size=500, force=False):
+    """Rebuilds the search document of the products and updates the search index."""
+    product_ids = list(product_ids)
+    backend = get_search_backend()
+    for start in range(0, len(product_ids), batch_size):
+        products = list(
+            Product.objects.filter(pk__in=product_ids[start:start + batch_size])
+            .only('id', 'name', 'description', 'search_document')
+            .prefetch_related(
+                Prefetch('categories', queryset=Category.objects.only('id', 'name')),
+                Prefetch('plants', queryset=Plant.objects.only('id', 'name')),
+                Prefetch('accessories', queryset=Accessory.objects.only('id', 'name')),
+            )
+        )
+        changed = []
+        for product in products:
+            document = build_search_document(product)
+            if force or document != product.search_document:
+                product.search_document = document
+                changed.append(product)
+        if changed:
+            Product.objects.bulk_update(changed, ['search_document'])
+            backend.index([product.pk for product in changed])
+
+
+def search_products(query, limit=20):
+    """Returns the ids of the matching products, best match first."""
+    words = get_query_words(query)
+    if not words:
+        return []
+    return get_search_backend().search(words, limit)
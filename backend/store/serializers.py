@@ -0,0 +1,203 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+from .exceptions import OutOfStockError
+from .images import get_srcset
+from .models import Address, Category, Customer, Order, OrderItem, Product, ProductImage, Review, StockReservation
+
+
+class CategorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Category
+        fields = ['id', 'name', 'parent_category', 'depth']
+
+
+class CategoryDetailSerializer(serializers.ModelSerializer):
+    breadcrumbs    = serializers.SerializerMethodField()
+    products_count = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Category
+        fields = ['id', 'name', 'parent_category', 'depth', 'breadcrumbs', 'products_count']
+
+    def get_breadcrumbs(self, category):
+        return CategorySerializer(category.get_ancestors(include_self=True), many=True).data
+
+    def get_products_count(self, category):
+        return category.get_products_count()
+
+
+class ProductImageSerializer(serializers.ModelSerializer):
+    srcset = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ProductImage
+        fields = ['id', 'image', 'srcset']
+
+    def get_srcset(self, product_image) -> dict:
+        request = self.context.get('request')
+        return get_srcset(product_image, request.build_absolute_uri if request is not None else None)
+
+
+class ComponentSerializer(serializers.Serializer):
+    id   = serializers.IntegerField()
+    name = serializers.CharField()
+
+
+class ProductSerializer(serializers.ModelSerializer):
+    # relations are expected to be prefetched by the view
+    categories  = CategorySerializer(many=True)
+    plants      = ComponentSerializer(many=True)
+    accessories = ComponentSerializer(many=True)
+    images      = ProductImageSerializer(many=True)
+    stock       = serializers.IntegerField(source='available_stock')
+
+    class Meta:
+        model = Product
+        fields = [
+            'id', 'name', 'description', 'price', 'stock', 'rating_average', 'rating_count',
+            'categories', 'plants', 'accessories', 'images', 'created_at', 'updated_at',
+        ]
+
+
+class ReviewSerializer(serializers.ModelSerializer):
+    user = serializers.CharField(source='user.username')
+
+    class Meta:
+        model = Review
+        fields = ['id', 'user', 'text', 'created_at']
+
+
+class CustomerSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Customer
+        fields = ['first_name', 'last_name', 'phone_number', 'email']
+
+
+class AddressSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Address
+        fields = ['city', 'address', 'postal_code', 'phone_number', 'location']
+
+
+class OrderItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = OrderItem
+        fields = ['product', 'quantity', 'unit_price']
+
+
+class OrderItemInputSerializer(serializers.Serializer):
+    # plain ids, the products are fetched all together in OrderCreateSerializer.validate
+    product     = serializers.IntegerField()
+    quantity    = serializers.IntegerField(min_value=1, max_value=32767)
+    # token of a cart reservation of the same product and quantity
+    reservation = serializers.UUIDField(required=False)
+
+
+class StockReservationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StockReservation
+        fields = ['token', 'product', 'quantity', 'expires_at']
+        read_only_fields = ['token', 'expires_at']
+        extra_kwargs = {'quantity': {'min_value': 1, 'max_value': 32767}, 'product': {'allow_null': False}}
+
+    def create(self, validated_data):
+        try:
+            reservation, = StockReservation.objects.reserve(
+                [(validated_data['product'].pk, validated_data['quantity'], None)], client=validated_data.get('client', '')
+            )
+        except OutOfStockError as error:
+            raise serializers.ValidationError({'quantity': error.messages})
+        return reservation
+
+
+class OrderCreateSerializer(serializers.Serializer):
+    customer = CustomerSerializer()
+    address  = AddressSerializer()
+    items    = OrderItemInputSerializer(many=True, allow_empty=False)
+
+    def validate(self, attrs):
+        product_ids = {item['product'] for item in attrs['items']}
+        products = Product.objects.in_bulk(product_ids)
+        missing = product_ids - products.keys()
+        if missing:
+            raise serializers.ValidationError(
+                {'items': f"محصولی با شناسه {', '.join(map(str, sorted(missing)))} یافت نشد"}
+            )
+        attrs['products'] = products
+
+        tokens = [item['reservation'] for item in attrs['items'] if 'reservation' in item]
+        reservations = StockReservation.objects.active().filter(
+            token__in=tokens, order_item=None, expires_at__gt=timezone.now()
+        ).in_bulk(field_name='token') if tokens else {}
+        for item in attrs['items']:
+            if 'reservation' not in item:
+                continue
+            reservation = reservations.pop(item['reservation'], None)
+            if reservation is None or (reservation.product_id, reservation.quantity) != (item['product'], item['quantity']):
+                raise serializers.ValidationError({'items': 'رزرو معتبری برای این محصول یافت نشد'})
+            item['reservation'] = reservation
+        return attrs
+
+    @transaction.atomic
+    def create(self, validated_data):
+        products = validated_data['products']
+        customer = Customer.objects.create(**validated_data['customer'])
+        order = Order.objects.create(customer=customer)
+        Address.objects.create(order=order, **validated_data['address'])
+
+        # bulk_create skips OrderItem.save, the stock is reserved once for the whole order
+        items = OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product=products[item['product']],
+                quantity=item['quantity'],
+                unit_price=products[item['product']].price,
+                unit_cost=products[item['product']].get_cost(),
+            )
+            for item in validated_data['items']
+        ])
+        # cart reservations are handed over to the order, the other items are reserved now
+        adopted = []
+        now = timezone.now()
+        expires_at = now + timedelta(seconds=settings.STOCK_RESERVATION_TTL)
+        for item, data in zip(items, validated_data['items']):
+            if 'reservation' in data:
+                data['reservation'].order_item = item
+                data['reservation'].expires_at = expires_at
+                adopted.append(data['reservation'])
+        if adopted:
+            # validate() did not lock them, they may have been released, expired or adopted since
+            locked = StockReservation.objects.active().filter(
+                pk__in=[reservation.pk for reservation in adopted], order_item=None, expires_at__gt=now
+            ).select_for_update().values_list('pk', flat=True)
+            if len(locked) != len(adopted):
+                raise serializers.ValidationError({'items': 'رزرو معتبری برای این محصول یافت نشد'})
+            StockReservation.objects.bulk_update(adopted, ['order_item', 'expires_at'])
+        try:
+            StockReservation.objects.reserve([
+                (item.product_id, item.quantity, item)
+                for item, data in zip(items, validated_data['items']) if 'reservation' not in data
+            ], client=validated_data.get('client', ''))
+        except OutOfStockError as error:
+            raise serializers.ValidationError({'items': error.messages})
+
+        order.total_price = sum(item.unit_price * item.quantity for item in items)
+        order.total_cost = sum(item.unit_cost * item.quantity for item in items)
+        order.save(update_fields=['total_price', 'total_cost', 'updated_at'])
+        order.created_items = items
+        order.reserved_until = expires_at
+        return order
+
+    def to_representation(self, order):
+        items = order.created_items
+        return {
+            'id': order.pk,
+            'status': order.status,
+            'customer': CustomerSerializer(order.customer).data,
+            'items': OrderItemSerializer(items, many=True).data,
+            'total_price': str(order.total_price),
+            'reserved_until': order.reserved_until,
+        }
@@ -0,0 +1,237 @@
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from .category_tree import clear_category_tree
+from .facets import clear_facet_index, update_facet_index
+from .images import delete_variants, generate_variants
+from core.cache import bump_versions
+from .models import Category, OrderPaymentImage, Product, ProductImage, Plant, Accessory, Rate, StockMovement, bump_product_versions
+from .search import get_search_backend, index_products
+
+
+# the Product field pointing to each component model
+COMPONENT_FIELDS = {
+    Plant: 'plants',
+    Accessory: 'accessories',
+}
+
+
+def get_changed_product_ids(instance, action, reverse, pk_set):
+    """
+    Returns the products whose m2m relation has changed, or None before the change is done.
+    For the reverse side (plant.products.add) the products of a clear are collected on pre_clear.
+    """
+    if not reverse:
+        # product.plants.add(...) - only the instance is affected
+        return [instance.pk] if action in ('post_add', 'post_remove', 'post_clear') else None
+
+    # plant.products.add(...) - pk_set holds the affected products
+    if action == 'pre_clear':
+        instance._product_ids = list(instance.products.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        return getattr(instance, '_product_ids', None)
+    elif action in ('post_add', 'post_remove'):
+        return pk_set
+    return None
+
+
+def update_facet_index_on_commit(product_ids):
+    # the in-process index must not see a change that is rolled back, nor read it before the commit
+    product_ids = list(product_ids)
+    transaction.on_commit(lambda: update_facet_index(product_ids), robust=True)
+
+
+def record_stock_change(sender, instance, created):
+    # stock edited by hand (admin, shell) is recorded as a restock or an adjustment
+    if created:
+        delta = instance.stock
+    elif 'stock' in getattr(instance, '_loaded_values', {}):
+        delta = instance.stock - instance._loaded_values['stock']
+    else:
+        delta = instance.stock - sender.objects.with_ledger_stock().values_list('ledger_stock', flat=True).get(pk=instance.pk)
+    StockMovement.objects.record(sender, {instance.pk: delta})
+
+
+@receiver(post_save, sender=Plant)
+@receiver(post_save, sender=Accessory)
+def refresh_products_on_component_save(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is None or 'stock' in update_fields:
+        record_stock_change(sender, instance, created)
+    # a new component does not belong to any product yet
+    if created:
+        return
+    if update_fields is not None and not set(update_fields) & set(sender.TRACKED_FIELDS):
+        return
+    products = Product.objects.filter(**{COMPONENT_FIELDS[sender]: instance})
+    if instance.has_changed(*sender.STATS_FIELDS):
+        products.refresh_stats()
+    if instance.has_changed('name'):
+        product_ids = list(products.values_list('pk', flat=True))
+        index_products(product_ids)
+        bump_product_versions(product_ids)
+    instance._loaded_values = {field: getattr(instance, field) for field in sender.TRACKED_FIELDS}
+
+
+@receiver(pre_delete, sender=Plant)
+@receiver(pre_delete, sender=Accessory)
+def collect_products_on_component_delete(sender, instance, **kwargs):
+    # the m2m rows are gone after the delete, so remember the products now
+    instance._product_ids = list(instance.products.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Plant)
+@receiver(post_delete, sender=Accessory)
+def refresh_products_on_component_delete(sender, instance, **kwargs):
+    product_ids = getattr(instance, '_product_ids', None)
+    if product_ids:
+        Product.objects.filter(pk__in=product_ids).refresh_stats()
+        index_products(product_ids)
+
+
+@receiver(m2m_changed, sender=Product.plants.through)
+@receiver(m2m_changed, sender=Product.accessories.through)
+def refresh_products_on_components_change(sender, instance, action, reverse, pk_set, **kwargs):
+    product_ids = get_changed_product_ids(instance, action, reverse, pk_set)
+    if product_ids:
+        Product.objects.filter(pk__in=product_ids).refresh_stats()
+        index_products(product_ids)
+        update_facet_index_on_commit(product_ids)
+
+
+@receiver(m2m_changed, sender=Product.categories.through)
+def index_products_on_categories_change(sender, instance, action, reverse, pk_set, **kwargs):
+    product_ids = get_changed_product_ids(instance, action, reverse, pk_set)
+    if product_ids:
+        index_products(product_ids)
+        update_facet_index_on_commit(product_ids)
+
+
+@receiver(post_save, sender=Product)
+def index_product_on_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'price' in update_fields:
+        update_facet_index_on_commit([instance.pk])
+    if update_fields is None or {'name', 'description'} & set(update_fields):
+        index_products([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_from_index(sender, instance, **kwargs):
+    get_search_backend().remove([instance.pk])
+    update_facet_index_on_commit([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def index_products_on_category_save(sender, instance, created, **kwargs):
+    if not created:
+        index_products(instance.products.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Category)
+def reroot_sub_categories_on_delete(sender, instance, **kwargs):
+    # the children are detached by SET_NULL, so their subtrees become roots
+    if not instance.path:
+        # a row saved without a path (e.g. bulk_create), every path would start with it
+        return
+    Category.objects.filter(path__startswith=instance.path).exclude(pk=instance.pk).update(
+        path=Concat(Value('/'), Substr('path', len(instance.path) + 1)),
+        depth=F('depth') - (instance.depth + 1),
+    )
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def clear_category_tree_on_change(sender, **kwargs):
+    clear_category_tree()
+    # category postings include the sub categories, a move changes them all
+    clear_facet_index()
+
+
+@receiver(post_save, sender=Rate)
+def update_rating_summary_on_save(sender, instance, created, **kwargs):
+    loaded = getattr(instance, '_loaded_values', None)
+    bump_product_versions({instance.product_id, loaded['product_id'] if loaded else instance.product_id})
+    if not created and loaded is not None:
+        if loaded == {'value': instance.value, 'product_id': instance.product_id}:
+            return
+        Product.objects.filter(pk=loaded['product_id']).change_rating(loaded['value'], -1)
+    elif not created:
+        # the previous value is unknown, recompute the summary from the rates
+        Product.objects.filter(pk=instance.product_id).refresh_rating_stats()
+        return
+    Product.objects.filter(pk=instance.product_id).change_rating(instance.value, 1)
+    instance._loaded_values = {'value': instance.value, 'product_id': instance.product_id}
+
+
+@receiver(post_delete, sender=Rate)
+def update_rating_summary_on_delete(sender, instance, **kwargs):
+    loaded = getattr(instance, '_loaded_values', None) or {'value': instance.value, 'product_id': instance.product_id}
+    Product.objects.filter(pk=loaded['product_id']).change_rating(loaded['value'], -1)
+    bump_product_versions([loaded['product_id']])
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_save, sender=OrderPaymentImage)
+def release_replaced_image_on_save(sender, instance, created, update_fields=None, **kwargs):
+    instance.release_replaced_image(created, update_fields)
+
+
+@receiver(post_save, sender=ProductImage)
+def generate_variants_on_image_save(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    if created or instance.image_has_changed():
+        transaction.on_commit(lambda: generate_variants(instance), robust=True)
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_save, sender=OrderPaymentImage)
+def remember_loaded_image(sender, instance, update_fields=None, **kwargs):
+    instance.remember_image(update_fields)
+
+
+@receiver(post_delete, sender=ProductImage)
+def delete_variants_on_image_delete(sender, instance, **kwargs):
+    transaction.on_commit(lambda: delete_variants(instance.variants, instance.image.storage), robust=True)
+
+
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_delete, sender=OrderPaymentImage)
+def release_image_on_delete(sender, instance, **kwargs):
+    instance.release_image()
+
+
+# cached catalog responses, see core.cache and the store views
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def bump_product_version(sender, instance, **kwargs):
+    bump_product_versions([instance.pk if sender is Product else instance.product_id])
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_category_version(sender, instance, **kwargs):
+    # the category details count their products
+    if sender is Product:
+        bump_product_versions([instance.pk])
+    bump_versions('store.category')
+
+
+@receiver(post_save, sender=Plant)
+@receiver(post_delete, sender=Plant)
+@receiver(post_save, sender=Accessory)
+@receiver(post_delete, sender=Accessory)
+def bump_component_version(sender, **kwargs):
+    bump_versions(f'store.{sender._meta.model_name}')
+
+
+@receiver(m2m_changed, sender=Product.categories.through)
+def bump_versions_on_categories_change(sender, instance, action, reverse, pk_set, **kwargs):
+    product_ids = get_changed_product_ids(instance, action, reverse, pk_set)
+    if product_ids:
+        bump_product_versions(product_ids)
+        bump_versions('store.category')
@@ -0,0 +1,13 @@
+from django.core.cache import cache
+from rest_framework.test import APIClient
+from pytest import fixture
+
+@fixture
+def api_client():
+    return APIClient()
+
+
+@fixture(autouse=True)
+def clear_cache():
+    # cached responses and version counters outlive the rolled back test data
+    cache.clear()
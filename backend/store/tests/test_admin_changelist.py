@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+from store.models import Product, Plant, Accessory, Category, Customer, Order, OrderItem
+import pytest
+
+User = get_user_model()
+
+# queries a changelist page may run, whatever the number of rows
+QUERY_BUDGET = 12
+
+
+@pytest.fixture
+def admin_client(client):
+    user = baker.make(User, is_staff=True, is_superuser=True)
+    client.force_login(user)
+    return client
+
+
+@pytest.fixture
+def admin_url():
+    return f"/api/v{settings.VERSION}/nbt-admin/"
+
+
+def make_products(count):
+    category = baker.make(Category)
+    for _ in range(count):
+        product = baker.make(Product, price=1000)
+        product.categories.add(category)
+        product.plants.add(baker.make(Plant, cost=100, stock=100))
+        product.accessories.add(baker.make(Accessory, cost=50, stock=100))
+
+
+def make_orders(count):
+    product = Product.objects.first()
+    for _ in range(count):
+        order = baker.make(Order, customer=baker.make(Customer))
+        OrderItem.objects.create(order=order, product=product, quantity=1)
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(context)
+
+
+@pytest.mark.django_db
+class TestAdminChangelistQueries:
+    def test_product_changelist_has_fixed_query_budget(self, admin_client, admin_url):
+        url = f"{admin_url}store/product/"
+        make_products(2)
+        few = count_queries(admin_client, url)
+        make_products(20)
+        many = count_queries(admin_client, url)
+
+        assert few == many
+        assert many <= QUERY_BUDGET
+
+    def test_order_changelist_has_fixed_query_budget(self, admin_client, admin_url):
+        url = f"{admin_url}store/order/"
+        make_products(1)
+        make_orders(2)
+        few = count_queries(admin_client, url)
+        make_orders(20)
+        many = count_queries(admin_client, url)
+
+        assert few == many
+        assert many <= QUERY_BUDGET
+
+    def test_order_changelist_sorts_by_margin(self, admin_client, admin_url):
+        make_products(1)
+        make_orders(2)
+
+        response = admin_client.get(f"{admin_url}store/order/", {"o": "4"})
+
+        assert response.status_code == 200
@@ -0,0 +1,93 @@
+from base64 import urlsafe_b64encode
+from rest_framework import status
+from django.conf import settings
+from model_bakery import baker
+from store.models import Product, Plant, Accessory, Category, ProductImage
+import pytest
+
+
+@pytest.fixture
+def products_url():
+    return f"/api/v{settings.VERSION}/store/products/"
+
+
+def make_products(count):
+    category = baker.make(Category)
+    plant = baker.make(Plant, cost=100, stock=7)
+    products = baker.make(Product, price=1000, _quantity=count)
+    for product in products:
+        product.categories.add(category)
+        product.plants.add(plant)
+        product.accessories.add(baker.make(Accessory, cost=50, stock=9))
+    return products
+
+
+@pytest.mark.django_db
+class TestProductList:
+    def test_pages_through_the_catalog_newest_first(self, api_client, products_url):
+        products = make_products(25)
+        seen = []
+        url = f"{products_url}?page_size=10"
+        while url:
+            response = api_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            seen += [product["id"] for product in response.data["results"]]
+            url = response.data["next"]
+
+        assert seen == [product.pk for product in reversed(products)]
+
+    def test_list_returns_denormalized_price_and_stock(self, api_client, products_url):
+        make_products(1)
+
+        response = api_client.get(products_url)
+
+        product = response.data["results"][0]
+        assert product["price"] == "1000"
+        assert product["stock"] == 7
+        assert "cost" not in product
+
+    def test_query_count_does_not_grow_with_page_size(self, api_client, products_url, django_assert_num_queries):
+        for product in make_products(30):
+            baker.make(ProductImage, product=product)
+
+        # the page, 4 prefetches and the last modified time of the catalog
+        with django_assert_num_queries(6):
+            response = api_client.get(f"{products_url}?page_size=30")
+
+        assert len(response.data["results"]) == 30
+
+    def test_invalid_cursor_get404(self, api_client, products_url):
+        response = api_client.get(f"{products_url}?cursor=invalid")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    @pytest.mark.parametrize("values", ['[1, 2]', '[{"a": 1}, 1]', '["2024-01-01T00:00:00+00:00", 1e400]'])
+    def test_cursor_of_wrong_types_get404(self, api_client, products_url, values):
+        cursor = urlsafe_b64encode(values.encode()).decode()
+
+        response = api_client.get(products_url, {"cursor": cursor})
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_filter_by_category_subtree(self, api_client, products_url):
+        root = Category.objects.create(name="root")
+        child = Category.objects.create(name="child", parent_category=root)
+        product = baker.make(Product, price=10)
+        product.categories.add(child)
+        make_products(2)
+
+        response = api_client.get(f"{products_url}?category={root.pk}")
+
+        assert [item["id"] for item in response.data["results"]] == [product.pk]
+
+
+@pytest.mark.django_db
+class TestProductDetail:
+    def test_retrieve_product(self, api_client, products_url):
+        product = make_products(1)[0]
+
+        response = api_client.get(f"{products_url}{product.pk}/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["id"] == product.pk
+        assert len(response.data["plants"]) == 1
@@ -0,0 +1,85 @@
+from rest_framework import status
+from django.conf import settings
+from model_bakery import baker
+from store.models import Category, Product
+import pytest
+
+
+@pytest.fixture
+def tree():
+    # root -> plants -> succulents
+    #      -> pots
+    root = Category.objects.create(name="root")
+    plants = Category.objects.create(name="plants", parent_category=root)
+    succulents = Category.objects.create(name="succulents", parent_category=plants)
+    pots = Category.objects.create(name="pots", parent_category=root)
+    return root, plants, succulents, pots
+
+
+@pytest.mark.django_db
+class TestCategoryPath:
+    def test_path_and_depth_follow_parents(self, tree):
+        root, plants, succulents, pots = tree
+
+        assert succulents.path == f"/{root.pk}/{plants.pk}/{succulents.pk}/"
+        assert succulents.depth == 2
+        assert list(succulents.get_ancestors()) == [root, plants]
+
+    def test_move_updates_the_subtree(self, tree):
+        root, plants, succulents, pots = tree
+        plants.parent_category = pots
+        plants.save()
+        succulents.refresh_from_db()
+
+        assert succulents.path == f"/{root.pk}/{pots.pk}/{plants.pk}/{succulents.pk}/"
+        assert succulents.depth == 3
+
+    def test_delete_reroots_the_subtree(self, tree):
+        root, plants, succulents, pots = tree
+        plants.delete()
+        succulents.refresh_from_db()
+
+        assert succulents.path == f"/{succulents.pk}/"
+        assert succulents.depth == 0
+
+    def test_delete_without_a_path_keeps_the_other_paths(self, tree):
+        root, plants, succulents, pots = tree
+        orphan = Category.objects.bulk_create([Category(name="orphan")])[0]
+
+        Category.objects.get(name="orphan").delete()
+        succulents.refresh_from_db()
+
+        assert not Category.objects.filter(pk=orphan.pk).exists()
+        assert succulents.path == f"/{root.pk}/{plants.pk}/{succulents.pk}/"
+        assert succulents.depth == 2
+
+    def test_subtree_products_use_a_single_query(self, tree, django_assert_num_queries):
+        root, plants, succulents, pots = tree
+        product = baker.make(Product, price=10)
+        product.categories.add(succulents, plants)
+        baker.make(Product, price=10).categories.add(pots)
+
+        with django_assert_num_queries(1):
+            assert list(root.get_products().order_by('pk'))[0] == product
+        with django_assert_num_queries(1):
+            assert plants.get_products_count() == 1
+
+
+@pytest.mark.django_db
+class TestCategoryApi:
+    def test_list_returns_the_tree(self, api_client, tree):
+        root, plants, succulents, pots = tree
+
+        response = api_client.get(f"/api/v{settings.VERSION}/store/categories/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [node["name"] for node in response.data] == ["root"]
+        assert [node["name"] for node in response.data[0]["children"]] == ["plants", "pots"]
+
+    def test_retrieve_returns_breadcrumbs(self, api_client, tree):
+        root, plants, succulents, pots = tree
+
+        response = api_client.get(f"/api/v{settings.VERSION}/store/categories/{succulents.pk}/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [node["name"] for node in response.data["breadcrumbs"]] == ["root", "plants", "succulents"]
@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.core.cache import cache
+from model_bakery import baker
+from store.models import Category, Product, Plant
+from store.views import ProductViewSet
+import pytest
+
+
+@pytest.fixture
+def products_url():
+    return f"/api/v{settings.VERSION}/store/products/"
+
+
+@pytest.fixture
+def product():
+    product = baker.make(Product, price=1000)
+    product.plants.add(baker.make(Plant, cost=100, stock=5))
+    return product
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+    def test_revalidation_does_not_serialize(self, api_client, products_url, product, django_assert_num_queries):
+        response = api_client.get(products_url)
+        assert response["Cache-Control"] == "no-cache"
+
+        # the max(updated_at) of the first request is kept until a product version changes
+        with django_assert_num_queries(0):
+            revalidated = api_client.get(products_url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+        assert revalidated.status_code == 304
+        assert revalidated.content == b""
+        assert revalidated["ETag"] == response["ETag"]
+
+    def test_related_changes_change_the_validators(self, api_client, products_url, product):
+        url = f"{products_url}{product.pk}/"
+        etag = api_client.get(url)["ETag"]
+
+        plant = product.plants.get()
+        plant.cost = 200
+        plant.save()
+
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response["ETag"] != etag
+        assert api_client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code == 304
+
+    def test_if_modified_since(self, api_client, product):
+        response = api_client.get(f"/api/v{settings.VERSION}/store/categories/{baker.make(Category).pk}/")
+
+        revalidated = api_client.get(
+            f"/api/v{settings.VERSION}/store/categories/", HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+        assert revalidated.status_code == 304
+
+    def test_missing_product_is_not_found(self, api_client, products_url):
+        assert api_client.get(f"{products_url}404/").status_code == 404
+
+    def test_previous_response_served_during_a_rebuild_has_no_validators(self, api_client, products_url, product, rf):
+        url = f"{products_url}{product.pk}/"
+        api_client.get(url)
+        product.price = 2000
+        product.save(update_fields=['price'])
+        # another worker is building the response of the new versions
+        view = ProductViewSet(action='retrieve', kwargs={'pk': product.pk})
+        request = rf.get(url)
+        cache.add(view.get_cache_keys(request)[2], 1)
+
+        response = api_client.get(url)
+
+        assert response.data["price"] == "1000"
+        assert "ETag" not in response and "Last-Modified" not in response
+        assert response["Cache-Control"] == "no-cache"
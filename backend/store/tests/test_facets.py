@@ -0,0 +1,104 @@
+from rest_framework import status
+from django.conf import settings
+from django.db import transaction
+from model_bakery import baker
+from store.facets import clear_facet_index, search_facets
+from store.models import Product, Plant, Accessory, Category
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def facet_index():
+    # the index lives in the process, while the database is rolled back after each test
+    clear_facet_index()
+    yield
+    clear_facet_index()
+
+
+@pytest.fixture
+def catalog():
+    root = Category.objects.create(name="plants")
+    child = Category.objects.create(name="cactus", parent_category=root)
+    other = Category.objects.create(name="pots")
+    aloe = baker.make(Plant, cost=1)
+    pot = baker.make(Accessory, cost=1)
+
+    cheap = baker.make(Product, price=100)
+    cheap.categories.add(child)
+    cheap.plants.add(aloe)
+    middle = baker.make(Product, price=500)
+    middle.categories.add(root)
+    middle.accessories.add(pot)
+    expensive = baker.make(Product, price=900)
+    expensive.categories.add(other)
+    expensive.accessories.add(pot)
+    return root, child, other, aloe, pot, cheap, middle, expensive
+
+
+@pytest.mark.django_db
+class TestFacetIndex:
+    def test_counts_without_filters(self, catalog):
+        root, child, other, aloe, pot, cheap, middle, expensive = catalog
+
+        count, product_ids, facets = search_facets()
+
+        assert count == 3
+        assert product_ids == [expensive.pk, middle.pk, cheap.pk]
+        assert facets["category"] == {root.pk: 2, child.pk: 1, other.pk: 1}
+        assert facets["accessory"] == {pot.pk: 2}
+
+    def test_filters_and_disjunctive_counts(self, catalog):
+        root, child, other, aloe, pot, cheap, middle, expensive = catalog
+
+        count, product_ids, facets = search_facets({"category": {root.pk}, "accessory": {pot.pk}})
+
+        assert product_ids == [middle.pk]
+        # the category counts ignore the category selection, but not the accessory one
+        assert facets["category"] == {root.pk: 1, other.pk: 1}
+        assert facets["accessory"] == {pot.pk: 1}
+
+    def test_price_range(self, catalog):
+        root, child, other, aloe, pot, cheap, middle, expensive = catalog
+
+        count, product_ids, facets = search_facets(min_price=200, max_price=900)
+
+        assert product_ids == [expensive.pk, middle.pk]
+        assert facets["plant"] == {}
+
+    def test_index_is_updated_incrementally(self, catalog, django_assert_num_queries, django_capture_on_commit_callbacks):
+        root, child, other, aloe, pot, cheap, middle, expensive = catalog
+        search_facets()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            expensive.plants.add(aloe)
+            middle.delete()
+        with django_assert_num_queries(0):
+            count, product_ids, facets = search_facets()
+
+        assert count == 2
+        assert facets["plant"] == {aloe.pk: 2}
+        assert facets["accessory"] == {pot.pk: 1}
+
+    def test_rolled_back_change_is_not_indexed(self, catalog):
+        root, child, other, aloe, pot, cheap, middle, expensive = catalog
+        search_facets()
+
+        with pytest.raises(RuntimeError), transaction.atomic():
+            expensive.plants.add(aloe)
+            raise RuntimeError
+
+        assert search_facets()[2]["plant"] == {aloe.pk: 1}
+
+    def test_facets_endpoint(self, api_client, catalog):
+        root, child, other, aloe, pot, cheap, middle, expensive = catalog
+
+        response = api_client.get(f"/api/v{settings.VERSION}/store/products/facets/", {"category": root.pk, "max_price": 300})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["count"] == 1
+        assert [item["id"] for item in response.data["results"]] == [cheap.pk]
+
+    def test_facets_endpoint_with_invalid_filter_get400(self, api_client):
+        response = api_client.get(f"/api/v{settings.VERSION}/store/products/facets/", {"plant": "x"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
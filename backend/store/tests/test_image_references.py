@@ -0,0 +1,58 @@
+from django.core.files.base import ContentFile
+from model_bakery import baker
+from core.models import StoredFile
+from store.models import Order, OrderPaymentImage, Product, ProductImage
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.IMAGE_VARIANT_WORKERS = 0
+    settings.IMAGE_VARIANT_WIDTHS = []
+
+
+def references(name):
+    stored = StoredFile.objects.filter(name=name).first()
+    return stored.references if stored else 0
+
+
+@pytest.mark.django_db
+class TestImageReferences:
+    @pytest.mark.parametrize("model, owner", [(ProductImage, "product"), (OrderPaymentImage, "order")])
+    def test_deleted_image_releases_its_file(self, model, owner, django_capture_on_commit_callbacks):
+        parent = baker.make(Product if owner == "product" else Order)
+        with django_capture_on_commit_callbacks(execute=True):
+            first = model.objects.create(**{owner: parent}, image=ContentFile(b"leaf", name="a.png"))
+            second = model.objects.create(**{owner: parent}, image=ContentFile(b"leaf", name="b.png"))
+        name, storage = first.image.name, first.image.storage
+        assert references(name) == 2
+
+        with django_capture_on_commit_callbacks(execute=True):
+            first.delete()
+        assert references(name) == 1
+        assert storage.exists(name)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            model.objects.get(pk=second.pk).delete()
+        assert not StoredFile.objects.filter(name=name).exists()
+        assert not storage.exists(name)
+
+    @pytest.mark.parametrize("model, owner", [(ProductImage, "product"), (OrderPaymentImage, "order")])
+    def test_replaced_image_releases_the_old_file(self, model, owner, django_capture_on_commit_callbacks):
+        parent = baker.make(Product if owner == "product" else Order)
+        with django_capture_on_commit_callbacks(execute=True):
+            image = model.objects.create(**{owner: parent}, image=ContentFile(b"leaf", name="a.png"))
+        old_name, storage = image.image.name, image.image.storage
+
+        image = model.objects.get(pk=image.pk)
+        with django_capture_on_commit_callbacks(execute=True):
+            image.image = ContentFile(b"flower", name="b.png")
+            image.save()
+
+        assert not storage.exists(old_name)
+        assert references(image.image.name) == 1
+
+        with django_capture_on_commit_callbacks(execute=True):
+            image.save()
+        assert references(image.image.name) == 1
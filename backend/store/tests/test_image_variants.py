@@ -0,0 +1,64 @@
+from io import BytesIO
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from model_bakery import baker
+from PIL import Image
+from store.images import generate_variants
+from store.models import Product, ProductImage
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.IMAGE_VARIANT_WORKERS = 0
+    settings.IMAGE_VARIANT_WIDTHS = [160, 320, 4000]
+    settings.IMAGE_VARIANT_FORMATS = ['webp', 'jpeg']
+
+
+def make_upload(width=1200, height=800):
+    buffer = BytesIO()
+    Image.effect_noise((width, height), 64).convert('RGB').save(buffer, 'JPEG', quality=95)
+    return SimpleUploadedFile('plant.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+
+@pytest.mark.django_db
+class TestImageVariants:
+    def test_variants_are_rendered_on_upload(self, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            image = ProductImage.objects.create(product=baker.make(Product), image=make_upload())
+        image.refresh_from_db()
+
+        assert sorted((variant['width'], variant['format']) for variant in image.variants) == [
+            (160, 'jpeg'), (160, 'webp'), (320, 'jpeg'), (320, 'webp'), (1200, 'jpeg'), (1200, 'webp'),
+        ]
+        thumbnail = next(variant for variant in image.variants if variant['width'] == 160)
+        assert thumbnail['size'] * 10 < image.image.size
+        with Image.open(image.image.storage.open(thumbnail['name'])) as rendered:
+            assert rendered.size == (160, 107)
+
+    def test_catalog_exposes_srcset(self, api_client, django_capture_on_commit_callbacks):
+        product = baker.make(Product, price=1000)
+        with django_capture_on_commit_callbacks(execute=True):
+            ProductImage.objects.create(product=product, image=make_upload())
+
+        response = api_client.get(f"/api/v{settings.VERSION}/store/products/{product.pk}/")
+
+        srcset = response.data["images"][0]["srcset"]
+        assert set(srcset) == {"webp", "jpeg"}
+        assert srcset["webp"].startswith("http://testserver/")
+        assert srcset["webp"].endswith(".webp 1200w")
+
+    @pytest.mark.django_db(transaction=True)
+    def test_process_pool_and_backfill(self, settings):
+        settings.IMAGE_VARIANT_WORKERS = 1
+        image = ProductImage.objects.create(product=baker.make(Product), image=make_upload(400, 300))
+
+        variants = generate_variants(image).result(timeout=30)
+
+        assert {variant['width'] for variant in variants} == {160, 320, 400}
+        ProductImage.objects.update(variants=[])
+        call_command('generate_image_variants')
+        image.refresh_from_db()
+        assert len(image.variants) == 6
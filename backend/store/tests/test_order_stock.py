@@ -0,0 +1,103 @@
+from model_bakery import baker
+from store.exceptions import OutOfStockError
+from store.models import Product, Plant, Accessory, Order, OrderItem
+import pytest
+
+
+@pytest.fixture
+def product():
+    product = baker.make(Product, price=1000)
+    product.plants.add(baker.make(Plant, cost=100, stock=5))
+    product.accessories.add(baker.make(Accessory, cost=50, stock=3))
+    product.refresh_from_db()
+    return product
+
+
+@pytest.fixture
+def paid_order():
+    return baker.make(Order, status=Order.STATUS_PAYMENT_COMPLETED)
+
+
+@pytest.mark.django_db
+class TestOrderItemStock:
+    def test_create_item_decrements_components_stock(self, product, paid_order):
+        OrderItem.objects.create(order=paid_order, product=product, quantity=2)
+
+        assert product.plants.get().stock == 3
+        assert product.accessories.get().stock == 1
+        product.refresh_from_db()
+        assert product.available_stock == 1
+
+    def test_update_and_delete_item_restore_stock(self, product, paid_order):
+        item = OrderItem.objects.create(order=paid_order, product=product, quantity=2)
+        item.quantity = 1
+        item.save()
+
+        assert product.accessories.get().stock == 2
+
+        item.delete()
+
+        assert product.plants.get().stock == 5
+        assert product.accessories.get().stock == 3
+
+    def test_oversell_is_rejected_and_rolled_back(self, product):
+        order = baker.make(Order)
+
+        with pytest.raises(OutOfStockError) as error:
+            OrderItem.objects.create(order=order, product=product, quantity=4)
+
+        assert error.value.components == [product.accessories.get()]
+        assert not OrderItem.objects.exists()
+        assert product.plants.get().stock == 5
+        assert product.accessories.get().stock == 3
+
+    def test_shared_component_updates_every_product(self, product):
+        other = baker.make(Product, price=10)
+        other.plants.add(product.plants.get())
+
+        OrderItem.objects.create(order=baker.make(Order), product=product, quantity=3)
+        other.refresh_from_db()
+
+        assert other.available_stock == 2
+
+    def test_stock_update_is_set_based(self, product, django_assert_num_queries):
+        # two through table reads, one UPDATE and one ledger INSERT per component table,
+        # the affected products (for the response cache) and one stats refresh
+        with django_assert_num_queries(8):
+            Product.objects.change_components_stock({product.pk: -1})
+
+
+@pytest.mark.django_db
+class TestOrderTotals:
+    def test_totals_follow_items(self, product):
+        order = baker.make(Order)
+        item = OrderItem.objects.create(order=order, product=product, quantity=2)
+        order.refresh_from_db()
+
+        assert order.total_price == 2000
+        assert order.total_cost == 300
+
+        item.quantity = 1
+        item.save()
+        order.refresh_from_db()
+
+        assert order.total_price == 1000
+
+        item.delete()
+        order.refresh_from_db()
+
+        assert order.total_price == 0
+        assert order.total_cost == 0
+
+    def test_queryset_totals_and_margin(self, product):
+        order = baker.make(Order)
+        OrderItem.objects.create(order=order, product=product, quantity=2)
+        Order.objects.filter(pk=order.pk).update(total_price=0, total_cost=0)
+
+        drifted = Order.objects.with_computed_totals().get(pk=order.pk)
+        assert drifted.computed_total_price == 2000
+        assert drifted.computed_total_cost == 300
+
+        Order.objects.refresh_totals()
+        order = Order.objects.with_margin().filter(total_price__gte=2000).get()
+        assert order.margin == 1700
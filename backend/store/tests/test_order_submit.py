@@ -0,0 +1,73 @@
+from rest_framework import status
+from django.conf import settings
+from model_bakery import baker
+from store.models import Product, Plant, Accessory, Order, OrderItem
+import pytest
+
+
+@pytest.fixture
+def orders_url():
+    return f"/api/v{settings.VERSION}/store/orders/"
+
+
+def make_products(count, stock=10):
+    products = []
+    for _ in range(count):
+        product = baker.make(Product, price=1000)
+        product.plants.add(baker.make(Plant, cost=100, stock=stock))
+        product.accessories.add(baker.make(Accessory, cost=50, stock=stock))
+        products.append(product)
+    return products
+
+
+def order_payload(products, quantity=1):
+    return {
+        "customer": {"first_name": "Ali", "last_name": "Rezaei", "phone_number": "+989123456789"},
+        "address": {"city": "Tehran", "address": "Valiasr st.", "postal_code": "1234567890", "phone_number": "+989123456789"},
+        "items": [{"product": product.pk, "quantity": quantity} for product in products],
+    }
+
+
+@pytest.mark.django_db
+class TestOrderSubmit:
+    def test_submit_order_creates_items_and_decrements_stock(self, api_client, orders_url):
+        products = make_products(2)
+
+        response = api_client.post(orders_url, order_payload(products, quantity=3), format="json")
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["total_price"] == "6000"
+        order = Order.objects.get()
+        assert order.address.city == "Tehran"
+        assert OrderItem.objects.filter(order=order, unit_cost=150).count() == 2
+        for product in products:
+            product.refresh_from_db()
+            assert product.available_stock == 7
+
+    def test_submit_order_with_unknown_product_get400(self, api_client, orders_url):
+        payload = order_payload(make_products(1))
+        payload["items"].append({"product": 0, "quantity": 1})
+
+        response = api_client.post(orders_url, payload, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "items" in response.data
+
+    def test_submit_order_out_of_stock_get400_and_rolls_back(self, api_client, orders_url):
+        products = make_products(2, stock=2)
+
+        response = api_client.post(orders_url, order_payload(products, quantity=3), format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not Order.objects.exists()
+        assert not Plant.objects.filter(stock__lt=2).exists()
+
+    def test_query_count_does_not_grow_with_items(self, api_client, orders_url, django_assert_max_num_queries):
+        products = make_products(20)
+
+        # the holds of the client are counted once for the whole order
+        with django_assert_max_num_queries(18):
+            response = api_client.post(orders_url, order_payload(products), format="json")
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert OrderItem.objects.count() == 20
@@ -0,0 +1,49 @@
+from rest_framework import status
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from model_bakery import baker
+from store.models import Product, Review
+import pytest
+
+User = get_user_model()
+
+
+@pytest.fixture
+def product():
+    return baker.make(Product, price=10)
+
+
+def reviews_url(product):
+    return f"/api/v{settings.VERSION}/store/products/{product.pk}/reviews/"
+
+
+@pytest.mark.django_db
+class TestProductReviews:
+    def test_pages_through_reviews_newest_first(self, api_client, product):
+        reviews = [baker.make(Review, product=product, user=baker.make(User)) for _ in range(7)]
+        baker.make(Review, product=baker.make(Product, price=10), user=baker.make(User))
+        seen = []
+        url = f"{reviews_url(product)}?page_size=3"
+        while url:
+            response = api_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            seen += [review["id"] for review in response.data["results"]]
+            url = response.data["next"]
+
+        assert seen == [review.pk for review in reversed(reviews)]
+
+    def test_page_query_count_does_not_grow(self, api_client, product, django_assert_num_queries):
+        for _ in range(20):
+            baker.make(Review, product=product, user=baker.make(User))
+
+        # the product and the page
+        with django_assert_num_queries(2):
+            response = api_client.get(reviews_url(product))
+
+        assert response.data["results"][0]["user"]
+
+    @pytest.mark.parametrize("product_pk", ["abc", "999999"])
+    def test_reviews_of_unknown_product_get404(self, api_client, product_pk):
+        response = api_client.get(f"/api/v{settings.VERSION}/store/products/{product_pk}/reviews/")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
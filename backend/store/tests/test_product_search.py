@@ -0,0 +1,72 @@
+from rest_framework import status
+from django.conf import settings
+from model_bakery import baker
+from store.models import Product, Plant, Category
+from store.search import normalize_text, search_products
+import pytest
+
+
+@pytest.fixture
+def search_url():
+    return f"/api/v{settings.VERSION}/store/products/search/"
+
+
+def test_normalize_text_folds_arabic_letters_and_digits():
+    assert normalize_text("كاكتوس  عربي ۱۲") == "کاکتوس عربی 12"
+    assert normalize_text("گل‌دان") == "گل دان"
+    assert normalize_text("Cactus") == "cactus"
+
+
+@pytest.mark.django_db
+class TestProductSearch:
+    def test_search_by_name_prefix(self):
+        cactus = baker.make(Product, name="کاکتوس مینیاتوری", price=10)
+        baker.make(Product, name="بونسای", price=10)
+
+        assert search_products("کاکت") == [cactus.pk]
+
+    def test_search_with_arabic_letters(self):
+        product = baker.make(Product, name="گل یخ", price=10)
+
+        assert search_products("گل يخ") == [product.pk]
+
+    def test_search_related_names(self):
+        product = baker.make(Product, name="Gift box", price=10)
+        product.plants.add(baker.make(Plant, name="Aloe vera", cost=1))
+        product.categories.add(baker.make(Category, name="Succulents"))
+
+        assert search_products("aloe") == [product.pk]
+        assert search_products("succulent") == [product.pk]
+
+    def test_index_follows_changes(self):
+        product = baker.make(Product, name="Old name", price=10)
+        product.name = "Monstera"
+        product.save()
+
+        assert search_products("old") == []
+        assert search_products("monstera") == [product.pk]
+
+        product.delete()
+
+        assert search_products("monstera") == []
+
+    def test_better_matches_rank_first(self):
+        weak = baker.make(Product, name="Pot", description="for a cactus", price=10)
+        strong = baker.make(Product, name="Cactus", description="a small cactus", price=10)
+
+        assert search_products("cactus") == [strong.pk, weak.pk]
+
+    def test_search_endpoint(self, api_client, search_url):
+        product = baker.make(Product, name="Monstera", price=10)
+
+        response = api_client.get(search_url, {"q": "mons"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [item["id"] for item in response.data["results"]] == [product.pk]
+
+    def test_search_endpoint_with_empty_query(self, api_client, search_url):
+        baker.make(Product, name="Monstera", price=10)
+
+        response = api_client.get(search_url, {"q": "!!"})
+
+        assert response.data["results"] == []
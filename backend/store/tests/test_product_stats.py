@@ -0,0 +1,91 @@
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from model_bakery import baker
+from store.models import Product, Plant, Accessory
+import pytest
+
+
+@pytest.fixture
+def product():
+    product = baker.make(Product, price=1000)
+    product.plants.add(baker.make(Plant, cost=100, stock=5))
+    product.accessories.add(baker.make(Accessory, cost=50, stock=3))
+    product.refresh_from_db()
+    return product
+
+
+@pytest.mark.django_db
+class TestProductStats:
+    def test_product_without_components_has_no_cost_and_stock(self):
+        product = baker.make(Product, price=1000)
+
+        assert product.cost == 0
+        assert product.available_stock == 0
+
+    def test_stats_follow_components_membership(self, product):
+        assert product.cost == 150
+        assert product.available_stock == 3
+
+        product.accessories.clear()
+        product.refresh_from_db()
+
+        assert product.cost == 100
+        assert product.available_stock == 5
+
+    def test_stats_follow_reverse_membership(self, product):
+        plant = baker.make(Plant, cost=20, stock=1)
+        plant.products.add(product)
+        product.refresh_from_db()
+
+        assert product.cost == 170
+        assert product.available_stock == 1
+
+        plant.products.clear()
+        product.refresh_from_db()
+
+        assert product.cost == 150
+        assert product.available_stock == 3
+
+    def test_stats_follow_component_changes(self, product):
+        plant = product.plants.get()
+        plant.cost = 300
+        plant.stock = 1
+        plant.save()
+        product.refresh_from_db()
+
+        assert product.cost == 350
+        assert product.available_stock == 1
+
+    def test_stats_follow_component_delete(self, product):
+        product.accessories.get().delete()
+        product.refresh_from_db()
+
+        assert product.cost == 100
+        assert product.available_stock == 5
+
+    def test_listing_products_runs_a_single_query(self, product, django_assert_num_queries):
+        baker.make(Product, price=10, _quantity=5)
+
+        with django_assert_num_queries(1):
+            stats = [(p.get_cost(), p.get_stock()) for p in Product.objects.all()]
+
+        assert len(stats) == 6
+
+
+@pytest.mark.django_db
+class TestRebuildProductStatsCommand:
+    def test_check_reports_drift(self, product):
+        Product.objects.filter(pk=product.pk).update(cost=0, available_stock=0)
+
+        with pytest.raises(CommandError):
+            call_command('rebuild_product_stats', '--check')
+
+    def test_rebuild_fixes_drift(self, product):
+        Product.objects.filter(pk=product.pk).update(cost=0, available_stock=0)
+
+        call_command('rebuild_product_stats')
+        product.refresh_from_db()
+
+        assert product.cost == 150
+        assert product.available_stock == 3
+        call_command('rebuild_product_stats', '--check')
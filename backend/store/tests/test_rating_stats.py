@@ -0,0 +1,89 @@
+from rest_framework import status
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from model_bakery import baker
+from store.models import Product, Category, Rate
+import pytest
+
+User = get_user_model()
+
+
+def rate(product, value):
+    return Rate.objects.create(product=product, user=baker.make(User), value=value)
+
+
+@pytest.mark.django_db
+class TestRatingStats:
+    def test_summary_follows_created_rates(self):
+        product = baker.make(Product, price=10)
+        rate(product, 5)
+        rate(product, 2)
+        product.refresh_from_db()
+
+        assert product.rating_count == 2
+        assert product.rating_sum == 7
+        assert product.rating_average == 3.5
+        assert product.get_rating_histogram() == {1: 0, 2: 1, 3: 0, 4: 0, 5: 1}
+
+    def test_summary_follows_updated_and_deleted_rates(self):
+        product = baker.make(Product, price=10)
+        other = baker.make(Product, price=10)
+        rate(product, 5)
+        changed = Rate.objects.get(pk=rate(product, 1).pk)
+
+        changed.value = 3
+        changed.save()
+        product.refresh_from_db()
+        assert product.rating_average == 4
+        assert product.rating_3 == 1 and product.rating_1 == 0
+
+        changed.product = other
+        changed.save()
+        product.refresh_from_db()
+        other.refresh_from_db()
+        assert (product.rating_count, product.rating_average) == (1, 5)
+        assert (other.rating_count, other.rating_average) == (1, 3)
+
+        changed.delete()
+        other.refresh_from_db()
+        assert (other.rating_count, other.rating_sum, other.rating_average) == (0, 0, 0)
+
+    def test_out_of_range_value_is_recounted(self):
+        product = baker.make(Product, price=10)
+        rate(product, 5)
+        invalid = rate(product, 7)
+        product.refresh_from_db()
+        assert (product.rating_count, product.rating_sum, product.rating_5) == (2, 12, 1)
+
+        Rate.objects.get(pk=invalid.pk).delete()
+        product.refresh_from_db()
+        assert (product.rating_count, product.rating_sum, product.rating_average) == (1, 5, 5)
+
+    def test_top_rated_in_category(self, api_client):
+        category = baker.make(Category)
+        best, good, unrated = baker.make(Product, price=10, _quantity=3)
+        category.products.add(best, good, unrated)
+        rate(best, 5)
+        rate(good, 4)
+        rate(baker.make(Product, price=10), 5)
+
+        assert list(Product.objects.top_rated(category)) == [best, good]
+
+        response = api_client.get(f"/api/v{settings.VERSION}/store/products/top_rated/", {"category": category.pk})
+        assert response.status_code == status.HTTP_200_OK
+        assert [item["id"] for item in response.data["results"]] == [best.pk, good.pk]
+
+    def test_rebuild_command_fixes_drift(self):
+        product = baker.make(Product, price=10)
+        rate(product, 4)
+        Product.objects.update(rating_count=0, rating_sum=0, rating_4=0, rating_average=0)
+
+        with pytest.raises(CommandError):
+            call_command('rebuild_rating_stats', '--check')
+        call_command('rebuild_rating_stats')
+        product.refresh_from_db()
+
+        assert (product.rating_count, product.rating_4, product.rating_average) == (1, 1, 4)
+        call_command('rebuild_rating_stats', '--check')
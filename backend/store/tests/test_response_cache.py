@@ -0,0 +1,53 @@
+from django.conf import settings
+from model_bakery import baker
+from store.models import Product, Plant, Order, OrderItem
+import pytest
+
+
+@pytest.fixture
+def products_url():
+    return f"/api/v{settings.VERSION}/store/products/"
+
+
+@pytest.fixture
+def products():
+    products = baker.make(Product, price=1000, _quantity=2)
+    for product in products:
+        product.plants.add(baker.make(Plant, cost=100, stock=5))
+    return products
+
+
+@pytest.mark.django_db
+class TestCatalogResponseCache:
+    def test_repeated_reads_do_not_query(self, api_client, products_url, products, django_assert_num_queries):
+        api_client.get(products_url)
+        api_client.get(f"{products_url}{products[0].pk}/")
+
+        with django_assert_num_queries(0):
+            listed = api_client.get(products_url)
+            detail = api_client.get(f"{products_url}{products[0].pk}/")
+
+        assert len(listed.data["results"]) == 2
+        assert detail.data["id"] == products[0].pk
+
+    def test_price_change_invalidates_only_the_affected_entries(self, api_client, products_url, products, django_assert_num_queries):
+        changed, other = products
+        for product in products:
+            api_client.get(f"{products_url}{product.pk}/")
+        api_client.get(products_url)
+
+        changed.price = 2000
+        changed.save()
+
+        with django_assert_num_queries(0):
+            api_client.get(f"{products_url}{other.pk}/")
+        assert api_client.get(f"{products_url}{changed.pk}/").data["price"] == "2000"
+        assert {item["price"] for item in api_client.get(products_url).data["results"]} == {"1000", "2000"}
+
+    def test_stock_change_invalidates_the_product(self, api_client, products_url, products):
+        product = products[0]
+        assert api_client.get(f"{products_url}{product.pk}/").data["stock"] == 5
+
+        OrderItem.objects.create(order=baker.make(Order, status=Order.STATUS_PAYMENT_COMPLETED), product=product, quantity=2)
+
+        assert api_client.get(f"{products_url}{product.pk}/").data["stock"] == 3
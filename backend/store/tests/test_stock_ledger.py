@@ -0,0 +1,90 @@
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils import timezone
+from model_bakery import baker
+from store.models import Product, Plant, Accessory, Order, OrderItem, StockMovement, StockSnapshot
+import pytest
+
+
+@pytest.fixture
+def product():
+    product = baker.make(Product, price=1000)
+    product.plants.add(baker.make(Plant, cost=100, stock=5))
+    product.accessories.add(baker.make(Accessory, cost=50, stock=3))
+    product.refresh_from_db()
+    return product
+
+
+def ledger_stock(component):
+    return type(component).objects.with_ledger_stock().values_list('ledger_stock', flat=True).get(pk=component.pk)
+
+
+@pytest.mark.django_db
+class TestStockLedger:
+    def test_order_items_are_recorded_with_their_cause(self, product):
+        order = baker.make(Order, status=Order.STATUS_PAYMENT_COMPLETED)
+        item = OrderItem.objects.create(order=order, product=product, quantity=2)
+        item.delete()
+
+        plant = product.plants.get()
+        movements = list(plant.stock_movements.order_by('pk').values_list('reason', 'delta', 'order'))
+        assert movements == [
+            (StockMovement.REASON_RESTOCK, 5, None),
+            (StockMovement.REASON_ORDER, -2, order.pk),
+            (StockMovement.REASON_RETURN, 2, order.pk),
+        ]
+        assert ledger_stock(plant) == plant.stock == 5
+
+    def test_paid_reservation_is_recorded_as_order(self, product):
+        order = baker.make(Order)
+        item = OrderItem.objects.create(order=order, product=product, quantity=2)
+        assert not StockMovement.objects.filter(reason=StockMovement.REASON_ORDER).exists()
+
+        order.status = Order.STATUS_PAYMENT_COMPLETED
+        order.save()
+
+        accessory = product.accessories.get()
+        assert accessory.stock_movements.get(reason=StockMovement.REASON_ORDER).order_item == item
+        assert ledger_stock(accessory) == accessory.stock == 1
+
+    def test_manual_edits_are_restocks_and_adjustments(self, product):
+        plant = product.plants.get()
+        plant.stock = 8
+        plant.save()
+        plant.stock = 6
+        plant.save()
+
+        assert list(plant.stock_movements.order_by('pk').values_list('reason', 'delta'))[1:] == [
+            (StockMovement.REASON_RESTOCK, 3),
+            (StockMovement.REASON_ADJUSTMENT, -2),
+        ]
+
+    def test_snapshot_plus_recent_movements(self, product):
+        plant = product.plants.get()
+        idle = baker.make(Plant, cost=10, stock=4)
+        before = timezone.now()
+        call_command('take_stock_snapshot', lag=0)
+        OrderItem.objects.create(order=baker.make(Order, status=Order.STATUS_COMPLETED), product=product, quantity=1)
+
+        snapshot = StockSnapshot.objects.get(plant=plant)
+        assert snapshot.stock == 5
+        assert ledger_stock(plant) == 4
+        assert plant.get_stock_at(before) == 5
+
+        # only the components moved since their last snapshot get a new one
+        call_command('take_stock_snapshot', lag=0)
+        assert StockSnapshot.objects.filter(plant=plant).count() == 2
+        assert StockSnapshot.objects.filter(plant=idle).count() == 1
+        assert ledger_stock(plant) == 4
+
+    def test_reconcile_records_the_drift(self, product):
+        Plant.objects.update(stock=7)
+
+        with pytest.raises(CommandError):
+            call_command('reconcile_stock', check=True)
+        call_command('reconcile_stock')
+
+        plant = product.plants.get()
+        assert ledger_stock(plant) == 7
+        assert plant.stock_movements.latest('pk').reason == StockMovement.REASON_ADJUSTMENT
+        call_command('reconcile_stock', check=True)
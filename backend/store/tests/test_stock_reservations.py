@@ -0,0 +1,189 @@
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from model_bakery import baker
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.throttling import ScopedRateThrottle
+from store.exceptions import OutOfStockError
+from store.models import Product, Plant, Accessory, Order, OrderItem, StockReservation
+from store.serializers import OrderCreateSerializer
+import pytest
+
+
+@pytest.fixture
+def product():
+    product = baker.make(Product, price=1000)
+    product.plants.add(baker.make(Plant, cost=100, stock=5))
+    product.accessories.add(baker.make(Accessory, cost=50, stock=3))
+    product.refresh_from_db()
+    return product
+
+
+def stock_of(product):
+    plant, accessory = product.plants.get(), product.accessories.get()
+    return (plant.stock, plant.reserved), (accessory.stock, accessory.reserved)
+
+
+@pytest.mark.django_db
+class TestStockReservation:
+    def test_submitted_order_holds_stock_until_payment(self, product):
+        order = baker.make(Order)
+        OrderItem.objects.create(order=order, product=product, quantity=2)
+        product.refresh_from_db()
+
+        assert stock_of(product) == ((5, 2), (3, 2))
+        assert product.available_stock == 1
+
+        order.status = Order.STATUS_PAYMENT_COMPLETED
+        order.save()
+        product.refresh_from_db()
+
+        assert stock_of(product) == ((3, 0), (1, 0))
+        assert product.available_stock == 1
+        assert StockReservation.objects.get().status == StockReservation.STATUS_COMMITTED
+
+    def test_failed_order_and_deleted_item_release_stock(self, product):
+        order = baker.make(Order)
+        item = OrderItem.objects.create(order=order, product=product, quantity=2)
+        OrderItem.objects.create(order=order, product=product, quantity=1)
+
+        item.delete()
+        assert stock_of(product) == ((5, 1), (3, 1))
+
+        order.status = Order.STATUS_FAILED
+        order.save()
+        product.refresh_from_db()
+
+        assert stock_of(product) == ((5, 0), (3, 0))
+        assert product.available_stock == 3
+
+    def test_reservation_cannot_oversell(self, product):
+        StockReservation.objects.reserve([(product.pk, 2, None)])
+
+        with pytest.raises(OutOfStockError):
+            StockReservation.objects.reserve([(product.pk, 2, None)])
+
+        assert stock_of(product) == ((5, 2), (3, 2))
+
+    def test_saving_a_loaded_component_keeps_the_live_holds(self, product):
+        plant = product.plants.get()
+        StockReservation.objects.reserve([(product.pk, 3, None)])
+        Plant.objects.filter(pk=plant.pk).apply_stock_changes({plant.pk: -1})
+
+        plant.name = "renamed"
+        plant.save()
+
+        assert stock_of(product) == ((4, 3), (3, 3))
+        assert StockReservation.objects.filter(product=product).settle(StockReservation.STATUS_RELEASED) == 1
+
+    def test_expire_fails_abandoned_orders(self, product):
+        order = baker.make(Order)
+        OrderItem.objects.create(order=order, product=product, quantity=2)
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        assert StockReservation.objects.expire() == 1
+
+        order.refresh_from_db()
+        assert order.status == Order.STATUS_FAILED
+        assert stock_of(product) == ((5, 0), (3, 0))
+        assert StockReservation.objects.get().status == StockReservation.STATUS_EXPIRED
+
+
+@pytest.mark.django_db
+class TestCartReservationApi:
+    def test_cart_reservation_is_adopted_by_the_order(self, api_client, product):
+        base = f"/api/v{settings.VERSION}/store/"
+        response = api_client.post(base + "reservations/", {"product": product.pk, "quantity": 2}, format="json")
+        assert response.status_code == status.HTTP_201_CREATED
+
+        payload = {
+            "customer": {"first_name": "Ali", "last_name": "Rezaei", "phone_number": "+989123456789"},
+            "address": {"city": "Tehran", "address": "Valiasr st.", "postal_code": "1234567890", "phone_number": "+989123456789"},
+            "items": [{"product": product.pk, "quantity": 2, "reservation": response.data["token"]}],
+        }
+        response = api_client.post(base + "orders/", payload, format="json")
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert StockReservation.objects.get().order_item is not None
+        assert stock_of(product) == ((5, 2), (3, 2))
+
+    def test_released_cart_reservation_gives_stock_back(self, api_client, product):
+        url = f"/api/v{settings.VERSION}/store/reservations/"
+        token = api_client.post(url, {"product": product.pk, "quantity": 3}, format="json").data["token"]
+
+        response = api_client.delete(f"{url}{token}/")
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert stock_of(product) == ((5, 0), (3, 0))
+
+    def test_order_does_not_adopt_a_reservation_released_after_validation(self, product):
+        reservation, = StockReservation.objects.reserve([(product.pk, 2, None)])
+        serializer = OrderCreateSerializer(data={
+            "customer": {"first_name": "Ali", "last_name": "Rezaei", "phone_number": "+989123456789"},
+            "address": {"city": "Tehran", "address": "Valiasr st.", "postal_code": "1234567890", "phone_number": "+989123456789"},
+            "items": [{"product": product.pk, "quantity": 2, "reservation": str(reservation.token)}],
+        })
+        assert serializer.is_valid(), serializer.errors
+
+        StockReservation.objects.filter(pk=reservation.pk).settle(StockReservation.STATUS_RELEASED)
+
+        with pytest.raises(ValidationError):
+            serializer.save()
+        reservation.refresh_from_db()
+        assert reservation.order_item is None
+        assert not Order.objects.exists()
+        assert stock_of(product) == ((5, 0), (3, 0))
+
+
+@pytest.mark.django_db
+class TestCartReservationLimits:
+    url = f"/api/v{settings.VERSION}/store/reservations/"
+
+    def test_live_cart_reservations_are_capped_per_client(self, api_client, product, settings):
+        settings.STOCK_RESERVATION_MAX_PER_CLIENT = 2
+        for _ in range(2):
+            assert api_client.post(self.url, {"product": product.pk, "quantity": 1}, format="json").status_code == status.HTTP_201_CREATED
+
+        response = api_client.post(self.url, {"product": product.pk, "quantity": 1}, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert StockReservation.objects.count() == 2
+        other = api_client.post(self.url, {"product": product.pk, "quantity": 1}, format="json", REMOTE_ADDR="10.0.0.2")
+        assert other.status_code == status.HTTP_201_CREATED
+
+    def test_spoofed_forwarded_for_does_not_bypass_the_cap(self, api_client, product, settings):
+        settings.STOCK_RESERVATION_MAX_PER_CLIENT = 1
+        # nginx appends the real address to what the client sent
+        statuses = [
+            api_client.post(
+                self.url, {"product": product.pk, "quantity": 1}, format="json",
+                HTTP_X_FORWARDED_FOR=f"10.0.{n}.{n}, 192.0.2.1",
+            ).status_code
+            for n in range(2)
+        ]
+
+        assert statuses == [status.HTTP_201_CREATED, status.HTTP_400_BAD_REQUEST]
+        assert StockReservation.objects.get().client == "192.0.2.1"
+
+    def test_held_quantity_is_capped_across_carts_and_orders(self, api_client, product, settings):
+        settings.STOCK_RESERVATION_MAX_QUANTITY_PER_CLIENT = 2
+        assert api_client.post(self.url, {"product": product.pk, "quantity": 2}, format="json").status_code == status.HTTP_201_CREATED
+        payload = {
+            "customer": {"first_name": "Ali", "last_name": "Rezaei", "phone_number": "+989123456789"},
+            "address": {"city": "Tehran", "address": "Valiasr st.", "postal_code": "1234567890", "phone_number": "+989123456789"},
+            "items": [{"product": product.pk, "quantity": 1}],
+        }
+
+        response = api_client.post(f"/api/v{settings.VERSION}/store/orders/", payload, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not Order.objects.exists()
+
+    def test_cart_reservations_are_throttled(self, api_client, product, monkeypatch):
+        monkeypatch.setitem(ScopedRateThrottle.THROTTLE_RATES, 'reservations', '1/minute')
+        assert api_client.post(self.url, {"product": product.pk, "quantity": 1}, format="json").status_code == status.HTTP_201_CREATED
+
+        response = api_client.post(self.url, {"product": product.pk, "quantity": 1}, format="json")
+
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
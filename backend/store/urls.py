@@ -1,10 +1,21 @@
 from django.urls import path
+from rest_framework.routers import DefaultRouter
+from rest_framework_nested.routers import NestedDefaultRouter
 from .views import *
 
+router = DefaultRouter()
+router.register('categories', CategoryViewSet, 'categories')
+router.register('orders', OrderViewSet, 'orders')
+router.register('products', ProductViewSet, 'products')
+router.register('reservations', StockReservationViewSet, 'reservations')
+
+product_router = NestedDefaultRouter(router, 'products', lookup='product')
+product_router.register('reviews', ProductReviewViewSet, 'product-reviews')
+
 
 
 
 
 urlpatterns = [
     
-]
\ No newline at end of file
+] + router.urls + product_router.urls
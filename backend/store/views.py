@@ -1,3 +1,173 @@
-from django.shortcuts import render
+import hashlib
+from rest_framework.viewsets import GenericViewSet
+from rest_framework.mixins import CreateModelMixin, DestroyModelMixin, ListModelMixin, RetrieveModelMixin
+from rest_framework.response import Response
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.throttling import ScopedRateThrottle
+from django.conf import settings
+from django.db.models import Count, Max, Sum
+from django.shortcuts import get_object_or_404
+from core.asyncviews import AsyncViewSetMixin
+from core.cache import CachedResponseMixin
+from core.conditional import ConditionalGetMixin
+from core.pagination import KeysetPagination
+from .category_tree import get_category_tree
+from .facets import search_facets
+from .search import search_products
+from .models import Category, Order, Product, Review, StockReservation
+from .serializers import *
 
-# Create your views here.
+
+class CategoryViewSet(AsyncViewSetMixin, ConditionalGetMixin, CachedResponseMixin, RetrieveModelMixin, GenericViewSet):
+    queryset = Category.objects.all()
+    serializer_class = CategoryDetailSerializer
+
+    def get_cache_versions(self):
+        return ['store.category']
+
+    def get_last_modified(self):
+        return Category.objects.aggregate(last_modified=Max('updated_at'))['last_modified']
+
+    def list(self, request):
+        return Response(get_category_tree())
+
+
+class StockHoldLimitMixin:
+    """
+    Throttles the creation of stock holds per client (throttle_scope) and caps the number and
+    the quantity of the live reservations of a user or an IP address.
+    """
+    throttle_classes = [ScopedRateThrottle]
+
+    def get_throttles(self):
+        # only creating holds stock
+        return super().get_throttles() if self.action == 'create' else []
+
+    def get_client(self):
+        user = self.request.user
+        if user.is_authenticated:
+            return f"user:{user.pk}"
+        # the address added by the NUM_PROXIES proxies, the field holds 64 characters
+        ident = ScopedRateThrottle().get_ident(self.request)
+        return ident if len(ident) <= 64 else hashlib.sha256(ident.encode()).hexdigest()
+
+    def check_holds(self, client, holds, quantity):
+        held = StockReservation.objects.held_by(client).aggregate(holds=Count('pk'), quantity=Sum('quantity'))
+        if (
+            held['holds'] + holds > settings.STOCK_RESERVATION_MAX_PER_CLIENT
+            or (held['quantity'] or 0) + quantity > settings.STOCK_RESERVATION_MAX_QUANTITY_PER_CLIENT
+        ):
+            raise ValidationError("تعداد رزروهای فعال شما بیش از حد مجاز است")
+
+
+class OrderViewSet(StockHoldLimitMixin, CreateModelMixin, GenericViewSet):
+    queryset = Order.objects.all()
+    serializer_class = OrderCreateSerializer
+    throttle_scope = 'orders'
+
+    def perform_create(self, serializer):
+        # the items of cart reservations are held already
+        items = [item for item in serializer.validated_data['items'] if 'reservation' not in item]
+        client = self.get_client()
+        self.check_holds(client, len(items), sum(item['quantity'] for item in items))
+        serializer.save(client=client)
+
+
+class StockReservationViewSet(StockHoldLimitMixin, CreateModelMixin, RetrieveModelMixin, DestroyModelMixin, GenericViewSet):
+    # cart holds, the token is handed to the order submission to keep the stock
+    queryset = StockReservation.objects.active().filter(order_item=None)
+    serializer_class = StockReservationSerializer
+    lookup_field = 'token'
+    throttle_scope = 'reservations'
+
+    def perform_create(self, serializer):
+        client = self.get_client()
+        self.check_holds(client, 1, serializer.validated_data['quantity'])
+        serializer.save(client=client)
+
+    def perform_destroy(self, instance):
+        # an order may have adopted it meanwhile, settle re-checks the row once locked
+        StockReservation.objects.filter(pk=instance.pk, order_item=None).settle(StockReservation.STATUS_RELEASED)
+
+
+class ProductViewSet(AsyncViewSetMixin, ConditionalGetMixin, CachedResponseMixin, ListModelMixin, RetrieveModelMixin, GenericViewSet):
+    # price and stock are denormalized on Product, a page is 1 query + 4 prefetches
+    queryset = Product.objects.prefetch_related('images', 'categories', 'plants', 'accessories')
+    serializer_class = ProductSerializer
+    pagination_class = KeysetPagination
+    cache_actions = conditional_actions = ['list', 'retrieve', 'search', 'top_rated', 'facets']
+    # also the product_pk of the nested reviews route
+    lookup_value_regex = r'\d+'
+
+    def get_cache_versions(self):
+        # a product page only changes with its product (store.signals bumps it for its relations too)
+        if self.action == 'retrieve':
+            return [f"store.product:{self.kwargs['pk']}", 'store.category']
+        return ['store.product', 'store.category', 'store.plant', 'store.accessory']
+
+    def get_last_modified(self):
+        # price, stock and relation changes do not touch updated_at, the versions cover them
+        if self.action != 'retrieve':
+            return Product.objects.aggregate(last_modified=Max('updated_at'))['last_modified']
+        if not str(self.kwargs['pk']).isdigit():
+            return None
+        return Product.objects.filter(pk=self.kwargs['pk']).values_list('updated_at', flat=True).first()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        category = self.request.query_params.get('category')
+        if self.action == 'list' and category:
+            category = get_object_or_404(Category, pk=category) if category.isdigit() else None
+            queryset = queryset.in_category(category) if category else queryset.none()
+        return queryset
+
+    def get_products(self, product_ids):
+        # the products of the ids, in the order of the ids
+        products = self.get_queryset().in_bulk(product_ids)
+        return [products[pk] for pk in product_ids if pk in products]
+
+    @action(detail=False, methods=['GET'])
+    def search(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 50)
+        except ValueError:
+            limit = 20
+        product_ids = search_products(request.query_params.get('q', ''), limit)
+        serializer = self.get_serializer(self.get_products(product_ids), many=True)
+        return Response({'results': serializer.data})
+
+    @action(detail=False, methods=['GET'])
+    def top_rated(self, request):
+        category = request.query_params.get('category')
+        category = get_object_or_404(Category, pk=category) if category and category.isdigit() else None
+        products = self.get_queryset().top_rated(category)[:20]
+        return Response({'results': self.get_serializer(products, many=True).data})
+
+    @action(detail=False, methods=['GET'])
+    def facets(self, request):
+        params = request.query_params
+        try:
+            selected = {
+                facet: {int(value) for value in params.getlist(facet)}
+                for facet in ['category', 'plant', 'accessory']
+            }
+            min_price = int(params['min_price']) if params.get('min_price') else None
+            max_price = int(params['max_price']) if params.get('max_price') else None
+            limit = min(max(int(params.get('limit', 20)), 1), 50)
+        except ValueError:
+            raise ValidationError('پارامترهای فیلتر باید عدد باشند')
+
+        count, product_ids, facets = search_facets(selected, min_price, max_price, limit)
+        serializer = self.get_serializer(self.get_products(product_ids), many=True)
+        return Response({'count': count, 'facets': facets, 'results': serializer.data})
+
+
+class ProductReviewViewSet(ListModelMixin, GenericViewSet):
+    serializer_class = ReviewSerializer
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        # an unknown product is a 404, not an empty feed
+        product = get_object_or_404(Product.objects.only('pk'), pk=self.kwargs['product_pk'])
+        return Review.objects.filter(product=product).select_related('user')